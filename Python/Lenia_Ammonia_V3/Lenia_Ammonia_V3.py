@@ -1,16 +1,17 @@
 import math, numpy as np                        # (pip for macbook) pip3 install numpy
 import scipy.ndimage                            # pip3 install scipy
-import scipy.spatial.distance, scipy.signal
-import reikna.fft, reikna.cluda                 # pip3 install pyopencl/pycuda, reikna
-import skimage.morphology, skimage.segmentation # pip3 install scikit-image
-import skimage._shared.coord
-import PIL.Image, PIL.ImageTk                   # pip3 install pillow
-import PIL.ImageDraw, PIL.ImageFont
-try: import tkinter as tk
-except: import Tkinter as tk
+import scipy.fft
+# imported on first use, so that Board, Automaton and Analyzer load fast and run without GPU, display or these packages:
+#   scipy.signal (PSD), scipy.spatial (recurrence plot), skimage (objects, HSV)   pip3 install scikit-image
+#   reikna (GPU), on the first GPU step, see Automaton.prepare_gpu()              pip3 install pyopencl/pycuda, reikna
+#   tkinter, PIL (GUI), see import_gui()                                          pip3 install pillow
+#   pyfftw (--fft pyfftw), see import_pyfftw()                                    pip3 install pyfftw
+#   numba (--jit), see import_numba()                                             pip3 install numba
+pyfftw = numba = None
 from fractions import Fraction
 import copy, re, itertools, json, csv
 import io, os, sys, argparse, datetime, time, string, subprocess, multiprocessing
+import multiprocessing.shared_memory, atexit, traceback, threading, concurrent.futures
 import warnings
 warnings.filterwarnings('ignore', '.*output shape of zoom.*')  # suppress warning from scipy.ndimage.zoom()
 warnings.filterwarnings('ignore', '.*divide by zero encountered.*')  # suppress warning from divide by zero in kernel_core()
@@ -43,70 +44,135 @@ v.3.6.1 (add free_b, divide b into rings, separate c0 c1, e.g. 233o.json)
 is_free_h = True
 is_free_b = False
 
-parser = argparse.ArgumentParser(formatter_class=argparse.RawTextHelpFormatter, 
+def make_parser():
+    # command line arguments, see LeniaConfig.from_args()
+    parser = argparse.ArgumentParser(formatter_class=argparse.RawTextHelpFormatter, 
 description='''Lenia in n-Dimensions    by Bert Chan 2020
 
 recommended settings: (2D) -d2 -p2, (wide) -d2 -p0 -w 10 9, (3D) -d3 -p3, (4D) -d4 -p4''')
-parser.add_argument('-g', '--gpu', dest='G', action='store_true', help='interactive choose GPU')
-group = parser.add_mutually_exclusive_group(required=False)
-group.add_argument('-s', '--size', dest='S', default=None, action='store', type=int, nargs='+', help='exact array size (apply to all sides if only one value, default 2^(W-P))')
-group.add_argument('-w', '--win', dest='W', default=[9], action='store', type=int, nargs='+', help='window size = 2^W (apply to all sides if only one value, default 2^9 = 512)')
-group.add_argument('--wide', action="store_true", help='wide window (i.e. -w 10 9)')
-parser.add_argument('-p', '--pixel', dest='P', default=None, action='store', type=int, help='pixel size = 2^P (default 2^D)')
-parser.add_argument('-b', '--border', dest='B', default=0, action='store', type=int, help='pixel border (default 0)')
-parser.add_argument('-d', '--dim', dest='D', default=2, action='store', type=int, help='number of dimensions (default 2)')
-parser.add_argument('-c', '--channel', dest='C', default=1, action='store', type=int, help='number of channels (default 1)')
-parser.add_argument('-k', '--kernel', dest='K', default=1, action='store', type=int, help='number of self-connecting kernels (default 1)')
-parser.add_argument('-x', '--cross', dest='X', default=1, action='store', type=int, help='number of cross-connecting kernels (default 1)')
-parser.add_argument('-f', '--found', dest='F', default=None, action='store', type=str, help='found animals filename (default <DCK>.json)')
-args = parser.parse_args()
-
-# W,W,P,B   GoL 9,9,3,1   Lenia Lo 9,9,2,0  Hi 9,9,0,0   1<<7=128x128
-
-DIM = args.D
+    parser.add_argument('-g', '--gpu', dest='G', action='store_true', help='interactive choose GPU')
+    group = parser.add_mutually_exclusive_group(required=False)
+    group.add_argument('-s', '--size', dest='S', default=None, action='store', type=int, nargs='+', help='exact array size (apply to all sides if only one value, default 2^(W-P))')
+    group.add_argument('-w', '--win', dest='W', default=[9], action='store', type=int, nargs='+', help='window size = 2^W (apply to all sides if only one value, default 2^9 = 512)')
+    group.add_argument('--wide', action="store_true", help='wide window (i.e. -w 10 9)')
+    parser.add_argument('-p', '--pixel', dest='P', default=None, action='store', type=int, help='pixel size = 2^P (default 2^D)')
+    parser.add_argument('-b', '--border', dest='B', default=0, action='store', type=int, help='pixel border (default 0)')
+    parser.add_argument('-d', '--dim', dest='D', default=2, action='store', type=int, help='number of dimensions (default 2)')
+    parser.add_argument('-c', '--channel', dest='C', default=1, action='store', type=int, help='number of channels (default 1)')
+    parser.add_argument('-k', '--kernel', dest='K', default=1, action='store', type=int, help='number of self-connecting kernels (default 1)')
+    parser.add_argument('-x', '--cross', dest='X', default=1, action='store', type=int, help='number of cross-connecting kernels (default 1)')
+    parser.add_argument('-f', '--found', dest='F', default=None, action='store', type=str, help='found animals filename (default <DCK>.json)')
+    parser.add_argument('--float32', dest='F32', action='store_true', help='single precision simulation (float32 fields, complex64 spectra)')
+    parser.add_argument('--fft', dest='FFT', default='scipy', choices=['numpy', 'scipy', 'pyfftw'], help='CPU FFT backend (default scipy, pyfftw falls back to scipy if not installed)')
+    parser.add_argument('--fft-workers', dest='FFT_WORKERS', default=0, action='store', type=int, help='FFT worker threads (default 0 = all cores)')
+    parser.add_argument('--lut', dest='LUT', default=0, action='store', type=float, help='tabulated growth, kernel core and soft clip with at most this interpolation error (e.g. 1e-4, default 0 = exact functions)')
+    parser.add_argument('--kernel-stack', dest='KERNEL_STACK', action='store_true', help='all kernels of a world in one batched FFT (opt-in, the per-kernel loop is faster on one core)')
+    parser.add_argument('--jit', dest='JIT', action='store_true', help='fused Numba kernels for the pointwise environment and growth update (NumPy if numba is not installed)')
+    parser.add_argument('--spectral-env', dest='SPECTRAL_ENV', action='store_true', help='diffusion, decay and cooling of environment fields in one batched FFT')
+    parser.add_argument('--env-interval', dest='ENV_INTERVAL', default=1, action='store', type=int, help='generations between environment updates, density sources accumulated in between (default 1)')
+    parser.add_argument('--env-scale', dest='ENV_SCALE', default=1, action='store', type=int, choices=[1, 2, 4], help='environment fields on a 2x or 4x coarser grid (default 1 = cell resolution)')
+    parser.add_argument('--tiles', dest='TILES', default=0, action='store', type=int, help='simulate only the tiles of this size (e.g. 64) that hold mass or are within a kernel radius of it, for large sparse worlds (default 0 = whole world)')
+    parser.add_argument('--window', dest='WINDOW', action='store_true', help='simulate only a power-of-two window around the creature, following it and resized with it (the environment outside it is advanced every few generations, without cells)')
+    parser.add_argument('--slabs', dest='SLABS', default=0, action='store', type=int, help='split the world into this many row slabs stepped by worker processes (default 0 = one process)')
+    return parser
+
 DIM_DELIM = {0:'', 1:'$', 2:'%', 3:'#', 4:'@A', 5:'@B', 6:'@C', 7:'@D', 8:'@E', 9:'@F'}
 X_AXIS, Y_AXIS, Z_AXIS = -1, -2, -3
+FFT_HAS_OUT = np.lib.NumpyVersion(np.__version__) >= '2.0.0'  # numpy.fft functions accept out= since numpy 2
 
-PIXEL_2 = args.P if args.P is not None else args.D
-PIXEL_BORDER = args.B
-if args.S is None:
-    if args.wide:
-        SIZE_2 = [win_2 - PIXEL_2 for win_2 in (10, 9)]
-    else:
-        SIZE_2 = [win_2 - PIXEL_2 for win_2 in args.W]
-    if len(SIZE_2) < DIM:
-        SIZE_2 += [SIZE_2[-1]] * (DIM-len(SIZE_2))
-    SIZE = [1 << size_2 for size_2 in SIZE_2]
-else:
-    SIZE = args.S  #160
-    if len(SIZE) < DIM:
-        SIZE += [SIZE[-1]] * (DIM-len(SIZE))
-    SIZE_2 = [math.log(size,2) for size in SIZE]
-
-#size    pixel mac
-#128x128 16384 26.7  -w 9 9
-#140x140 25600 20.4
-#160x160 25600 17.7
-#180x180 32400 15.0
-#256x128 32768 14.2  -w 10 9
-#192x192 36864 13.0
-#200x200 40000 12.2
-
-PIXEL = 1 << PIXEL_2
-MID = [int(size / 2) for size in SIZE]
-SIZEX, SIZEY = SIZE[0], SIZE[1]
-MIDX, MIDY = MID[0], MID[1]
-
-SIZER, SIZETH, SIZEF = min(MIDX, MIDY), SIZEX, MIDX
-DEF_R   = int(np.power(2.0, min(SIZE_2) - 6) * DIM * 5)  # default 20
-RAND_R1 = int(np.power(2.0, min(SIZE_2) - 7) * DIM * 5)  # default 10
-RAND_R2 = int(np.power(2.0, min(SIZE_2) - 5) * DIM * 5)  # default 40
-
-CN = args.C
-KN = args.K
-XN = args.X
-CHANNEL = range(CN)
-KERNEL = range(KN*CN + XN*CN*(CN-1))
+class LeniaConfig:
+    '''
+    Settings of one kind of world: dimensions, size, channels and kernels, precision and stepping options
+    Same options as the command line (see make_parser), derived values named as the module globals they set (see configure)
+    A board keeps the configuration it was created with (world.config, also used by its Automaton and Analyzer),
+    so that worlds of different kinds can run side by side in one process, e.g.
+        Board(config=LeniaConfig(dim=2, channels=2)), Board(config=LeniaConfig(dim=3, channels=3, cross=0))
+    '''
+    GLOBALS = ('DIM', 'PIXEL_2', 'PIXEL_BORDER', 'SIZE_2', 'SIZE', 'PIXEL', 'MID', 'SIZEX', 'SIZEY', 'MIDX', 'MIDY',
+        'SIZER', 'SIZETH', 'SIZEF', 'DEF_R', 'RAND_R1', 'RAND_R2', 'AMMONIA_R', 'DTYPE', 'FFT_BACKEND', 'FFT_WORKERS', 'IS_JIT',
+        'CN', 'KN', 'XN', 'CHANNEL', 'KERNEL')
+
+    def __init__(self, dim=2, size=None, win=(9,), wide=False, pixel=None, border=0, channels=1, kernels=1, cross=1, found=None,
+            gpu=False, float32=False, fft='scipy', fft_workers=0, lut=0, kernel_stack=False, jit=False, spectral_env=False, env_interval=1, env_scale=1,
+            tiles=0, window=False, slabs=0):
+        # same names as the parsed command line, the GUI reads them as 'args'
+        self.args = argparse.Namespace(G=gpu, S=size, W=list(win), wide=wide, P=pixel, B=border, D=dim, C=channels, K=kernels, X=cross,
+            F=found, F32=float32, FFT=fft, FFT_WORKERS=fft_workers, LUT=lut, KERNEL_STACK=kernel_stack, JIT=jit, SPECTRAL_ENV=spectral_env,
+            ENV_INTERVAL=env_interval, ENV_SCALE=env_scale, TILES=tiles, WINDOW=window, SLABS=slabs)
+
+        # W,W,P,B   GoL 9,9,3,1   Lenia Lo 9,9,2,0  Hi 9,9,0,0   1<<7=128x128
+        self.DIM = dim
+        self.PIXEL_2 = pixel if pixel is not None else dim
+        self.PIXEL_BORDER = border
+        if size is None:
+            if wide:
+                self.SIZE_2 = [win_2 - self.PIXEL_2 for win_2 in (10, 9)]
+            else:
+                self.SIZE_2 = [win_2 - self.PIXEL_2 for win_2 in win]
+            if len(self.SIZE_2) < dim:
+                self.SIZE_2 += [self.SIZE_2[-1]] * (dim-len(self.SIZE_2))
+            self.SIZE = [1 << size_2 for size_2 in self.SIZE_2]
+        else:
+            self.SIZE = list(size)  #160
+            if len(self.SIZE) < dim:
+                self.SIZE += [self.SIZE[-1]] * (dim-len(self.SIZE))
+            self.SIZE_2 = [math.log(size,2) for size in self.SIZE]
+
+        #size    pixel mac
+        #128x128 16384 26.7  -w 9 9
+        #140x140 25600 20.4
+        #160x160 25600 17.7
+        #180x180 32400 15.0
+        #256x128 32768 14.2  -w 10 9
+        #192x192 36864 13.0
+        #200x200 40000 12.2
+
+        self.PIXEL = 1 << self.PIXEL_2
+        self.MID = [int(size / 2) for size in self.SIZE]
+        self.SIZEX, self.SIZEY = self.SIZE[0], self.SIZE[1]
+        self.MIDX, self.MIDY = self.MID[0], self.MID[1]
+
+        self.SIZER, self.SIZETH, self.SIZEF = min(self.MIDX, self.MIDY), self.SIZEX, self.MIDX
+        self.DEF_R   = int(np.power(2.0, min(self.SIZE_2) - 6) * dim * 5)  # default 20
+        self.RAND_R1 = int(np.power(2.0, min(self.SIZE_2) - 7) * dim * 5)  # default 10
+        self.RAND_R2 = int(np.power(2.0, min(self.SIZE_2) - 5) * dim * 5)  # default 40
+        self.AMMONIA_R = int(self.DEF_R * 1.5)  # Larger interaction radius
+
+        self.DTYPE = np.float32 if float32 else np.float64
+        self.FFT_BACKEND = fft
+        self.FFT_WORKERS = fft_workers or multiprocessing.cpu_count()
+        self.IS_JIT = jit and import_numba() is not None  # fused kernels below, the NumPy path is used otherwise
+
+        self.CN = channels
+        self.KN = kernels
+        self.XN = cross
+        self.CHANNEL = range(self.CN)
+        self.KERNEL = range(self.KN*self.CN + self.XN*self.CN*(self.CN-1))
+
+    @classmethod
+    def from_args(cls, argv=None):
+        # configuration from command line arguments (sys.argv[1:] if None)
+        return cls.from_namespace(make_parser().parse_args(argv))
+
+    @classmethod
+    def from_namespace(cls, a):
+        # configuration from arguments parsed by make_parser() or a parser extending it (e.g. run_headless.py)
+        return cls(dim=a.D, size=a.S, win=a.W, wide=a.wide, pixel=a.P, border=a.B, channels=a.C, kernels=a.K, cross=a.X, found=a.F,
+            gpu=a.G, float32=a.F32, fft=a.FFT, fft_workers=a.FFT_WORKERS, lut=a.LUT, kernel_stack=a.KERNEL_STACK, jit=a.JIT, spectral_env=a.SPECTRAL_ENV,
+            env_interval=a.ENV_INTERVAL, env_scale=a.ENV_SCALE, tiles=a.TILES, window=a.WINDOW, slabs=a.SLABS)
+
+    def __deepcopy__(self, memo):
+        # shared by copies of a board, never modified
+        return self
+
+def configure(config):
+    # config becomes the default of new boards, and its values the module globals (SIZE, CN, KERNEL...) used by the GUI
+    global CONFIG, args
+    CONFIG, args = config, config.args
+    globals().update({name: getattr(config, name) for name in LeniaConfig.GLOBALS})
+    return config
+
+configure(LeniaConfig())  # the command line is parsed only when run as a script, see __main__
 
 ALIVE_THRESHOLD = 0.1
 EPSILON = 1e-10
@@ -121,193 +187,745 @@ AMMONIA_RING = {'r':0.75, 'w':0.6, 'b':1}  # Wider kernel for faster diffusion
 AMMONIA_M = 0.08    # Lower optimal potential (cold environment)
 AMMONIA_S = 0.008   # Narrower growth width
 AMMONIA_T = 18      # Faster time scaling (higher mobility)
-AMMONIA_R = int(DEF_R * 1.5)  # Larger interaction radius
 
 
 STATUS = []
 is_windows = (os.name == 'nt')
 np.set_printoptions(precision=3)
 
+def import_gui():
+    # tkinter and pillow, only needed by the GUI (Lenia, Recorder)
+    global tk, PIL
+    import PIL.Image, PIL.ImageTk, PIL.ImageDraw, PIL.ImageFont
+    try: import tkinter as tk
+    except ImportError: import Tkinter as tk
+
+def import_pyfftw():
+    # pyfftw, only needed by the pyfftw FFT backend, None if not installed
+    global pyfftw
+    if pyfftw is None:
+        try: import pyfftw, pyfftw.builders
+        except ImportError: return None
+    return pyfftw
+
+def import_numba():
+    # numba, only needed by --jit, None if not installed; the fused kernels are compiled here (on their first call)
+    global numba, prange
+    if numba is None:
+        try: import numba
+        except ImportError: return None
+        prange = numba.prange
+        for name in JIT_KERNELS:
+            globals()[name] = numba.njit(cache=True, parallel=True)(globals()[name])
+    return numba
+
+class StepWorkspace:
+    ''' Named buffers reused by every calc_once(), so that stepping does not allocate arrays once warmed up '''
+    def __init__(self):
+        self.buffers = {}
+        self.alloc_count = 0  # number of buffers (re)allocated, stays constant in steady state
+
+    def get(self, name, shape, dtype):
+        buf = self.buffers.get(name)
+        if buf is None or buf.shape != tuple(shape) or buf.dtype != dtype:
+            buf = self.buffers[name] = np.empty(shape, dtype=dtype)
+            self.alloc_count += 1
+        return buf
+
+    def like(self, name, A, dtype=None):
+        return self.get(name, A.shape, dtype or A.dtype)
+
+    def clear(self):
+        self.buffers = {}
+
+class FFTBackend:
+    ''' CPU FFTs shared by Automaton and Analyzer
+        numpy: single thread, written into out without allocating (numpy >= 2)
+        scipy: scipy.fft with worker threads, plans cached by pocketfft
+        pyfftw: FFTW with worker threads, plans cached here per (thread, kind, shape, dtype, axes), since a plan owns its arrays '''
+    instances = {}
+
+    def __init__(self, name='scipy', workers=1):
+        if name == 'pyfftw' and import_pyfftw() is None:
+            print('pyfftw not installed, using scipy FFT backend')
+            name = 'scipy'
+        self.name = name
+        self.workers = workers
+        self.planner_effort = 'FFTW_MEASURE'
+        self.plans = {}
+
+    @classmethod
+    def get(cls, name=None, workers=None):
+        # one backend (and one plan cache) per setting in the process
+        key = (name or FFT_BACKEND, workers or FFT_WORKERS)
+        if key not in cls.instances:
+            cls.instances[key] = cls(*key)
+        return cls.instances[key]
+
+    def plan(self, kind, A, axes, s=None):
+        key = (threading.get_ident(), kind, A.shape, A.dtype, axes, s)
+        if key not in self.plans:
+            builder = getattr(pyfftw.builders, kind)
+            kwargs = {'axis':axes} if kind == 'fft' else {'axes':axes, 's':s}
+            self.plans[key] = builder(pyfftw.empty_aligned(A.shape, dtype=A.dtype), threads=self.workers,
+                planner_effort=self.planner_effort, **kwargs)
+        return self.plans[key]
+
+    def run_plan(self, kind, A, axes, out, s=None):
+        # copy into the plan's own input array, so that A is kept intact even by c2r transforms
+        plan = self.plan(kind, A, axes, s)
+        np.copyto(plan.input_array, A)
+        plan()
+        if out is None:
+            return plan.output_array.copy()
+        np.copyto(out, plan.output_array)
+        return out
+
+    @staticmethod
+    def to_out(B, out):
+        if out is None:
+            return B
+        np.copyto(out, B)
+        return out
+
+    def fft(self, A, axis=-1):
+        if self.name == 'numpy':
+            return np.fft.fft(A, axis=axis)
+        elif self.name == 'scipy':
+            return scipy.fft.fft(A, axis=axis, workers=self.workers)
+        return self.run_plan('fft', A, axis, None)
+
+    def fftn(self, A, axes=None, inverse=False):
+        if self.name == 'numpy':
+            return (np.fft.ifftn if inverse else np.fft.fftn)(A, axes=axes)
+        elif self.name == 'scipy':
+            return (scipy.fft.ifftn if inverse else scipy.fft.fftn)(A, axes=axes, workers=self.workers)
+        return self.run_plan('ifftn' if inverse else 'fftn', A, axes or tuple(range(A.ndim)), None)
+
+    def rfftn(self, A, axes, out=None):
+        if self.name == 'numpy':
+            if out is None or not FFT_HAS_OUT:
+                return FFTBackend.to_out(np.fft.rfftn(A, axes=axes), out)
+            # same passes as np.fft.rfftn, written into out
+            np.fft.rfft(A, axis=axes[-1], out=out)
+            for axis in axes[-2::-1]:
+                np.fft.fft(out, axis=axis, out=out)
+            return out
+        elif self.name == 'scipy':
+            return FFTBackend.to_out(scipy.fft.rfftn(A, axes=axes, workers=self.workers), out)
+        return self.run_plan('rfftn', A, axes, out)
+
+    def irfftn(self, A, s, axes, out=None, scratch=None):
+        if self.name == 'numpy':
+            if out is None or not FFT_HAS_OUT:
+                return FFTBackend.to_out(np.fft.irfftn(A, s=s, axes=axes), out)
+            # same passes as np.fft.irfftn, on a scratch copy to keep A intact
+            B = scratch if scratch is not None else A.copy()
+            if B is not A:
+                np.copyto(B, A)
+            for axis in axes[:-1]:
+                np.fft.ifft(B, axis=axis, out=B)
+            return np.fft.irfft(B, n=s[-1], axis=axes[-1], out=out)
+        elif self.name == 'scipy':
+            return FFTBackend.to_out(scipy.fft.irfftn(A, s=s, axes=axes, workers=self.workers), out)
+        return self.run_plan('irfftn', A, axes, out, s=tuple(s))
+
+class LookupTable:
+    '''
+    Function tabulated on a uniform grid of [lo, hi] and evaluated by linear interpolation (inputs outside are clamped)
+    Error bound: |f(x) - table(x)| <= h^2/8 * max|f''| on [lo, hi] for grid step h, the table size is chosen
+    so that this is <= tol, with max|f''| estimated from second differences on 2^16 samples
+    Only for functions that are smooth on [lo, hi] and flat beyond (the clamping error is not included)
+    '''
+    PROBE_SIZE = 1 << 16
+    MAX_SIZE = 1 << 20
+
+    def __init__(self, func, lo, hi, tol, dtype=np.float64):
+        x = np.linspace(lo, hi, LookupTable.PROBE_SIZE + 1)
+        h = (hi - lo) / LookupTable.PROBE_SIZE
+        f2 = np.abs(np.diff(func(x), 2)).max() / h**2
+        n = int(np.clip(np.ceil((hi - lo) * np.sqrt(f2 / (8 * tol))), 16, LookupTable.MAX_SIZE))
+        x = np.linspace(lo, hi, n + 1)
+        values = func(x)
+        self.lo, self.n = lo, n
+        self.scale = n / (hi - lo)
+        self.error = f2 / 8 / self.scale**2  # bound for the estimated max|f''|
+        self.values = values[:-1].astype(dtype)
+        self.slopes = np.diff(values).astype(dtype)
+
+    def __call__(self, x, out=None, workspace=None):
+        ws = workspace if workspace is not None else StepWorkspace()
+        out = np.empty_like(x) if out is None else out
+        t = ws.like('lut_t', x)
+        index = ws.like('lut_index', x, np.intp)
+        np.subtract(x, self.lo, out=t)
+        t *= self.scale
+        np.clip(t, 0, self.n, out=t)
+        np.copyto(index, t, casting='unsafe')
+        np.minimum(index, self.n - 1, out=index)
+        np.subtract(t, index, out=t)  # fraction within the cell, 1 at the upper end
+        np.take(self.slopes, index, out=out)
+        out *= t
+        out += np.take(self.values, index, out=t)
+        return out
+
+class ActiveTiles:
+    '''
+    Active tiles of a large, mostly empty world (--tiles): tiles holding mass, or within the kernel reach of a tile that does
+    Each active tile is convolved as a padded block (the tile plus a halo of at least the kernel support, where the circular
+    convolution of the block equals that of the world) and updated in place, the other tiles stay empty
+    Only active tiles can gain mass, so after a full scan only they are checked (another full scan when the cell arrays are replaced)
+    '''
+    RESCAN_INTERVAL = 64  # generations between full scans, for cells edited in place
+
+    def __init__(self, shape, tile, halo):
+        self.shape = tuple(shape)
+        self.tile = tile
+        self.halo = halo
+        self.grid = tuple(n // tile for n in shape)
+        self.reach = -(-halo // tile)  # tiles around an occupied tile that its kernels reach
+        self.block = tuple(min(ActiveTiles.fast_len(tile + 2 * halo), n) for n in shape)
+        self.interior = tuple(slice(halo, halo + tile) for n in shape)
+        self.active = None  # indices of the active tiles, None until the first scan
+        self.dropped = None  # tiles deactivated by the last find(), None after a full scan (everything to clear)
+        self.cells_ids = None
+        self.gen = 0
+
+    @staticmethod
+    def fast_len(n):
+        # smallest even fast FFT length >= n, even like the world sizes (build_kernel() also handles odd ones)
+        length = scipy.fft.next_fast_len(n, True)
+        while length % 2:
+            length = scipy.fft.next_fast_len(length + 1, True)
+        return length
+
+    def region(self, index, scale=1):
+        # slices of a tile, on a grid coarsened by scale
+        t = self.tile // scale
+        return tuple(slice(i * t, (i + 1) * t) for i in index)
+
+    def block_index(self, index):
+        # periodic indices of the padded block around a tile (tile at self.interior)
+        return np.ix_(*[np.arange(i * self.tile - self.halo, i * self.tile - self.halo + b) % n
+            for i, b, n in zip(index, self.block, self.shape)])
+
+    def find(self, cells, vmin=EPSILON):
+        # occupied tiles (any channel above vmin) dilated by the kernel reach
+        cells_ids = [id(A) for A in cells]
+        is_full = self.active is None or cells_ids != self.cells_ids or self.gen % ActiveTiles.RESCAN_INTERVAL == 0
+        if is_full:
+            shape = sum(((g, self.tile) for g in self.grid), ())
+            axes = tuple(range(1, len(shape), 2))
+            occupied = np.any([A.reshape(shape).max(axis=axes) > vmin for A in cells], axis=0)
+        else:
+            occupied = np.zeros(self.grid, dtype=bool)
+            for index in self.active:
+                occupied[index] = any(A[self.region(index)].max() > vmin for A in cells)
+        active = scipy.ndimage.maximum_filter(occupied, size=2 * self.reach + 1, mode='wrap')
+        active = [tuple(index) for index in np.argwhere(active)]
+        self.dropped = None if is_full else sorted(set(self.active) - set(active))
+        self.active, self.cells_ids = active, cells_ids
+        self.gen += 1
+        return self.active
+
+    def clear(self, arrays, scale=1):
+        # zero the tiles dropped by the last find() in world-sized arrays (everything after a full scan)
+        for A in arrays:
+            if self.dropped is None:
+                A.fill(0)
+            else:
+                for index in self.dropped:
+                    A[self.region(index, scale)] = 0
+
+    def sample(self, F, index, scale, out):
+        # coarse field F over a tile by periodic linear interpolation, same values as Board.prolong()
+        t = self.tile
+        coords = np.meshgrid(*[(np.arange(i * t, (i + 1) * t) + 0.5) / scale - 0.5 for i in index], indexing='ij')
+        return scipy.ndimage.map_coordinates(F, coords, output=out, order=1, mode='grid-wrap')
+
+class AdaptiveWindow:
+    '''
+    Power-of-two window around the mass of a single world (--window), the only part simulated (by an inner Automaton on a
+    Board of the window shape, see Automaton.calc_window()), cells and environment copied in and out with periodic indices
+    The window holds the occupied bounding box plus a margin of MARGIN kernel radii (at least twice the kernel support, so that
+    the periodic window sees the same potentials as the world); it is re-centred when the mass comes within half a margin
+    of its border, grown when the box no longer fits and shrunk when the box and a wider margin fit in half of it
+    The environment outside the window, where there are no cells, is advanced every ENV_INTERVAL generations by one spectral
+    update of the whole world without density sources (diffusion, decay, cooling, regeneration, vents and convection), see Automaton.calc_window_env()
+    '''
+    MARGIN = 3  # kernel radii between the mass and the window border
+    ENV_INTERVAL = 4  # generations between two updates of the environment outside the window
+    ENV_FIELDS = ('temperature', 'nutrients', 'waste', 'signals', 'nutrient_sources', 'heat_sources')
+
+    def __init__(self, shape):
+        self.shape = tuple(shape)
+        self.origin = None  # world index of the first window cell on each axis, None until the first full scan
+        self.size = None  # window shape, powers of two (or the world size)
+        self.cells_ids = None
+
+    def borders(self, border):
+        # border on each axis, none where the window covers the world
+        return [0 if s == n else border for s, n in zip(self.size, self.shape)]
+
+    def index(self, scale=1, border=0):
+        # periodic indices of the window (minus a border) on a grid coarsened by scale, for np.ix_
+        return np.ix_(*[(o // scale + np.arange(b, s // scale - b)) % (n // scale)
+            for o, s, n, b in zip(self.origin, self.size, self.shape, self.borders(border))])
+
+    @staticmethod
+    def occupied_span(occupied):
+        # (start, extent) of the shortest periodic interval holding every True entry, None if there is none
+        index = np.flatnonzero(occupied)
+        if len(index) == 0:
+            return None
+        gaps = np.diff(np.append(index, index[0] + len(occupied)))
+        i = np.argmax(gaps)
+        return index[(i + 1) % len(index)], len(occupied) - gaps[i] + 1
+
+    def update(self, cells, window_cells, margin, scale=1, vmin=EPSILON):
+        # place the window for the next step from the mass of the window (of the whole world on the first step
+        # or when the cell arrays were replaced), returns True when the window moved or was resized
+        cells_ids = [id(A) for A in cells]
+        is_full = self.origin is None or window_cells is None or cells_ids != self.cells_ids
+        source, origin = (cells, (0,) * len(self.shape)) if is_full else (window_cells, self.origin)
+        self.cells_ids = cells_ids
+        masks = [A > vmin for A in source]
+        spans = []
+        for axis, n in enumerate(self.shape):
+            other = tuple(a for a in range(len(self.shape)) if a != axis)
+            span = self.occupied_span(np.any([M.any(axis=other) for M in masks], axis=0))
+            if span is None:
+                if self.origin is not None:
+                    return False  # empty, the window stays
+                self.origin, self.size = (0,) * len(self.shape), self.shape
+                return True
+            spans.append(((origin[axis] + span[0]) % n, span[1]))
+
+        side = 1 << int(np.ceil(np.log2(max(extent for start, extent in spans) + 2 * margin)))
+        fit = [min(n, side) for n in self.shape]  # square, the kernels assume it
+        if self.origin is not None and not is_full:
+            is_kept = True
+            for (start, extent), size, origin, new_size, n in zip(spans, self.size, self.origin, fit, self.shape):
+                lo = (start - origin) % n
+                if new_size > size:
+                    is_kept = False  # grow
+                elif size < n and (lo < margin // 2 or lo + extent > size - margin // 2):
+                    is_kept = False  # re-centre
+            if max(extent for start, extent in spans) + 3 * margin <= max(self.size) // 2:
+                is_kept = False  # shrink
+            if is_kept:
+                return False
+        origin = []
+        for (start, extent), size, n in zip(spans, fit, self.shape):
+            o = 0 if size == n else (start + extent // 2 - size // 2) % n
+            origin.append(int(o - o % scale))
+        origin, size = tuple(origin), tuple(fit)
+        is_changed = (origin, size) != (self.origin, self.size)
+        self.origin, self.size = origin, size
+        return is_changed
+
+    def copy_in(self, world, board):
+        # cells and environment of the window into the window board
+        index, env_index = self.index(), self.index(world.env_scale)
+        for c in world.config.CHANNEL:
+            np.copyto(board.cells[c], world.cells[c][index])
+        for name in AdaptiveWindow.ENV_FIELDS:
+            A = getattr(world, name, None)
+            if A is not None:
+                setattr(board, name, A[env_index])
+
+    def copy_out(self, board, world, border=0):
+        # cells and environment of the window board back into the world (sources are not changed by a step);
+        # the environment border (in cells) is not, it is copied in again from the world on every step
+        # so that the fields of the window relax towards the world around it instead of wrapping around
+        index = self.index()
+        for c in world.config.CHANNEL:
+            world.cells[c][index] = board.cells[c]
+        scale = world.env_scale
+        env_index = self.index(scale, border // scale)
+        board_index = tuple(slice(b, s // scale - b) for b, s in zip(self.borders(border // scale), self.size))
+        for name in AdaptiveWindow.ENV_FIELDS[:4]:
+            getattr(world, name)[env_index] = getattr(board, name)[board_index]
+
+# Fused pointwise kernels (--jit): one pass over memory instead of a chain of NumPy temporaries,
+# same operations in the same order as the NumPy path they replace. Arrays are 1-D views (see jit_flat),
+# per-world parameters of stacked worlds are 1-D arrays indexed by i // block.
+# Only where they beat NumPy: loops calling exp() (temperature, waste, gn 2 and 4) are slower than its vectorized exp.
+# Plain Python until import_numba() compiles them.
+JIT_KERNELS = ('jit_monod', 'jit_env_factor', 'jit_growth', 'jit_update')
+prange = range
+
+def jit_flat(A):
+    # 1-D view of a contiguous array, scalars become 1-element arrays
+    return np.reshape(A, -1) if np.ndim(A) else np.full(1, A)
+
+def jit_monod(nutrients, consuming_density, nutrient_factor, K, rate, regen, dt):
+    # Board.consume_nutrients()
+    for i in prange(nutrients.size):
+        n = nutrients[i]
+        f = n / (K + n)
+        nutrient_factor[i] = f
+        n -= rate * consuming_density[i] * f * dt
+        n = min(max(n, 0.0), 1.5)
+        n += regen * dt
+        nutrients[i] = min(max(n, 0.0), 1.5)
+
+def jit_env_factor(temp_factor, nutrient_factor, waste_factor, signal_factor, nutrients, waste, is_behavior, env_factor):
+    # product of the factors (scalars as 1-element arrays, read with a stride of 0), with Board.get_adaptive_growth_modulation()
+    ts, ns = min(temp_factor.size - 1, 1), min(nutrient_factor.size - 1, 1)
+    ws, ss = min(waste_factor.size - 1, 1), min(signal_factor.size - 1, 1)
+    for i in prange(env_factor.size):
+        f = temp_factor[i * ts] * nutrient_factor[i * ns]
+        f *= waste_factor[i * ws]
+        f *= signal_factor[i * ss]
+        if is_behavior:
+            m = 1.0
+            if nutrients[i] > 0.7:
+                m *= 1.2
+            if nutrients[i] < 0.3 and waste[i] < 0.4:
+                m *= 0.9
+            if waste[i] > 0.6:
+                m *= 0.6
+            f *= m
+        env_factor[i] = f
+
+def jit_growth(potential, m, s, coef, env_factor, A, is_arita, field, D):
+    # Automaton.calc_field() for gn 1 (polynomial) and the growth of one kernel added to D
+    block = potential.size // m.size
+    for i in prange(potential.size):
+        b = i // block
+        x = potential[i] - m[b]
+        g = max(0.0, 1.0 - x * x / (9 * s[b]**2))**4 * 2.0 - 1.0
+        if is_arita:
+            g = (g + 1.0) / 2.0
+            field[i] = g
+            g -= A[i]
+        else:
+            field[i] = g
+        D[i] += coef[b] * g * env_factor[i]
+
+def jit_update(A, D, P, dt, is_update, change):
+    # A + D clipped to [0,1] and quantized to 1/P, change rate, written back into A if is_update
+    for i in prange(A.size):
+        a = min(max(A[i] + D[i], 0.0), 1.0)
+        if P > 0:
+            a = round(a * P) / P
+        change[i] = (a - A[i]) / dt
+        if is_update:
+            A[i] = a
+
 class Board:
-    def __init__(self, size=[0]*DIM):
+    gaussian_weights = {}  # sigma -> 1D kernel, same as scipy.ndimage.gaussian_filter with truncate=4
+    env_transfer_cache = {}  # see env_transfer()
+
+    # Constants for ammonia environment - TUNED FOR BALANCE
+    K_NUTRIENT = 0.15  # Lower = less limiting (was 0.3)
+    CONSUMPTION_RATE = 0.01  # Much slower depletion (was 0.015)
+    WASTE_PRODUCTION_RATE = 0.008  # Much slower buildup (was 0.012)
+    NUTRIENT_REGEN_RATE = 0.004  # Faster recovery (was 0.004)
+    WASTE_DECAY_RATE = 0.008  # Faster cleanup (was 0.006)
+    NUTRIENT_DIFFUSION = 0.25  # Faster spreading (was 0.15)
+    WASTE_DIFFUSION = 0.20  # Faster spreading (was 0.12)
+    SCENARIOS = ('default', 'vents', 'gradient', 'islands')  # see setup_environmental_scenario()
+
+    # Signal parameters - TUNED FOR INTERESTING BEHAVIOR
+    SIGNAL_EMISSION_RATE = 0.02  # How fast organisms produce signals
+    SIGNAL_DECAY_RATE = 0.01     # How fast signals disappear
+    SIGNAL_DIFFUSION = 0.30      # How fast signals spread
+    SIGNAL_STRENGTH = 1.5        # How strongly signals affect growth (>1 = attractive)
+
+    # Physical constants for ammonia environment - TUNED FOR INTERESTING BEHAVIOR
+    HEAT_GENERATION = 0.3  # Lower heat production (was 0.8)
+    THERMAL_DIFFUSION = 0.35  # Faster heat spreading (was 0.25)
+    AMBIENT_TEMP = 208.0  # Closer to optimal (was 205.0)
+    COOLING_RATE = 0.012  # Faster equilibration (was 0.008)
+    MIN_TEMP = 180.0  # Below this, everything is frozen
+    MAX_TEMP = 260.0  # Above this, ammonia boils away
+
+    def __init__(self, size=None, dtype=None, config=None):
+        self.config = config or CONFIG  # kind of world (dimensions, channels, kernels...), see LeniaConfig
+        size = [0]*self.config.DIM if size is None else size
+        self.dtype = np.dtype(dtype or self.config.DTYPE)  # float32 or float64 for all fields
         self.names = {'code':'', 'name':'', 'cname':''}
         self.settings = {}
         # Use ammonia parameters instead of defaults
-        self.model = {'R':AMMONIA_R, 'T':AMMONIA_T, 'P':0, 'kn':1, 'gn':2};  # Note gn=2 for ammonia growth (Exponential)
+        self.model = {'R':self.config.AMMONIA_R, 'T':AMMONIA_T, 'P':0, 'kn':1, 'gn':2};  # Note gn=2 for ammonia growth (Exponential)
 
         # Ammonia-adapted parameters
-        self.params = [{'rings':[AMMONIA_RING.copy()], 'm':AMMONIA_M, 's':AMMONIA_S, 'h':1, 'c0':0, 'c1':0} for k in KERNEL]
-        self.cells = [np.zeros(size) for c in CHANNEL]
+        self.params = [{'rings':[AMMONIA_RING.copy()], 'm':AMMONIA_M, 's':AMMONIA_S, 'h':1, 'c0':0, 'c1':0} for k in self.config.KERNEL]
+        self.cells = [np.zeros(size, dtype=self.dtype) for c in self.config.CHANNEL]
         
         # Temperature field - uniform temperature for now (in Kelvin)
         # Ammonia liquid range: ~195K to 240K (-78°C to -33°C)
-        self.temperature = np.full(size, 210.0)  # Start at 210K (-63°C)
+        self.temperature = np.full(size, 210.0, dtype=self.dtype)  # Start at 210K (-63°C)
         
         # Nutrient field - "food" that organisms consume
-        self.nutrients = np.ones(size)  # Start at 100% nutrients everywhere
+        self.nutrients = np.ones(size, dtype=self.dtype)  # Start at 100% nutrients everywhere
         
         # Waste field - "pollution" that organisms produce
-        self.waste = np.zeros(size)  # Start with no waste
+        self.waste = np.zeros(size, dtype=self.dtype)  # Start with no waste
         
         # Chemical signal field - organisms emit signals that affect others
-        self.signals = np.zeros(size)  # Start with no signals
+        self.signals = np.zeros(size, dtype=self.dtype)  # Start with no signals
+
+        # Number of leading batch axes (1 for a stacked BatchAutomaton board, 0 otherwise)
+        self.batch_dims = 0
+
+        # Environment grid coarsening factor (1 = cell resolution), fields set at cell resolution are restricted on the next step
+        self.env_scale = self.config.args.ENV_SCALE
+
+        # Fused pointwise kernels for the factors (--jit)
+        self.is_jit = self.config.IS_JIT and import_numba() is not None  # also compiles the kernels in worker processes
 
     @classmethod
-    def from_values(cls, cells):
-        self = cls()
+    def from_values(cls, cells, config=None):
+        self = cls(config=config)
         self.cells = copy.deepcopy(cells) if cells is not None else None
         return self
 
+    @classmethod
+    def from_batch(cls, world_list):
+        # stack N worlds of the same shape into one board with a leading batch axis
+        shape = world_list[0].cells[0].shape
+        self = cls([len(world_list)] + list(shape), dtype=world_list[0].dtype, config=world_list[0].config)
+        self.batch_dims = 1
+        self.names = world_list[0].names.copy()
+        self.settings = copy.deepcopy(world_list[0].settings)
+        self.model = copy.deepcopy(world_list[0].model)
+        self.params = copy.deepcopy(world_list[0].params)
+        self.gather(world_list)
+        return self
+
+    def gather(self, world_list):
+        self.cells = [np.stack([world.cells[c] for world in world_list]) for c in self.config.CHANNEL]
+        for name in ('temperature', 'nutrients', 'waste', 'signals'):
+            setattr(self, name, np.stack([getattr(world, name) for world in world_list]))
+        for name in ('nutrient_sources', 'heat_sources'):
+            if all(hasattr(world, name) for world in world_list):
+                setattr(self, name, np.stack([getattr(world, name) for world in world_list]))
+
+    def scatter(self, world_list):
+        for i, world in enumerate(world_list):
+            world.cells = [self.cells[c][i].copy() for c in self.config.CHANNEL]
+            for name in ('temperature', 'nutrients', 'waste', 'signals'):
+                setattr(world, name, getattr(self, name)[i].copy())
+
+    @staticmethod
+    def restrict(A, scale, batch_dims=0, out=None):
+        # block mean of scale^D cells, e.g. density onto the coarse environment grid
+        shape = A.shape[:batch_dims] + sum(((n // scale, scale) for n in A.shape[batch_dims:]), ())
+        return np.mean(A.reshape(shape), axis=tuple(range(batch_dims + 1, len(shape), 2)), out=out)
+
+    @staticmethod
+    def prolong(A, scale, batch_dims=0, out=None):
+        # periodic linear interpolation back to cell resolution, coarse cell centres aligned with restrict()
+        # separable: along each axis, fine cell j of a coarse cell mixes it with its previous or next neighbour
+        for axis in range(batch_dims, A.ndim):
+            B = np.empty(A.shape[:axis+1] + (scale,) + A.shape[axis+1:], dtype=A.dtype)
+            neighbours = {-1: np.roll(A, 1, axis), 1: np.roll(A, -1, axis)}
+            for j in range(scale):
+                t = (j + 0.5) / scale - 0.5
+                Bj = B[(slice(None),) * (axis+1) + (j,)]
+                np.multiply(A, 1 - abs(t), out=Bj)
+                Bj += abs(t) * neighbours[1 if t > 0 else -1]
+            A = B.reshape(A.shape[:axis] + (-1,) + A.shape[axis+1:])
+        if out is not None:
+            np.copyto(out, A)
+            return out
+        return A
+
+    def sync_env_scale(self, scale=None):
+        # bring environment fields to the grid of the given coarsening factor (default env_scale)
+        scale = scale or self.env_scale
+        cell_shape = self.cells[0].shape
+        env_shape = cell_shape[:self.batch_dims] + tuple(n // scale for n in cell_shape[self.batch_dims:])
+        for name in ('temperature', 'nutrients', 'waste', 'signals', 'nutrient_sources', 'heat_sources'):
+            A = getattr(self, name, None)
+            if A is None or A.shape == env_shape:
+                continue
+            A = self.env_field(name)
+            setattr(self, name, A if scale == 1 else Board.restrict(A, scale, self.batch_dims))
+
+    def env_field(self, name):
+        # environment field at cell resolution (for display and scenario setup)
+        A = getattr(self, name)
+        cell_shape = self.cells[0].shape
+        if A.shape == cell_shape:
+            return A
+        return Board.prolong(A, cell_shape[-1] // A.shape[-1], self.batch_dims)
+
     def init_channels(self):
         i = 0
-        for c0 in CHANNEL:
-            for k in range(KN):
+        for c0 in self.config.CHANNEL:
+            for k in range(self.config.KN):
                 p = self.params[i]
                 if 'c0' not in p:
                     p['c0'] = c0
                     p['c1'] = c0
                 i += 1
-        for c0 in CHANNEL:
-            for c1 in CHANNEL:
+        for c0 in self.config.CHANNEL:
+            for c1 in self.config.CHANNEL:
                 if c0 != c1:
-                    for k in range(XN):
+                    for k in range(self.config.XN):
                         p = self.params[i]
                         if 'c0' not in p:
                             p['c0'] = c0
                             p['c1'] = c1
                         i += 1
 
-    def diffuse_field(self, field, diffusion_coef):
-        """Apply Gaussian diffusion to a field"""
+    @staticmethod
+    def get_gaussian_weights(sigma):
+        if sigma not in Board.gaussian_weights:
+            radius = int(4.0 * sigma + 0.5)
+            x = np.arange(-radius, radius+1)
+            w = np.exp(-0.5 / (sigma * sigma) * x**2)
+            Board.gaussian_weights[sigma] = w / w.sum()
+        return Board.gaussian_weights[sigma]
+
+    def diffuse_field(self, field, diffusion_coef, out=None, steps=1):
+        """Apply Gaussian diffusion to a field (in place if out is field), widened by sqrt(steps) when covering several generations"""
         if diffusion_coef > 0:
-            return scipy.ndimage.gaussian_filter(field, sigma=diffusion_coef, mode='wrap')
+            # separable filter with cached weights, no diffusion across the batch axis of stacked worlds
+            # (coefficients are in cells, so narrower on a coarse environment grid)
+            weights = Board.get_gaussian_weights(diffusion_coef * np.sqrt(steps) / self.env_scale)
+            for axis in range(self.batch_dims, field.ndim):
+                out = scipy.ndimage.correlate1d(field, weights, axis=axis, output=out, mode='wrap')
+                field = out
+            return out
+        if out is not None and out is not field:
+            np.copyto(out, field)
+            return out
         return field
     
     # #################################################################
     # # --- DÉBUT DU BLOC CORRIGÉ 1 ---
     # #################################################################
-    def update_nutrients_and_waste(self, consuming_density, total_density, dt=1.0, is_nutrients_enabled=True, is_waste_enabled=True):
+    def consume_nutrients(self, consuming_density, dt, ws):
+        # Monod kinetics: growth limited by nutrient availability
+        nutrient_factor = ws.like('nutrient_factor', self.nutrients)
+        if self.is_jit:
+            jit_monod(jit_flat(self.nutrients), jit_flat(consuming_density), jit_flat(nutrient_factor),
+                self.K_NUTRIENT, self.CONSUMPTION_RATE, self.NUTRIENT_REGEN_RATE, dt)
+            return nutrient_factor
+        np.add(self.K_NUTRIENT, self.nutrients, out=nutrient_factor)
+        np.divide(self.nutrients, nutrient_factor, out=nutrient_factor)
+        
+        # CORRIGÉ : Utilise 'consuming_density' (Canal 0)
+        consumption = ws.like('env_tmp', self.nutrients)
+        np.multiply(self.CONSUMPTION_RATE, consuming_density, out=consumption)
+        consumption *= nutrient_factor
+        consumption *= dt
+        self.nutrients -= consumption
+        np.clip(self.nutrients, 0.0, 1.5, out=self.nutrients)
+        # Natural regeneration (like nutrient upwelling)
+        self.nutrients += self.NUTRIENT_REGEN_RATE * dt
+        np.clip(self.nutrients, 0.0, 1.5, out=self.nutrients)
+        return nutrient_factor
+
+    def produce_waste(self, total_density, dt, ws):
+        # CORRIGÉ : Utilise 'total_density' (Tous les canaux)
+        waste_produced = ws.like('env_tmp', self.waste)
+        np.multiply(self.WASTE_PRODUCTION_RATE, total_density, out=waste_produced)
+        waste_produced *= dt
+        self.waste += waste_produced
+        np.clip(self.waste, 0.0, 1.5, out=self.waste)
+
+    def waste_toxicity(self, ws):
+        # Waste toxicity inhibits growth (gentler exponential)
+        waste_factor = ws.like('waste_factor', self.waste)
+        np.multiply(-2.0, self.waste, out=waste_factor)
+        np.exp(waste_factor, out=waste_factor)
+        waste_factor *= 0.6
+        waste_factor += 0.4
+        return waste_factor
+
+    def update_nutrients_and_waste(self, consuming_density, total_density, dt=1.0, is_nutrients_enabled=True, is_waste_enabled=True, workspace=None, steps=1):
         """
         Update nutrient and waste fields based on organism metabolism
         Uses Monod kinetics for realistic nutrient limitation
+        Fields are updated in place, returned factors are workspace buffers
+        steps = number of generations covered by dt (sub-cycled environment)
         """
         if not is_nutrients_enabled and not is_waste_enabled:
             return 1.0, 1.0
-        
-        # Constants for ammonia environment - TUNED FOR BALANCE
-        K_NUTRIENT = 0.15  # Lower = less limiting (was 0.3)
-        CONSUMPTION_RATE = 0.01  # Much slower depletion (was 0.015)
-        WASTE_PRODUCTION_RATE = 0.008  # Much slower buildup (was 0.012)
-        NUTRIENT_REGEN_RATE = 0.004  # Faster recovery (was 0.004)
-        WASTE_DECAY_RATE = 0.008  # Faster cleanup (was 0.006)
-        NUTRIENT_DIFFUSION = 0.25  # Faster spreading (was 0.15)
-        WASTE_DIFFUSION = 0.20  # Faster spreading (was 0.12)
+        ws = workspace if workspace is not None else StepWorkspace()
         
         nutrient_factor = 1.0
         waste_factor = 1.0
         
         if is_nutrients_enabled:
-            # Monod kinetics: growth limited by nutrient availability
-            nutrient_factor = self.nutrients / (K_NUTRIENT + self.nutrients)
-            
-            # CORRIGÉ : Utilise 'consuming_density' (Canal 0)
-            consumption = CONSUMPTION_RATE * consuming_density * nutrient_factor * dt 
-            self.nutrients = np.clip(self.nutrients - consumption, 0.0, 1.5)           
-            # Natural regeneration (like nutrient upwelling)
-            self.nutrients = np.clip(
-            self.nutrients + NUTRIENT_REGEN_RATE * dt, 
-                0.0, 1.5
-            )
+            nutrient_factor = self.consume_nutrients(consuming_density, dt, ws)
             
             # Diffusion spreads nutrients
-            self.nutrients = self.diffuse_field(self.nutrients, NUTRIENT_DIFFUSION)
+            self.diffuse_field(self.nutrients, self.NUTRIENT_DIFFUSION, out=self.nutrients, steps=steps)
         
         if is_waste_enabled:
-            # CORRIGÉ : Utilise 'total_density' (Tous les canaux)
-            waste_produced = WASTE_PRODUCTION_RATE * total_density * dt 
-            self.waste = np.clip(self.waste + waste_produced, 0.0, 1.5)
+            self.produce_waste(total_density, dt, ws)
             
             # Natural decay (biological/chemical breakdown)
-            self.waste = np.clip(
-                self.waste * (1.0 - WASTE_DECAY_RATE * dt),
-                0.0, 1.5
-            )
+            self.waste *= 1.0 - self.WASTE_DECAY_RATE * dt
+            np.clip(self.waste, 0.0, 1.5, out=self.waste)
             
             # Diffusion spreads waste
-            self.waste = self.diffuse_field(self.waste, WASTE_DIFFUSION)
+            self.diffuse_field(self.waste, self.WASTE_DIFFUSION, out=self.waste, steps=steps)
             
-            # Waste toxicity inhibits growth (gentler exponential)
-            waste_factor = 0.4 + 0.6 * np.exp(-2.0 * self.waste)
+            waste_factor = self.waste_toxicity(ws)
         
         return nutrient_factor, waste_factor
     # #################################################################
     # # --- FIN DU BLOC CORRIGÉ 1 ---
     # #################################################################
     
-    def update_signals(self, cell_density, dt=1.0, is_enabled=True):
+    def emit_signals(self, cell_density, dt, ws):
+        # Organisms emit signals proportional to their activity
+        signal_production = ws.like('env_tmp', self.signals)
+        np.multiply(self.SIGNAL_EMISSION_RATE, cell_density, out=signal_production)
+        signal_production *= dt
+        self.signals += signal_production
+        np.clip(self.signals, 0.0, 2.0, out=self.signals)
+
+    def signal_attraction(self, ws):
+        # Calculate growth modifier from signals
+        # Higher signals = MORE growth (attraction)
+        # This creates positive feedback -> schooling behavior!
+        signal_factor = ws.like('signal_factor', self.signals)
+        np.multiply(self.SIGNAL_STRENGTH - 1.0, self.signals, out=signal_factor)
+        signal_factor += 1.0
+        return signal_factor
+
+    def update_signals(self, cell_density, dt=1.0, is_enabled=True, workspace=None, steps=1):
         """
         Update chemical signal field
         Organisms emit signals that attract/repel others
         Creates schooling, flocking, and collective behaviors
         """
+        ws = workspace if workspace is not None else StepWorkspace()
         if not is_enabled:
-            return np.ones_like(self.signals)
+            signal_factor = ws.like('signal_factor', self.signals)
+            signal_factor.fill(1.0)
+            return signal_factor
         
-        # Signal parameters - TUNED FOR INTERESTING BEHAVIOR
-        SIGNAL_EMISSION_RATE = 0.02  # How fast organisms produce signals
-        SIGNAL_DECAY_RATE = 0.01     # How fast signals disappear
-        SIGNAL_DIFFUSION = 0.30      # How fast signals spread
-        SIGNAL_STRENGTH = 1.5        # How strongly signals affect growth (>1 = attractive)
-        
-        # Organisms emit signals proportional to their activity
-        signal_production = SIGNAL_EMISSION_RATE * cell_density * dt
-        self.signals = np.clip(self.signals + signal_production, 0.0, 2.0)
+        self.emit_signals(cell_density, dt, ws)
         
         # Natural decay (signals break down over time)
-        self.signals = np.clip(
-            self.signals * (1.0 - SIGNAL_DECAY_RATE * dt),
-            0.0, 2.0
-        )
+        self.signals *= 1.0 - self.SIGNAL_DECAY_RATE * dt
+        np.clip(self.signals, 0.0, 2.0, out=self.signals)
         
         # Diffusion spreads signals through environment
-        self.signals = self.diffuse_field(self.signals, SIGNAL_DIFFUSION)
-        
-        # Calculate growth modifier from signals
-        # Higher signals = MORE growth (attraction)
-        # This creates positive feedback -> schooling behavior!
-        signal_factor = 1.0 + (SIGNAL_STRENGTH - 1.0) * self.signals
+        self.diffuse_field(self.signals, self.SIGNAL_DIFFUSION, out=self.signals, steps=steps)
         
-        return signal_factor
+        return self.signal_attraction(ws)
     
-    def update_temperature(self, cell_density, dt=1.0, is_enabled=True):
-        """
-        Update temperature field based on metabolic heat generation and diffusion
-        Implements realistic thermodynamics for ammonia environment
-        """
-        if not is_enabled:
-            return np.ones_like(self.temperature)
-        
-        # Physical constants for ammonia environment - TUNED FOR INTERESTING BEHAVIOR
-        HEAT_GENERATION = 0.3  # Lower heat production (was 0.8)
-        THERMAL_DIFFUSION = 0.35  # Faster heat spreading (was 0.25)
-        AMBIENT_TEMP = 208.0  # Closer to optimal (was 205.0)
-        COOLING_RATE = 0.012  # Faster equilibration (was 0.008)
-        MIN_TEMP = 180.0  # Below this, everything is frozen
-        MAX_TEMP = 260.0  # Above this, ammonia boils away
-        
+    def produce_heat(self, cell_density, dt, ws):
         # Metabolic heat generation (organisms generate heat)
-        heat_production = HEAT_GENERATION * cell_density * dt
+        heat_production = ws.like('env_tmp', self.temperature)
+        np.multiply(self.HEAT_GENERATION, cell_density, out=heat_production)
+        heat_production *= dt
         self.temperature += heat_production
-        
-        # Thermal diffusion (heat spreads through ammonia)
-        self.temperature = self.diffuse_field(self.temperature, THERMAL_DIFFUSION)
-        
-        # Radiative cooling to ambient (Newton's law of cooling)
-        cooling = (self.temperature - AMBIENT_TEMP) * COOLING_RATE * dt
-        self.temperature -= cooling
-        
+
+    def temperature_response(self, ws):
         # Clamp to physical limits
-        self.temperature = np.clip(self.temperature, MIN_TEMP, MAX_TEMP)
+        np.clip(self.temperature, self.MIN_TEMP, self.MAX_TEMP, out=self.temperature)
         
         # Calculate temperature-dependent growth factor
         # Ammonia liquid range: 195K - 240K, optimal around 210K
@@ -315,63 +933,223 @@ class Board:
         TEMP_WIDTH = 25.0  # WIDER tolerance (was 15.0)
         
         # Gaussian-like response curve centered on optimal temperature
-        temp_factor = np.exp(-((self.temperature - OPTIMAL_TEMP) / TEMP_WIDTH) ** 2)
+        temp_factor = ws.like('temp_factor', self.temperature)
+        np.subtract(self.temperature, OPTIMAL_TEMP, out=temp_factor)
+        temp_factor /= TEMP_WIDTH
+        np.square(temp_factor, out=temp_factor)
+        np.negative(temp_factor, out=temp_factor)
+        np.exp(temp_factor, out=temp_factor)
         
         # More gradual death outside viable range
         # Soft boundaries instead of hard cutoffs
-        too_cold = self.temperature < 195.0
-        too_hot = self.temperature > 240.0
         # Instead of instant death, apply strong penalty
-        temp_factor[too_cold] *= 0.1  # 10% survival in cold
-        temp_factor[too_hot] *= 0.1   # 10% survival in heat
+        mask = ws.like('env_mask', self.temperature, bool)
+        too_cold = np.less(self.temperature, 195.0, out=mask)
+        np.multiply(temp_factor, 0.1, out=temp_factor, where=too_cold)  # 10% survival in cold
+        too_hot = np.greater(self.temperature, 240.0, out=mask)
+        np.multiply(temp_factor, 0.1, out=temp_factor, where=too_hot)   # 10% survival in heat
         # (was: temp_factor[too_cold | too_hot] = 0.0)
         
         return temp_factor
+
+    def update_temperature(self, cell_density, dt=1.0, is_enabled=True, workspace=None, steps=1):
+        """
+        Update temperature field based on metabolic heat generation and diffusion
+        Implements realistic thermodynamics for ammonia environment
+        """
+        ws = workspace if workspace is not None else StepWorkspace()
+        if not is_enabled:
+            temp_factor = ws.like('temp_factor', self.temperature)
+            temp_factor.fill(1.0)
+            return temp_factor
+        
+        self.produce_heat(cell_density, dt, ws)
+        
+        # Thermal diffusion (heat spreads through ammonia)
+        self.diffuse_field(self.temperature, self.THERMAL_DIFFUSION, out=self.temperature, steps=steps)
+        
+        # Radiative cooling to ambient (Newton's law of cooling)
+        cooling = ws.like('env_tmp', self.temperature)
+        np.subtract(self.temperature, self.AMBIENT_TEMP, out=cooling)
+        cooling *= self.COOLING_RATE
+        cooling *= dt
+        self.temperature -= cooling
+        
+        return self.temperature_response(ws)
+
+    @staticmethod
+    def gaussian_transfer(sigma, shape):
+        # DFT of the wrapped Gaussian filter of diffuse_field() on the rfftn half spectrum of shape
+        G = np.ones(())
+        for axis, size in enumerate(shape):
+            g = np.zeros(size)
+            if sigma > 0:
+                weights = Board.get_gaussian_weights(sigma)
+                radius = len(weights) // 2
+                np.add.at(g, np.arange(-radius, radius+1) % size, weights)
+            else:
+                g[0] = 1
+            g = np.fft.rfft(g).real if axis == len(shape) - 1 else np.fft.fft(g).real
+            G = np.multiply.outer(G, g)
+        return G
+
+    def env_transfer(self, fields, dt, steps=1, is_repeated=False):
+        # stacked transfer functions of the linear part (diffusion, decay, cooling) of each field update,
+        # with is_repeated that of steps updates of dt / steps in a row instead of one update widened to cover them
+        shape = self.nutrients.shape[self.batch_dims:]
+        key = (tuple(fields), shape, dt, steps, is_repeated, self.batch_dims, self.nutrients.dtype.str, self.env_scale)
+        if key not in Board.env_transfer_cache:
+            repeat = steps if is_repeated else 1
+            dt, steps = dt / repeat, steps / repeat
+            linear = {
+                'temperature': (self.THERMAL_DIFFUSION, 1.0 - self.COOLING_RATE * dt),
+                'nutrients': (self.NUTRIENT_DIFFUSION, 1.0),
+                'waste': (self.WASTE_DIFFUSION, 1.0 - self.WASTE_DECAY_RATE * dt),
+                'signals': (self.SIGNAL_DIFFUSION, 1.0 - self.SIGNAL_DECAY_RATE * dt)}
+            H = np.stack([(factor * Board.gaussian_transfer(sigma * np.sqrt(steps) / self.env_scale, shape)) ** repeat for sigma, factor in [linear[name] for name in fields]])
+            Board.env_transfer_cache[key] = H.reshape((len(fields),) + (1,) * self.batch_dims + H.shape[1:]).astype(self.nutrients.dtype)
+        return Board.env_transfer_cache[key]
+
+    def update_environment_spectral(self, consuming_density, total_density, dt=1.0, is_temperature_enabled=True,
+            is_nutrients_enabled=True, is_waste_enabled=True, is_signals_enabled=True, workspace=None, fft_backend=None, steps=1, is_repeated=False):
+        """
+        Same updates as update_temperature(), update_nutrients_and_waste() and update_signals(),
+        with their linear parts (diffusion, decay, Newton cooling) applied as one transfer function per field
+        on the stacked fields in a single real FFT round trip
+        With is_repeated, the linear parts are those of steps generations in a row (see env_transfer()), for fields without sources
+        Returns temp_factor, nutrient_factor, waste_factor, signal_factor
+        """
+        ws = workspace if workspace is not None else StepWorkspace()
+        fft_backend = fft_backend or FFTBackend.get(self.config.FFT_BACKEND, self.config.FFT_WORKERS)
+        temp_factor, nutrient_factor, waste_factor, signal_factor = None, 1.0, 1.0, None
+
+        # sources and sinks (clipped before diffusion as in the separate updates)
+        fields = []
+        if is_temperature_enabled:
+            self.produce_heat(total_density, dt, ws)
+            fields.append('temperature')
+        if is_nutrients_enabled:
+            nutrient_factor = self.consume_nutrients(consuming_density, dt, ws)
+            fields.append('nutrients')
+        if is_waste_enabled:
+            self.produce_waste(total_density, dt, ws)
+            fields.append('waste')
+        if is_signals_enabled:
+            self.emit_signals(total_density, dt, ws)
+            fields.append('signals')
+
+        # decay keeps the clipped fields in range, so it can be merged with diffusion
+        if fields:
+            shape = self.nutrients.shape
+            axes = tuple(range(1 + self.batch_dims, 1 + len(shape)))
+            stack = ws.get('env_stack', (len(fields),) + shape, self.nutrients.dtype)
+            for i, name in enumerate(fields):
+                np.copyto(stack[i], getattr(self, name))
+            spectrum_shape = stack.shape[:-1] + (shape[-1] // 2 + 1,)
+            spectrum = fft_backend.rfftn(stack, axes=axes, out=ws.get('env_spectrum', spectrum_shape, np.result_type(stack.dtype, np.complex64)))
+            spectrum *= self.env_transfer(fields, dt, steps, is_repeated)
+            fft_backend.irfftn(spectrum, s=shape[self.batch_dims:], axes=axes, out=stack, scratch=ws.like('env_spectrum_tmp', spectrum))
+            for i, name in enumerate(fields):
+                np.copyto(getattr(self, name), stack[i])
+
+        if is_temperature_enabled:
+            # constant part of Newton cooling
+            if is_repeated:
+                self.temperature += self.AMBIENT_TEMP * (1.0 - (1.0 - self.COOLING_RATE * dt / steps) ** steps)
+            else:
+                self.temperature += self.AMBIENT_TEMP * self.COOLING_RATE * dt
+            temp_factor = self.temperature_response(ws)
+        else:
+            temp_factor = ws.like('temp_factor', self.temperature)
+            temp_factor.fill(1.0)
+        if is_waste_enabled:
+            waste_factor = self.waste_toxicity(ws)
+        if is_signals_enabled:
+            signal_factor = self.signal_attraction(ws)
+        else:
+            signal_factor = ws.like('signal_factor', self.signals)
+            signal_factor.fill(1.0)
+        return temp_factor, nutrient_factor, waste_factor, signal_factor
     
-    def apply_convection(self, dt=1.0, is_enabled=True):
+    def apply_convection(self, dt=1.0, is_enabled=True, workspace=None, tiles=None, is_cells=True):
         """
         Apply thermal convection - temperature gradients drive fluid motion
         Hot ammonia rises, cold ammonia sinks, carrying organisms with it
+        Semi-Lagrangian: one displacement field per step, cells and fields sampled back along it
+        With tiles (ActiveTiles), cells only move inside the active tiles, the rest of the world being empty
+        With is_cells False, only the environment fields move (outside an AdaptiveWindow)
         """
-        if not is_enabled or DIM != 2:
+        if not is_enabled or self.config.DIM != 2:
             return
+        ws = workspace if workspace is not None else StepWorkspace()
         
         CONVECTION_STRENGTH = 0.008  # Much weaker (was 0.025) - subtle effect
         
-        # Calculate temperature gradient (direction of heat flow)
-        grad_temp = np.gradient(self.temperature)
-        
-        # Convection moves organisms against the gradient (hot rises, cold sinks)
-        # In 2D: [y_gradient, x_gradient]
-        shift_y = -grad_temp[0] * CONVECTION_STRENGTH * dt
-        shift_x = -grad_temp[1] * CONVECTION_STRENGTH * dt
+        # Calculate temperature gradient (direction of heat flow), per cell on a coarse environment grid
+        axes = tuple(range(self.batch_dims, self.temperature.ndim))
+        grad_temp = np.gradient(self.temperature, axis=axes)
+
+        # Convection moves organisms against the gradient (hot rises, cold sinks):
+        # each point takes the value found upstream at x + grad * strength * dt
+        disp = ws.get('convection_disp', (len(axes),) + self.temperature.shape, self.temperature.dtype)
+        for d, grad in zip(disp, grad_temp):
+            np.multiply(grad, CONVECTION_STRENGTH * dt / self.env_scale, out=d)
+        if not disp.any():
+            return  # uniform temperature, nothing moves
         
-        # Apply advection to all channels
-        for c in range(len(self.cells)):
-            try:
-                self.cells[c] = scipy.ndimage.shift(
-                    self.cells[c], 
-                    [shift_y, shift_x],
-                    mode='wrap',  # Periodic boundaries
-                    order=1  # Linear interpolation
-                )
-            except:
-                pass  # Skip if dimensions don't match
-        
-        # Nutrients and waste also get transported by convection
-        try:
-            self.nutrients = scipy.ndimage.shift(
-                self.nutrients, [shift_y, shift_x], mode='wrap', order=1
-            )
-            self.waste = scipy.ndimage.shift(
-                self.waste, [shift_y, shift_x], mode='wrap', order=1
-            )
-            # Signals also get transported by convection
-            self.signals = scipy.ndimage.shift(
-                self.signals, [shift_y, shift_x], mode='wrap', order=1
-            )
-        except:
-            pass
+        # Nutrients, waste and signals are transported with the organisms
+        env_fields = [self.nutrients, self.waste, self.signals]
+        if tiles is not None or not is_cells:
+            if is_cells:
+                self.advect_tiles(self.cells, disp, tiles, ws)
+            if self.env_scale > 1:
+                disp /= self.env_scale
+            self.advect(env_fields, disp, ws)
+        elif self.env_scale == 1:
+            self.advect(self.cells + env_fields, disp, ws)
+        else:
+            # coarse environment grid: cells follow the interpolated displacement, fields move in grid units
+            cell_disp = Board.prolong(disp, self.env_scale, 1 + self.batch_dims,
+                out=ws.get('convection_cell_disp', disp.shape[:1 + self.batch_dims] + self.cells[0].shape[self.batch_dims:], disp.dtype))
+            self.advect(self.cells, cell_disp, ws)
+            disp /= self.env_scale
+            self.advect(env_fields, disp, ws)
+
+    def advect(self, fields, disp, ws):
+        # sample same-shape fields at x + disp with periodic linear interpolation (in place),
+        # one coordinate array per world shared by all fields
+        spatial = fields[0].shape[self.batch_dims:]
+        coords = ws.get('advect_coords', (len(spatial),) + spatial, np.float64)
+        out = ws.get('advect_out', spatial, fields[0].dtype)
+        grid = np.ogrid[tuple(slice(0, n) for n in spatial)]
+        for b in np.ndindex(fields[0].shape[:self.batch_dims]):
+            for C, X, d in zip(coords, grid, disp):
+                np.add(X, d[b], out=C)
+            for F in fields:
+                scipy.ndimage.map_coordinates(F[b], coords, output=out, order=1, mode='grid-wrap')
+                np.copyto(F[b], out)
+    
+    def advect_tiles(self, fields, disp, tiles, ws):
+        # advect() of single-world cell fields over the active tiles only, disp on the environment grid;
+        # every tile is sampled before any is written back
+        spatial = fields[0].shape
+        out = ws.get('advect_tiles_out', (len(tiles.active), len(fields)) + (tiles.tile,) * len(spatial), fields[0].dtype)
+        tile_disp = ws.get('advect_tiles_disp', (len(spatial),) + (tiles.tile,) * len(spatial), disp.dtype)
+        for i, index in enumerate(tiles.active):
+            region = tiles.region(index)
+            for d, D in zip(tile_disp, disp):
+                if self.env_scale == 1:
+                    np.copyto(d, D[region])
+                else:
+                    tiles.sample(D, index, self.env_scale, d)
+            for d, X in zip(tile_disp, np.ogrid[region]):
+                d += X
+            for F, F_out in zip(fields, out[i]):
+                scipy.ndimage.map_coordinates(F, tile_disp, output=F_out, order=1, mode='grid-wrap')
+        for i, index in enumerate(tiles.active):
+            region = tiles.region(index)
+            for F, F_out in zip(fields, out[i]):
+                np.copyto(F[region], F_out)
     
     def setup_environmental_features(self, num_vents=3, num_cold_zones=2):
         """
@@ -380,16 +1158,19 @@ class Board:
         - Cold zones (ice patches)
         - Hot zones (geothermal activity)
         """
+        # Features are drawn at cell resolution, restricted to a coarse environment grid on the next step
+        self.sync_env_scale(1)
+
         # Initialize source/sink arrays
         self.nutrient_sources = np.zeros_like(self.nutrients)
         self.heat_sources = np.zeros_like(self.temperature)
         
         # Create nutrient vents (constant replenishment zones)
         for _ in range(num_vents):
-            if DIM == 2:
-                x, y = np.random.randint(0, SIZE[0]), np.random.randint(0, SIZE[1])
+            if self.config.DIM == 2:
+                x, y = np.random.randint(0, self.config.SIZE[0]), np.random.randint(0, self.config.SIZE[1])
                 radius = 15
-                y_grid, x_grid = np.ogrid[:SIZE[1], :SIZE[0]]
+                y_grid, x_grid = np.ogrid[:self.config.SIZE[1], :self.config.SIZE[0]]
                 mask = (x_grid - x)**2 + (y_grid - y)**2 <= radius**2
                 self.nutrient_sources[mask] = 0.03  # Slow but constant replenishment
                 # Vents also produce heat
@@ -397,25 +1178,66 @@ class Board:
         
         # Create cold zones (ice patches - nutrient-poor, cold)
         for _ in range(num_cold_zones):
-            if DIM == 2:
-                x, y = np.random.randint(0, SIZE[0]), np.random.randint(0, SIZE[1])
+            if self.config.DIM == 2:
+                x, y = np.random.randint(0, self.config.SIZE[0]), np.random.randint(0, self.config.SIZE[1])
                 width, height = 40, 30
-                x1, x2 = max(0, x-width//2), min(SIZE[0], x+width//2)
-                y1, y2 = max(0, y-height//2), min(SIZE[1], y+height//2)
+                x1, x2 = max(0, x-width//2), min(self.config.SIZE[0], x+width//2)
+                y1, y2 = max(0, y-height//2), min(self.config.SIZE[1], y+height//2)
                 self.temperature[y1:y2, x1:x2] -= 18.0  # Significantly colder
                 self.nutrients[y1:y2, x1:x2] *= 0.3  # Less nutrients in ice
     
-    def apply_environmental_features(self, dt=1.0):
+    def setup_environmental_scenario(self, scenario='default'):
+        """
+        Set up interesting environmental scenarios
+        
+        Available scenarios:
+        - 'default': uniform environment
+        - 'vents': nutrient vents and cold zones (hydrothermal vents on ice moon)
+        - 'gradient': temperature gradient (hot to cold)
+        - 'islands': nutrient islands in desert
+        """
+        if scenario not in self.SCENARIOS:
+            raise ValueError('unknown scenario {!r}, expected one of {}'.format(scenario, ', '.join(self.SCENARIOS)))
+        DIM, SIZE = self.config.DIM, self.config.SIZE
+        self.sync_env_scale(1)
+        if scenario == 'vents':
+            self.setup_environmental_features(num_vents=3, num_cold_zones=2)
+        
+        elif scenario == 'gradient':
+            # Create temperature gradient
+            if DIM == 2:
+                gradient = np.linspace(200, 220, SIZE[1])
+                self.temperature = np.tile(gradient[:, np.newaxis], (1, SIZE[0])).astype(self.dtype)
+        
+        elif scenario == 'islands':
+            # Create nutrient islands
+            self.nutrients *= 0.2  # Low baseline
+            num_islands = 5
+            for _ in range(num_islands):
+                if DIM == 2:
+                    x, y = np.random.randint(0, SIZE[0]), np.random.randint(0, SIZE[1])
+                    radius = 25
+                    y_grid, x_grid = np.ogrid[:SIZE[1], :SIZE[0]]
+                    mask = (x_grid - x)**2 + (y_grid - y)**2 <= radius**2
+                    self.nutrients[mask] = 1.0
+        
+        elif scenario == 'default':
+            # Reset to uniform
+            self.nutrients = np.ones(SIZE, dtype=self.dtype)
+            self.waste = np.zeros(SIZE, dtype=self.dtype)
+            self.temperature = np.full(SIZE, 210.0, dtype=self.dtype)
+    
+    def apply_environmental_features(self, dt=1.0, workspace=None):
         """Apply continuous environmental forcing (vents, cooling, etc.)"""
+        ws = workspace if workspace is not None else StepWorkspace()
         if hasattr(self, 'nutrient_sources'):
-            self.nutrients = np.clip(
-                self.nutrients + self.nutrient_sources * dt,
-                0.0, 1.5
-            )
+            forcing = np.multiply(self.nutrient_sources, dt, out=ws.like('env_tmp', self.nutrients))
+            self.nutrients += forcing
+            np.clip(self.nutrients, 0.0, 1.5, out=self.nutrients)
         if hasattr(self, 'heat_sources'):
-            self.temperature += self.heat_sources * dt
+            self.temperature += np.multiply(self.heat_sources, dt, out=ws.like('env_tmp', self.temperature))
     
-    def get_adaptive_growth_modulation(self):
+    def get_adaptive_growth_modulation(self, workspace=None):
         """
         Calculate adaptive behavioral modulation based on local environment
         Simulates organism behaviors: REST (high nutrients), HUNT (low nutrients), FLEE (high waste)
@@ -426,36 +1248,41 @@ class Board:
         - HUNT: Organisms move to find food, asymmetric growth encouraged
         - FLEE: Organisms avoid toxic zones, reduced growth forces movement
         """
+        ws = workspace if workspace is not None else StepWorkspace()
+        mask = ws.like('env_mask', self.nutrients, bool)
+        mask2 = ws.like('env_mask2', self.nutrients, bool)
+
         # Start with neutral modulation
-        modulation = np.ones_like(self.nutrients)
+        modulation = ws.like('behavior_modulation', self.nutrients)
+        modulation.fill(1.0)
         
         # BEHAVIOR: REST - High nutrients (>0.7)
         # Effect: Enhanced growth (+20%), organisms "feed" and stay in place
-        rest_zones = self.nutrients > 0.7
-        modulation[rest_zones] *= 1.2
+        rest_zones = np.greater(self.nutrients, 0.7, out=mask)
+        np.multiply(modulation, 1.2, out=modulation, where=rest_zones)
         
         # BEHAVIOR: HUNT - Low nutrients (<0.3), low waste (<0.4)
         # Effect: Slightly reduced growth (-10%), encourages asymmetric forms (movement)
-        hunt_zones = (self.nutrients < 0.3) & (self.waste < 0.4)
-        modulation[hunt_zones] *= 0.9
+        hunt_zones = np.logical_and(np.less(self.nutrients, 0.3, out=mask), np.less(self.waste, 0.4, out=mask2), out=mask)
+        np.multiply(modulation, 0.9, out=modulation, where=hunt_zones)
         
         # BEHAVIOR: FLEE - High waste (>0.6)
         # Effect: Strongly reduced growth (-40%), creates pressure to escape
-        flee_zones = self.waste > 0.6
-        modulation[flee_zones] *= 0.6
+        flee_zones = np.greater(self.waste, 0.6, out=mask)
+        np.multiply(modulation, 0.6, out=modulation, where=flee_zones)
         
         return modulation
 
     @classmethod
-    def from_data(cls, data):
-        self = cls()
+    def from_data(cls, data, config=None):
+        self = cls(config=config)
         self.names = {'code':data.get('code',''), 'name':data.get('name',''), 'cname':data.get('cname','')}
         self.settings = data.get('settings', None)
         self.model = data.get('model', None)
         params = data.get('params')
         if params is not None:
             if type(params) not in [list]:
-                params = [params for k in KERNEL]
+                params = [params for k in self.config.KERNEL]
             self.params = [Board.data2params(p) for p in params]
             if 'c0' not in self.params[0]:  # compatibility before v3.6.1 free_b
                 if 'c' in self.params[0]:
@@ -465,7 +1292,7 @@ class Board:
                     self.init_channels()
             if self.model is None:  # compatibility before v3.5.2 add model
                 self.model = {}
-                for k, default in zip(('R', 'T', 'P', 'kn', 'gn'), (DEF_R, 10, 0, 1, 1)):
+                for k, default in zip(('R', 'T', 'P', 'kn', 'gn'), (self.config.DEF_R, 10, 0, 1, 1)):
                     self.model[k] = self.params[0].get(k, default)
                 for p in self.params:
                     for k in ('R', 'T', 'kn', 'gn'):
@@ -478,9 +1305,9 @@ class Board:
         rle = data.get('cells')
         if rle is not None:
             if type(rle) not in [list]:
-                rle = [rle for c in CHANNEL]
-            self.cells = [Board.rle2cells(r) for r in rle]
-            for c in range(CN - len(self.cells)):
+                rle = [rle for c in self.config.CHANNEL]
+            self.cells = [Board.rle2cells(r, dtype=self.dtype, ndim=self.config.DIM) for r in rle]
+            for c in range(self.config.CN - len(self.cells)):
                 self.split_channel(len(self.cells)-1)  #(c)
             #self.split_channel(0)
             #self.split_channel(2)
@@ -490,14 +1317,14 @@ class Board:
         return self
 
     def to_data(self, is_shorten=True):
-        rle = [Board.cells2rle(self.cells[c], is_shorten) for c in CHANNEL]
-        params = [Board.params2data(self.params[k]) for k in KERNEL]
+        rle = [Board.cells2rle(self.cells[c], is_shorten) for c in self.config.CHANNEL]
+        params = [Board.params2data(self.params[k]) for k in self.config.KERNEL]
         data = {'code':self.names['code'], 'name':self.names['name'], 'cname':self.names['cname'], 'settings':self.settings, 'model':self.model, 'params':params, 'cells':rle}
         return data
 
     def free_h(self):
         # h -> h / sum(h over same c1)
-        Dn = [0 for c in CHANNEL]
+        Dn = [0 for c in self.config.CHANNEL]
         max_h = 0
         for p in self.params:
             Dn[p['c1']] += p['h']
@@ -529,7 +1356,7 @@ class Board:
             else:
                 return ','.join(["{k}={v}".format(k=k,v=str(v)) for (k,v) in params2.items()])  #if k not in ('kn', 'gn')
         else:
-            st = ['{' + self.params2st(self.params[k]) + '}' for k in KERNEL]
+            st = ['{' + self.params2st(self.params[k]) + '}' for k in self.config.KERNEL]
             return ', '.join(st)
 
     def long_name(self):
@@ -550,18 +1377,18 @@ class Board:
         else: return chr(ord('p') + (v-25)//24) + chr(ord('A') + (v-25)%24)
 
     @staticmethod
-    def _recur_drill_list(dim, lists, row_func):
-        if dim < DIM-1:
-            return [Board._recur_drill_list(dim+1, e, row_func) for e in lists]
+    def _recur_drill_list(dim, lists, row_func, ndim):
+        if dim < ndim-1:
+            return [Board._recur_drill_list(dim+1, e, row_func, ndim) for e in lists]
         else:
             return row_func(lists)
 
     @staticmethod
-    def _recur_join_st(dim, lists, row_func):
-        if dim < DIM-1:
-            return DIM_DELIM[DIM-1-dim].join(Board._recur_join_st(dim+1, e, row_func) for e in lists)
+    def _recur_join_st(dim, lists, row_func, ndim):
+        if dim < ndim-1:
+            return DIM_DELIM[ndim-1-dim].join(Board._recur_join_st(dim+1, e, row_func, ndim) for e in lists)
         else:
-            return DIM_DELIM[DIM-1-dim].join(row_func(lists))
+            return DIM_DELIM[ndim-1-dim].join(row_func(lists))
 
     @staticmethod
     def _append_stack(list1, list2, count, is_repeat=False):
@@ -571,19 +1398,19 @@ class Board:
             list1.extend([repeated] * (int(count)-1))
 
     @staticmethod
-    def _recur_get_max_lens(dim, list1, max_lens):
+    def _recur_get_max_lens(dim, list1, max_lens, ndim):
         max_lens[dim] = max(max_lens[dim], len(list1))
-        if dim < DIM-1:
+        if dim < ndim-1:
             for list2 in list1:
-                Board._recur_get_max_lens(dim+1, list2, max_lens)
+                Board._recur_get_max_lens(dim+1, list2, max_lens, ndim)
 
     @staticmethod
-    def _recur_cubify(dim, list1, max_lens):
+    def _recur_cubify(dim, list1, max_lens, ndim):
         more = max_lens[dim] - len(list1)
-        if dim < DIM-1:
+        if dim < ndim-1:
             list1.extend([[]] * more)
             for list2 in list1:
-                Board._recur_cubify(dim+1, list2, max_lens)
+                Board._recur_cubify(dim+1, list2, max_lens, ndim)
         else:
             list1.extend([0] * more)
 
@@ -591,18 +1418,19 @@ class Board:
     def cells2rle(A, is_shorten=True):
         values = np.rint(A*255).astype(int).tolist()  # [[255 255] [255 0]]
         if is_shorten:
-            rle_groups = Board._recur_drill_list(0, values, lambda row: [( len(list(g)), Board.val2ch(v).strip() ) for v,g in itertools.groupby(row)] )
-            st = Board._recur_join_st(0, rle_groups, lambda row: [(str(n) if n>1 else '')+c for n,c in row] )  # "2 yO $ 1 yO"
+            rle_groups = Board._recur_drill_list(0, values, lambda row: [( len(list(g)), Board.val2ch(v).strip() ) for v,g in itertools.groupby(row)], A.ndim)
+            st = Board._recur_join_st(0, rle_groups, lambda row: [(str(n) if n>1 else '')+c for n,c in row], A.ndim)  # "2 yO $ 1 yO"
         else:
-            st = Board._recur_join_st(0, values, lambda row: [Board.val2ch(v) for v in row] )
+            st = Board._recur_join_st(0, values, lambda row: [Board.val2ch(v) for v in row], A.ndim)
         return st + '!'
 
     @staticmethod
-    def rle2cells(st):
-        stacks = [[] for dim in range(DIM)]
+    def rle2cells(st, dtype=None, ndim=None):
+        ndim = ndim or DIM
+        stacks = [[] for dim in range(ndim)]
         last, count = '', ''
         delims = list(DIM_DELIM.values())
-        st = st.rstrip('!') + DIM_DELIM[DIM-1]
+        st = st.rstrip('!') + DIM_DELIM[ndim-1]
         for ch in st:
             if ch.isdigit(): count += ch
             elif ch in 'pqrstuvwxy@': last = ch
@@ -616,11 +1444,11 @@ class Board:
                         stacks[d] = []
                     #print("{0}[{1}] {2}".format(last+ch, count, [np.asarray(s).shape for s in stacks]))
                 last, count = '', ''
-        A = stacks[DIM-1]
-        max_lens = [0 for dim in range(DIM)]
-        Board._recur_get_max_lens(0, A, max_lens)
-        Board._recur_cubify(0, A, max_lens)
-        return np.asarray(A)
+        A = stacks[ndim-1]
+        max_lens = [0 for dim in range(ndim)]
+        Board._recur_get_max_lens(0, A, max_lens, ndim)
+        Board._recur_cubify(0, A, max_lens, ndim)
+        return np.asarray(A, dtype=dtype or DTYPE)
 
     @staticmethod
     def fracs2st(B):
@@ -651,7 +1479,7 @@ class Board:
         return p2
 
     def clear(self):
-        for c in CHANNEL:
+        for c in self.config.CHANNEL:
             self.cells[c].fill(0)
 
     def _recur_add(self, dim, cells1, cells2, shift, is_centered, vmin):
@@ -659,7 +1487,7 @@ class Board:
         size0 = min(size1, size2)
         start1 = (size1 - size0)//2 + shift[dim] if is_centered else shift[dim]
         start2 = (size2 - size0)//2 if is_centered else 0
-        if dim < DIM-1:
+        if dim < self.config.DIM-1:
             for x in range(size0):
                 self._recur_add(dim+1, cells1[(start1+x)%size1], cells2[start2+x], shift, is_centered, vmin)
         else:
@@ -680,45 +1508,45 @@ class Board:
 
         # assert self.params['R'] == part.params['R']
         if type(shift[0]) not in [list]:
-            shift = [shift for c in CHANNEL]
+            shift = [shift for c in self.config.CHANNEL]
         vmin = part.model.get('vmin', EPSILON)
-        for c in CHANNEL:
+        for c in self.config.CHANNEL:
             self._recur_add(0, self.cells[c], part.cells[c], shift[c], is_centered, vmin)
         return self
 
     def transform(self, tx, mode='RZSF', z_axis=Z_AXIS, is_world=False):
         if 'R' in mode and tx['rotate'] != [0]*3:
-            for c in CHANNEL:
-                if DIM == 2:
+            for c in self.config.CHANNEL:
+                if self.config.DIM == 2:
                     self.cells[c] = scipy.ndimage.rotate(self.cells[c], -tx['rotate'][1], reshape=not is_world, order=0, mode='wrap' if is_world else 'constant')
-                elif DIM >= 3:
+                elif self.config.DIM >= 3:
                     self.cells[c] = scipy.ndimage.rotate(self.cells[c], tx['rotate'][2], axes=(X_AXIS, z_axis), reshape=not is_world, order=0, mode='wrap' if is_world else 'constant')  # rotate by y axis = x-z plane
                     self.cells[c] = scipy.ndimage.rotate(self.cells[c], tx['rotate'][1], axes=(z_axis, Y_AXIS), reshape=not is_world, order=0, mode='wrap' if is_world else 'constant')  # rotate by x axis = z-y plane
                     self.cells[c] = scipy.ndimage.rotate(self.cells[c], tx['rotate'][0], axes=(Y_AXIS, X_AXIS), reshape=not is_world, order=0, mode='wrap' if is_world else 'constant')  # rotate by z axis = y-x plane
         if 'Z' in mode and tx['R'] != self.model['R']:
             # print("* {} / {}".format(tx['R'], self.params['R']))
             shape_orig = self.cells[0].shape
-            for c in CHANNEL:
+            for c in self.config.CHANNEL:
                 self.cells[c] = scipy.ndimage.zoom(self.cells[c], tx['R'] / self.model['R'], order=0)
             if is_world:
-                self.cells = Board(shape_orig).add(self).cells
+                self.cells = Board(shape_orig, dtype=self.dtype, config=self.config).add(self).cells
             self.model['R'] = tx['R']
         if 'F' in mode and tx['flip'] != -1:
-            extra_slice = [slice(None)] * (DIM-2)
-            for c in CHANNEL:
-                if tx['flip'] in [0,1]: self.cells[c] = np.flip(self.cells[c], axis=DIM-1-tx['flip'])
-                elif tx['flip'] == 2: slice1 = [slice(None), slice(None,-MIDX-1,-1)]; slice2 = [slice(None), slice(None,MIDX)]; self.cells[c][tuple(extra_slice + slice1)] = self.cells[c][tuple(extra_slice + slice2)]
-                elif tx['flip'] == 3: slice1 = [slice(None), slice(None,-MIDX-1,-1)]; slice2 = [slice(None,None,-1), slice(None,MIDX)]; self.cells[c][tuple(extra_slice + slice1)] = self.cells[c][tuple(extra_slice + slice2)]
+            extra_slice = [slice(None)] * (self.config.DIM-2)
+            for c in self.config.CHANNEL:
+                if tx['flip'] in [0,1]: self.cells[c] = np.flip(self.cells[c], axis=self.config.DIM-1-tx['flip'])
+                elif tx['flip'] == 2: slice1 = [slice(None), slice(None,-self.config.MIDX-1,-1)]; slice2 = [slice(None), slice(None,self.config.MIDX)]; self.cells[c][tuple(extra_slice + slice1)] = self.cells[c][tuple(extra_slice + slice2)]
+                elif tx['flip'] == 3: slice1 = [slice(None), slice(None,-self.config.MIDX-1,-1)]; slice2 = [slice(None,None,-1), slice(None,self.config.MIDX)]; self.cells[c][tuple(extra_slice + slice1)] = self.cells[c][tuple(extra_slice + slice2)]
                 # elif tx['flip'] == 4: i_upper = np.triu_indices(SIZEX, -1); self.cells[i_upper] = self.cells.T[i_upper]
-                elif tx['flip'] == 4: self.cells[c][tuple(extra_slice + [slice(None), slice(MIDX,None)])] = 0
-                elif tx['flip'] == 5: self.cells[c][tuple(extra_slice + [slice(MIDY,None), slice(None)])] = 0
+                elif tx['flip'] == 4: self.cells[c][tuple(extra_slice + [slice(None), slice(self.config.MIDX,None)])] = 0
+                elif tx['flip'] == 5: self.cells[c][tuple(extra_slice + [slice(self.config.MIDY,None), slice(None)])] = 0
                 elif tx['flip'] == 6: 
-                    self.cells[c][tuple(extra_slice + [slice(None,MIDY//2), slice(None)])] = 0
-                    self.cells[c][tuple(extra_slice + [slice(MIDY+MIDY//2,None), slice(None)])] = 0
-                    self.cells[c][tuple(extra_slice + [slice(None), slice(None,MIDX//2)])] = 0
-                    self.cells[c][tuple(extra_slice + [slice(None), slice(MIDX+MIDX//2,None)])] = 0
-        if 'S' in mode and tx['shift'] != [0]*DIM:
-            for c in CHANNEL:
+                    self.cells[c][tuple(extra_slice + [slice(None,self.config.MIDY//2), slice(None)])] = 0
+                    self.cells[c][tuple(extra_slice + [slice(self.config.MIDY+self.config.MIDY//2,None), slice(None)])] = 0
+                    self.cells[c][tuple(extra_slice + [slice(None), slice(None,self.config.MIDX//2)])] = 0
+                    self.cells[c][tuple(extra_slice + [slice(None), slice(self.config.MIDX+self.config.MIDX//2,None)])] = 0
+        if 'S' in mode and tx['shift'] != [0]*self.config.DIM:
+            for c in self.config.CHANNEL:
                 self.cells[c] = scipy.ndimage.shift(self.cells[c], tx['shift'], order=0, mode='wrap')
                 # self.cells = np.roll(self.cells, tx['shift'], (2, 1, 0))
         return self
@@ -730,15 +1558,15 @@ class Board:
 
     def crop(self):
         #vmin = np.amin(self.cells)
-        coords_list = [np.argwhere(self.cells[c] > ALIVE_THRESHOLD) for c in CHANNEL]
+        coords_list = [np.argwhere(self.cells[c] > ALIVE_THRESHOLD) for c in self.config.CHANNEL]
         coords = np.concatenate(coords_list)
         if coords.size == 0:
-            self.cells = [np.zeros([1]*DIM) for c in CHANNEL]
+            self.cells = [np.zeros([1]*self.config.DIM, dtype=self.dtype) for c in self.config.CHANNEL]
         else:
             min_point = coords.min(axis=0)
             max_point = coords.max(axis=0) + 1
             slices = [slice(x1, x2) for x1, x2 in zip(min_point, max_point)]
-            for c in CHANNEL:
+            for c in self.config.CHANNEL:
                 self.cells[c] = self.cells[c][tuple(slices)]
         return self
 
@@ -781,7 +1609,7 @@ class Board:
             c0, c1 = p.get('c0', 0), p.get('c1', 0)
             if c0==old_ch and c1==old_ch:
                 p2 = self.copy_kernel(p, src=new_ch, dest=new_ch)
-                if self_split_count<XN:
+                if self_split_count<self.config.XN:
                     self.split_kernel(p, dest=new_ch)
                     self.split_kernel(p2, dest=old_ch)
                     self_split_count += 1
@@ -799,6 +1627,17 @@ class Automaton:
         3: lambda r, q=1/4: (r>=q)*(r<=1-q),  # step (stpz1/4)
         4: lambda r: (r>0)*(r<1) * np.exp(- ((r-0.5)/0.15)**2 / 2)  # exponential / leaky gaussian bump
     }
+    # settings passed on to the inner automata of a window or of slabs, see calc_window() and SlabAutomaton
+    STEP_SETTINGS = ('soft_clip_level', 'is_arita_mode', 'arita_layers', 'mask_rate', 'add_noise', 'is_inverted',
+        'is_temperature_enabled', 'is_nutrients_enabled', 'is_waste_enabled', 'is_signals_enabled', 'is_behavior_enabled',
+        'is_jit', 'is_spectral_env', 'env_intervals', 'is_kernel_stack')
+    # growth functions fused by jit_growth(), the exponential ones (gn 2, 4) run faster with NumPy's vectorized exp
+    JIT_GROWTH_GN = (1,)
+    geometry_cache = {}  # (shape, R, polar sizes) -> read-only grids shared by all instances, see calc_geometry()
+    geometry_cache_size = 16
+    kernel_cache = {}  # kernel_key() -> read-only (kernel, kernel_sum, kernel_rFFT, kernel_FFT), see get_kernel()
+    kernel_cache_size = 32
+    cache_lock = threading.RLock()  # automata may be stepped from several threads, see Lenia.calc_automata()
     growth_func = {
     # [0,1] -> [-1,1]
     1: lambda n, m, s: np.maximum(0, 1 - (n-m)**2 / (9 * s**2) )**4 * 2 - 1,  # polynomial (quad4)
@@ -810,12 +1649,16 @@ class Automaton:
 
     def __init__(self, world, use_gpu=True):
         self.world = world
-        self.world_FFT = [np.zeros(world.cells[0].shape) for c in CHANNEL]
-        self.potential_FFT = [np.zeros(world.cells[0].shape) for k in KERNEL]
-        self.potential = [np.zeros(world.cells[0].shape) for k in KERNEL]
-        self.field = [np.zeros(world.cells[0].shape) for k in KERNEL]
-        self.change = [np.zeros(world.cells[0].shape) for c in CHANNEL]
-        self.X = [None]*DIM
+        self.config = world.config
+        self.dtype = world.cells[0].dtype
+        self.complex_dtype = np.result_type(self.dtype, np.complex64)
+        self.world_FFT = [np.zeros(world.cells[0].shape, dtype=self.dtype) for c in self.config.CHANNEL]
+        self.potential_FFT = [np.zeros(world.cells[0].shape, dtype=self.dtype) for k in self.config.KERNEL]
+        self.potential = [np.zeros(world.cells[0].shape, dtype=self.dtype) for k in self.config.KERNEL]
+        self.field = [np.zeros(world.cells[0].shape, dtype=self.dtype) for k in self.config.KERNEL]
+        self.change = [np.zeros(world.cells[0].shape, dtype=self.dtype) for c in self.config.CHANNEL]
+        self.X = [None]*self.config.DIM
+        self.X_vec = [None]*self.config.DIM  # 1D profiles of X, see axis_marginals()
         self.D = None
         self.Z_depth = None
         self.TH = None
@@ -836,18 +1679,48 @@ class Automaton:
         self.is_waste_enabled = True  # Waste production flag (ENABLED BY DEFAULT)
         self.is_signals_enabled = True  # Chemical signals flag (ENABLED BY DEFAULT)
         self.is_behavior_enabled = True  # Adaptive behaviors flag (ENABLED BY DEFAULT)
+        self.lut_tol = self.config.args.LUT  # max error of the lookup tables for growth, kernel core and soft clip (0 = exact functions)
+        self.luts = {}  # name -> (parameters, LookupTable), see get_lut()
+        self.is_jit = self.config.IS_JIT and import_numba() is not None  # Fused Numba kernels for growth and cell update (see jit_growth, jit_update), growth for JIT_GROWTH_GN, update with plain clipping
+        self.is_spectral_env = self.config.args.SPECTRAL_ENV  # Diffusion, decay and cooling of all fields in one batched FFT instead of Gaussian filters
+        self.env_intervals = dict.fromkeys(('temperature', 'nutrients', 'signals', 'features'), self.config.args.ENV_INTERVAL)  # generations between updates of each field (nutrients include waste)
+        self.env_pending = {}  # generations accumulated since the last update of each field, see env_source()
+        self.env_factors = None  # temp, nutrient, waste, signal factors of the last updates
+        self.env_factor = None  # their product (with behaviors), kept until one of them changes
+        self.env_factor_key = None
+        self.fft_axes = None  # all axes, or the spatial axes only for stacked worlds
+        self.fft_shape = None  # spatial shape, needed by irfftn()
+        self.is_rfft = True  # CPU path with real FFTs and half-spectrum kernels (no effect on GPU, call calc_kernel() after changing)
+        self.kernel_FFT = None  # full spectrum, only kept for the GPU path
+        self.kernel_rFFT = None  # half spectrum with fftshift folded in
+        self.kernel_keys = None  # kernel_key() of each kernel at the last calc_kernel()
+        self.is_kernel_stack = self.config.args.KERNEL_STACK  # CPU real path: all kernels as one stacked spectrum (--kernel-stack), see calc_growth_stack()
+        self.kernel_stack = None  # kernel_rFFT stacked along a leading kernel axis
+        self.kernel_c0 = self.kernel_c1 = self.kernel_scatter = None
+        self.tile_size = self.config.args.TILES  # simulate only the active tiles of this size (0 = whole world), see ActiveTiles
+        self.tiles = None  # ActiveTiles when tiling applies to this world (single world, CPU real path), see calc_kernel()
+        self.tile_kernel_rFFT = None  # kernel spectra on the padded tile blocks
+        self.is_window = self.config.args.WINDOW  # simulate only a window around the mass, see AdaptiveWindow
+        self.window = None  # AdaptiveWindow when windowing applies to this world (single world, CPU real path), see calc_kernel()
+        self.window_automaton = None  # inner Automaton on the window board, rebuilt when the window is resized
+        self.workspace = StepWorkspace()  # buffers reused by calc_once(), see workspace.alloc_count
+        self.fft_backend = FFTBackend.get(self.config.FFT_BACKEND, self.config.FFT_WORKERS)  # CPU FFTs, also used by the Analyzer
         self.gpu_api = self.gpu_thr = self.gpu_fft1 = self.gpu_fftn = self.gpu_fftshift = None
         self.is_gpu = False
-        self.has_gpu = True
-        if use_gpu:
-         self.compile_gpu(self.world.cells[0])
-        else:
-            self.has_gpu = False
-            self.is_gpu = False
+        self.has_gpu = use_gpu  # GPU allowed, reikna probed and compiled on the first GPU step, see prepare_gpu()
         self.calc_kernel()
 
+    def get_lut(self, name, key, func, lo, hi, dtype=None):
+        # lookup table of func, rebuilt only when its parameters (key) change
+        if name not in self.luts or self.luts[name][0] != key:
+            with np.errstate(all='ignore'):
+                self.luts[name] = (key, LookupTable(func, lo, hi, self.lut_tol, dtype or self.dtype))
+        return self.luts[name][1]
+
     def kernel_shell(self, R, model, params):
         kfunc = Automaton.kernel_core[model.get('kn')]
+        if self.lut_tol > 0 and model.get('kn') in (1, 2):
+            kfunc = self.get_lut(('kernel_core', model.get('kn')), self.lut_tol, kfunc, 0, 1, np.float64)
 
         # Check if we're in ammonia mode (access through the Lenia instance)
         is_ammonia = getattr(self, 'is_ammonia', False)
@@ -885,25 +1758,55 @@ class Automaton:
         ''' Soft maximum: https://www.johndcook.com/blog/2010/01/13/soft-maximum/ '''
         return np.log(np.exp(k*x) + np.exp(k*m)) / k
 
-    def soft_clip(self, x, min, max):
+    def soft_clip(self, x, min, max, out=None, is_lut=True):
         #https://medium.com/life-at-hopper/clip-it-clip-it-good-1f1bf711b291
+        if out is None:
+            out = np.empty_like(x)
+        if is_lut and self.lut_tol > 0:
+            table = self.get_lut('soft_clip', self.soft_clip_level, lambda x: self.soft_clip(x, min, max, is_lut=False),
+                *self.soft_clip_range())
+            return table(x, out, self.workspace)
         if self.soft_clip_level == 1:
             #return np.tanh(2*x-1) / 2 + 0.5
-            return 1 / (1 + np.exp(-4*x+2))
+            # 1 / (1 + np.exp(-4*x+2))
+            np.multiply(-4, x, out=out)
+            out += 2
+            np.exp(out, out=out)
+            out += 1
+            return np.divide(1, out, out=out)
         else:
             k = np.exp(13-self.soft_clip_level)
-            return -np.log(1/(np.power(k, x) + 1) + 1/k) / np.log(k)
+            # -np.log(1/(np.power(k, x) + 1) + 1/k) / np.log(k)
+            np.power(k, x, out=out)
+            out += 1
+            np.divide(1, out, out=out)
+            out += 1/k
+            np.log(out, out=out)
+            np.negative(out, out=out)
+            return np.divide(out, np.log(k), out=out)
         # a = np.exp(k*x)
         # b = np.exp(k*min)
         # c = np.exp(-k*max)
         # return np.log( 1/(a+b)+c ) / -k
         #return Automaton.soft_max(Automaton.soft_max(x, min, k), max, -k)
 
+    def soft_clip_range(self):
+        # interval beyond which soft_clip() is flat to within lut_tol, so that clamping the table adds no more error
+        with np.errstate(all='ignore'):
+            f = lambda x: self.soft_clip(np.array([x, x - 100.0]), 0, 1, is_lut=False)
+            lo, hi = 0.0, 1.0
+            while np.ptp(f(lo)) > self.lut_tol and lo > -100:
+                lo -= 0.5
+            while np.ptp(f(hi + 100.0)) > self.lut_tol and hi < 100:
+                hi += 0.5
+        return lo, hi
+
     def compile_gpu(self, A):
         ''' Reikna: http://reikna.publicfields.net/en/latest/api/computations.html '''
         try:
+            import reikna.fft, reikna.cluda
             self.gpu_api = reikna.cluda.any_api()
-            self.gpu_thr = self.gpu_api.Thread.create(interactive=args.G)
+            self.gpu_thr = self.gpu_api.Thread.create(interactive=self.config.args.G)
             self.gpu_fft1 = reikna.fft.FFT(A.astype(np.complex64),axes=[0]).compile(self.gpu_thr)
             self.gpu_fftn = reikna.fft.FFT(A.astype(np.complex64)).compile(self.gpu_thr)
             self.gpu_fftshift = reikna.fft.FFTShift(A.astype(np.float32)).compile(self.gpu_thr)
@@ -914,6 +1817,13 @@ class Automaton:
             print(e)
             # raise e
 
+    def prepare_gpu(self):
+        # first step with is_gpu: compile the GPU FFTs (has_gpu cleared if there is no GPU), then the full kernel spectra
+        if self.gpu_thr is None:
+            self.compile_gpu(self.world.cells[0])
+        if self.is_gpu and (self.kernel_FFT is None or any(F is None for F in self.kernel_FFT)):
+            self.calc_kernel()
+
     def run_gpu(self, A, cpu_func, gpu_func, dtype, **kwargs):
         if self.is_gpu and self.gpu_thr and gpu_func:
             op_dev = self.gpu_thr.to_device(A.astype(dtype))
@@ -924,175 +1834,1059 @@ class Automaton:
             # return np.roll(potential_shifted, (MIDX, MIDY), (1, 0))
 
     #def fft1(self, A): return self.run_gpu(A, np.fft.fft, self.gpu_fft1, np.complex64)
-    def fft1(self, A): return np.fft.fft(A)
-    def fftn(self, A): return self.run_gpu(A, np.fft.fftn, self.gpu_fftn, np.complex64)
-    def ifftn(self, A): return self.run_gpu(A, np.fft.ifftn, self.gpu_fftn, np.complex64, inverse=True)
+    def fft1(self, A): return self.fft_backend.fft(A)
+    def fftn(self, A): return self.run_gpu(A, lambda A: self.fft_backend.fftn(A, axes=self.fft_axes), self.gpu_fftn, np.complex64)
+    def ifftn(self, A): return self.run_gpu(A, lambda A: self.fft_backend.fftn(A, axes=self.fft_axes, inverse=True), self.gpu_fftn, np.complex64, inverse=True)
     # def fftshift(self, A): return self.run_gpu(A, np.fft.fftshift, self.gpu_fftshift, np.float32)
-    def fftshift(self, A): return np.fft.fftshift(A)
+    def fftshift(self, A): return np.fft.fftshift(A, axes=self.fft_axes)
+    def spectral_axes(self): return self.fft_axes or tuple(range(-len(self.fft_shape), 0))
+
+    def rfftn(self, A, out=None):
+        return self.fft_backend.rfftn(A, axes=self.spectral_axes(), out=out)
+
+    def irfftn(self, A, out=None):
+        scratch = self.workspace.like('irfftn', A) if out is not None else None
+        return self.fft_backend.irfftn(A, s=self.fft_shape, axes=self.spectral_axes(), out=out, scratch=scratch)
+
+    def is_real_fft(self):
+        return self.kernel_FFT is None or (self.is_rfft and not (self.is_gpu and self.gpu_thr))
+
+    def fft_world(self, A, out=None):
+        # spectrum of a real array, in the format expected by convolve(), out only used by the real path
+        return self.rfftn(A, out=out) if self.is_real_fft() else self.fftn(A)
+
+    def fft_world_shape(self, A):
+        # shape of the fft_world() spectrum of A on the real path
+        shape = list(A.shape)
+        shape[self.spectral_axes()[-1]] = self.fft_shape[-1] // 2 + 1
+        return shape
+
+    def convolve(self, A_FFT, k, potential_FFT=None, potential=None):
+        # potential of kernel k from a spectrum given by fft_world(), returns (potential_FFT, potential)
+        # potential_FFT and potential are optional output buffers, only used by the real path
+        if self.is_real_fft():
+            potential_FFT = np.multiply(self.kernel_rFFT[k], A_FFT, out=potential_FFT)
+            if potential is not None:
+                return potential_FFT, self.irfftn(potential_FFT, out=potential)
+            return potential_FFT, self.irfftn(potential_FFT).astype(self.dtype, copy=False)
+        else:
+            potential_FFT = self.kernel_FFT[k] * A_FFT
+            return potential_FFT, self.fftshift(np.real(self.ifftn(potential_FFT))).astype(self.dtype, copy=False)
+
+    def kernel_key(self, model, params, shape=None):
+        # everything a kernel and its spectrum depend on (not m, s, h), shape defaults to the world (fft_shape)
+        if 'rings' in params:
+            rings = tuple((ring['r'], ring['w'], ring['b']) for ring in params['rings'])
+        else:
+            rings = (params.get('r'), tuple(params.get('b', ())))
+        full_FFT = None if shape is not None or not (self.is_gpu or not self.is_rfft) else 'gpu' if self.is_gpu and self.gpu_thr else 'cpu'
+        lut_tol = self.lut_tol if model.get('kn') in (1, 2) else 0
+        return (tuple(shape or self.fft_shape), model['R'], model.get('kn'), rings, getattr(self, 'is_ammonia', False), np.dtype(self.complex_dtype).str, lut_tol, full_FFT)
+
+    def kernel_support(self, model, params):
+        # radius in cells outside which kernel_shell() is zero
+        if 'rings' in params:
+            r_scale, w_scale = (1.3, 1.2) if getattr(self, 'is_ammonia', False) else (1, 1)
+            radius = max([ring['r'] * r_scale + ring['w'] * w_scale for ring in params['rings']], default=0)
+        else:
+            radius = params['r']
+        return int(np.ceil(radius * model['R'])) + 1
+
+    def build_kernel(self, model, params, shape=None):
+        # kernel_shell() evaluated inside its (2*support+1)^DIM box only, returns (kernel, kernel_sum, ifftshift(kernel) / kernel_sum),
+        # the last one centred on index 0 (also for odd sizes, where fftshift() would put the centre at size-1)
+        # shape defaults to the world, a smaller one (tile blocks) must hold the box
+        shape = tuple(shape or self.fft_shape)
+        mid = [int(size / 2) for size in shape]
+        support = self.kernel_support(model, params)
+        if any(support > min(m, size - m - 1) for m, size in zip(mid, shape)):
+            kernel = self.kernel_shell(self.D if self.D.shape == shape else self.D.T, model, params)  # D is transposed for non-square worlds
+            kernel_sum = kernel.sum()
+            return kernel, kernel_sum, np.fft.ifftshift(kernel / kernel_sum)
+        # same distances as self.D around the center (X = (i - mid) / R)
+        offsets = np.arange(-support, support+1)
+        box_X = np.meshgrid(*[offsets / model['R']]*len(shape), indexing='ij', sparse=True)
+        box_D = np.sqrt(sum([x**2 for x in reversed(box_X)]))
+        box = self.kernel_shell(box_D, model, params)
+        kernel_sum = box.sum()
+        kernel = np.zeros(shape)
+        kernel[tuple(slice(m - support, m + support + 1) for m in mid)] = box
+        # centre at index 0, offsets wrapped around
+        kernel_norm_shifted = np.zeros(shape)
+        kernel_norm_shifted[np.ix_(*[offsets % size for size in shape])] = box / kernel_sum
+        return kernel, kernel_sum, kernel_norm_shifted
+
+    def get_kernel(self, model, params, shape=None):
+        # (kernel, kernel_sum, kernel_rFFT, kernel_FFT) of one world (or of another shape), from the LRU cache shared by all instances
+        key = self.kernel_key(model, params, shape)
+        with Automaton.cache_lock:
+            entry = Automaton.kernel_cache.pop(key, None)
+            if entry is None:
+                kernel, kernel_sum, kernel_norm_shifted = self.build_kernel(model, params, shape)
+                # shifting the kernel before the FFT is the same as shifting every potential after the inverse FFT
+                kernel_rFFT = self.fft_backend.rfftn(kernel_norm_shifted, axes=tuple(range(kernel.ndim))).astype(self.complex_dtype, copy=False)
+                kernel_FFT = None
+                if key[-1] is not None:
+                    kernel_FFT = self.run_gpu(kernel / kernel_sum, self.fft_backend.fftn, self.gpu_fftn, np.complex64).astype(self.complex_dtype, copy=False)
+                entry = (kernel, kernel_sum, kernel_rFFT, kernel_FFT)
+                for A in entry:
+                    if isinstance(A, np.ndarray):
+                        A.flags.writeable = False
+                while len(Automaton.kernel_cache) >= Automaton.kernel_cache_size:
+                    del Automaton.kernel_cache[next(iter(Automaton.kernel_cache))]
+            Automaton.kernel_cache[key] = entry  # most recently used last
+        return key, entry
+
+    def kernel_params(self, k):
+        # growth parameters of kernel k (arrays over the batch axis in BatchAutomaton)
+        p = self.world.params[k]
+        return p['m'], p['s'], p['h']
+
+    def calc_field(self, n, m, s, out, k=0):
+        # growth_func[gn](n, m, s) computed in place into out, same operations in the same order
+        gn = self.world.model.get('gn')
+        if gn not in (1, 2, 3, 4):
+            np.copyto(out, Automaton.growth_func[gn](n, m, s))
+            return out
+        if self.lut_tol > 0 and gn != 3 and np.ndim(m) == 0 and np.ndim(s) == 0:
+            # potential is in [0,1]
+            table = self.get_lut(('growth', k), (gn, m, s), lambda x: Automaton.growth_func[gn](x, m, s), 0, 1)
+            return table(n, out, self.workspace)
+        np.subtract(n, m, out=out)
+        if gn == 3:
+            np.abs(out, out=out)
+            np.multiply(np.less_equal(out, s, out=self.workspace.like('field_mask', out, bool)), 2, out=out)
+        else:
+            np.square(out, out=out)
+            if gn == 1:
+                out /= 9 * s**2
+                np.subtract(1, out, out=out)
+                np.maximum(0, out, out=out)
+                np.power(out, 4, out=out)
+            else:
+                np.negative(out, out=out)
+                out /= (2 if gn == 2 else 1.5) * s**2
+                np.exp(out, out=out)
+            out *= 2.2 if gn == 4 else 2
+        out -= 1
+        return out
 
     # #################################################################
     # # --- DÉBUT DU BLOC CORRIGÉ 2 ---
     # #################################################################
     def calc_once(self, is_update=True):
+        if self.is_gpu:
+            self.prepare_gpu()
+        if self.window is not None:
+            # single creature: only the window around it
+            return self.calc_window(is_update)
         A = self.world.cells
         R, T, P = [self.world.model[k] for k in ('R', 'T', 'P')]
         dt = 1 / T
-        gfunc = Automaton.growth_func[self.world.model.get('gn')]
+        ws = self.workspace
+        
+        # Environment on a coarser grid: densities restricted to it, env_factor interpolated back up below
+        env_scale = self.world.env_scale
+        bd = self.world.batch_dims
+        self.world.sync_env_scale()
         
         # --- DÉFINITION DES DENSITÉS ---
-        if isinstance(A, list):
+        if self.tiles is not None:
+            # Monde creux : densités des tuiles actives, directement sur la grille de l'environnement
+            self.tiles.find(A)
+            consuming_density, total_density = self.calc_tile_densities(A)
+        elif isinstance(A, list):
             # Mode multi-canaux (pour l'évolution)
             consuming_density = A[0] # Seul C0 (Bouche) est utilisé pour la consommation
-            total_density = sum(A[c] for c in CHANNEL) / len(CHANNEL)
+            total_density = ws.like('total_density', A[0])
+            np.copyto(total_density, A[0])
+            for c in self.config.CHANNEL[1:]:
+                total_density += A[c]
+            total_density /= len(self.config.CHANNEL)
         else:
             # Mode canal unique (pour que les simulations normales fonctionnent)
             consuming_density = A
             total_density = A
         # --- FIN ---
+
+        if env_scale > 1 and self.tiles is None:
+            total_density = Board.restrict(total_density, env_scale, bd, out=ws.like('env_total_density', self.world.nutrients))
+            consuming_density = total_density if len(self.config.CHANNEL) == 1 else \
+                Board.restrict(consuming_density, env_scale, bd, out=ws.like('env_consuming_density', self.world.nutrients))
         
         # === ENVIRONMENTAL DYNAMICS ===
-        # Update temperature field and get temperature-dependent growth factor
-        temp_factor = self.world.update_temperature(
-            total_density, 
-            dt=dt, 
-            is_enabled=self.is_temperature_enabled
-        )
+        # each field is integrated every env_intervals[name] generations with the density accumulated in between
+        is_env_updated = self.env_factors is None
+        temp_factor, nutrient_factor, waste_factor, signal_factor = self.env_factors or (None, 1.0, 1.0, None)
+        if self.is_spectral_env:
+            # linear parts of all fields in one batched real FFT round trip, on the shortest interval
+            steps, (consuming_source, total_source) = self.env_source('environment', (consuming_density, total_density),
+                min(self.env_intervals[name] for name in ('temperature', 'nutrients', 'signals')))
+            if steps:
+                temp_factor, nutrient_factor, waste_factor, signal_factor = self.world.update_environment_spectral(
+                    consuming_source,
+                    total_source,
+                    dt=dt * steps,
+                    is_temperature_enabled=self.is_temperature_enabled,
+                    is_nutrients_enabled=self.is_nutrients_enabled,
+                    is_waste_enabled=self.is_waste_enabled,
+                    is_signals_enabled=self.is_signals_enabled,
+                    workspace=ws,
+                    fft_backend=self.fft_backend,
+                    steps=steps
+                )
+                is_env_updated = True
+        else:
+            # Update temperature field and get temperature-dependent growth factor
+            steps, (total_source,) = self.env_source('temperature', (total_density,))
+            if steps:
+                temp_factor = self.world.update_temperature(
+                    total_source, 
+                    dt=dt * steps, 
+                    is_enabled=self.is_temperature_enabled,
+                    workspace=ws,
+                    steps=steps
+                )
+                is_env_updated = True
         
-        # Update nutrients/waste and get their effects on growth
-        nutrient_factor, waste_factor = self.world.update_nutrients_and_waste(
-            consuming_density, # 'cell_density' dans la fonction, mais 'consuming_density' ici
-            total_density,     # 'total_density' (nouvel argument)
-            dt=dt,
-            is_nutrients_enabled=self.is_nutrients_enabled,
-            is_waste_enabled=self.is_waste_enabled
-        )
+            # Update nutrients/waste and get their effects on growth
+            steps, (consuming_source, total_source) = self.env_source('nutrients', (consuming_density, total_density))
+            if steps:
+                nutrient_factor, waste_factor = self.world.update_nutrients_and_waste(
+                    consuming_source, # 'cell_density' dans la fonction, mais 'consuming_density' ici
+                    total_source,     # 'total_density' (nouvel argument)
+                    dt=dt * steps,
+                    is_nutrients_enabled=self.is_nutrients_enabled,
+                    is_waste_enabled=self.is_waste_enabled,
+                    workspace=ws,
+                    steps=steps
+                )
+                is_env_updated = True
         
-        # Update chemical signals and get their effect on growth
-        signal_factor = self.world.update_signals(
-            total_density,
-            dt=dt,
-            is_enabled=self.is_signals_enabled
-        )
+            # Update chemical signals and get their effect on growth
+            steps, (total_source,) = self.env_source('signals', (total_density,))
+            if steps:
+                signal_factor = self.world.update_signals(
+                    total_source,
+                    dt=dt * steps,
+                    is_enabled=self.is_signals_enabled,
+                    workspace=ws,
+                    steps=steps
+                )
+                is_env_updated = True
+        self.env_factors = (temp_factor, nutrient_factor, waste_factor, signal_factor)
         
         # Apply environmental features (vents, sinks, etc.)
-        if is_update and (self.is_nutrients_enabled or self.is_temperature_enabled):
-            self.world.apply_environmental_features(dt=dt)
-        
-        # Get adaptive behavioral modulation
-        if self.is_behavior_enabled:
-            behavior_modulation = self.world.get_adaptive_growth_modulation()
-        else:
-            behavior_modulation = np.ones_like(self.world.nutrients)
-        
-        # Combined environmental factor (including behavioral adaptation)
-        env_factor = temp_factor * nutrient_factor * waste_factor * signal_factor * behavior_modulation
+        steps, _ = self.env_source('features', ())
+        if steps and is_update and (self.is_nutrients_enabled or self.is_temperature_enabled):
+            self.world.apply_environmental_features(dt=dt * steps, workspace=ws)
+            is_env_updated = True
         
-        # === STANDARD LENIA CALCULATION ===
-        self.world_FFT = [self.fftn(A[c]) for c in CHANNEL]
-    # #################################################################
-    # # --- FIN DU BLOC CORRIGÉ 2 ---
-    # #################################################################
-        D = [np.zeros(A[c].shape) for c in CHANNEL]
-        if not is_free_h: Dn = [0 for c in CHANNEL]
-        
-        for k in KERNEL:
-            p = self.world.params[k]
-            c0, c1 = p.get('c0', 0), p.get('c1', 0)
-            self.potential_FFT[k] = self.kernel_FFT[k] * self.world_FFT[c0]
-            self.potential[k] = self.fftshift(np.real(self.ifftn(self.potential_FFT[k])))
-            self.field[k] = gfunc(self.potential[k], p['m'], p['s'])
-            
-            if self.is_arita_mode or c1 in self.arita_layers:
-                self.field[k] = (self.field[k] + 1) / 2
-                growth = dt * p['h'] * (self.field[k] - A[c1]) * env_factor
-                D[c1] += growth
+        # Combined environmental factor (including behavioral adaptation), cached while no field changes
+        env_factor_key = (self.is_temperature_enabled, self.is_nutrients_enabled, self.is_waste_enabled,
+            self.is_signals_enabled, self.is_behavior_enabled, self.is_spectral_env, A[0].shape)
+        if is_env_updated or self.env_factor_key != env_factor_key:
+            if self.is_jit:
+                env_factor = ws.like('env_factor', temp_factor)
+                jit_env_factor(*[jit_flat(F) for F in (temp_factor, nutrient_factor, waste_factor, signal_factor, self.world.nutrients, self.world.waste)],
+                    self.is_behavior_enabled, jit_flat(env_factor))
             else:
-                growth = dt * p['h'] * self.field[k] * env_factor
-                D[c1] += growth
-            
-            if not is_free_h: Dn[c1] += p['h']
+                env_factor = np.multiply(temp_factor, nutrient_factor, out=ws.like('env_factor', temp_factor))
+                env_factor *= waste_factor
+                env_factor *= signal_factor
+                
+                # Get adaptive behavioral modulation
+                if self.is_behavior_enabled:
+                    env_factor *= self.world.get_adaptive_growth_modulation(workspace=ws)
+            if env_scale > 1 and self.tiles is None:
+                env_factor = Board.prolong(env_factor, env_scale, bd, out=ws.like('env_factor_cells', A[0], self.dtype))
+            self.env_factor, self.env_factor_key = env_factor, env_factor_key
+        env_factor = self.env_factor
         
-        # === UPDATE CELL VALUES ===
-        if not is_free_h:
-            A_new = [A[c] + D[c] / Dn[c] if Dn[c]>0 else A[c] for c in CHANNEL]
+        # === STANDARD LENIA CALCULATION ===
+        if self.tiles is not None:
+            # sparse world: potentials, growth and update of the active tiles only
+            self.calc_tiles(A, dt, env_factor, P, is_update)
         else:
-            A_new = [A[c] + D[c] for c in CHANNEL]
-        
-        for c in CHANNEL:
-            if self.add_noise > 0:
-                rand = (np.random.random_sample(A_new[c].shape) - 0.5) * (self.add_noise/10) + 1
-                A_new[c] *= rand
-            if self.soft_clip_level > 0:
-                A_new[c] = self.soft_clip(A_new[c], 0, 1)
-            else:
-                A_new[c] = np.clip(A_new[c], 0, 1)
-            if P > 0:
-                A_new[c] = np.around(A_new[c] * P) / P
-            self.change[c] = (A_new[c] - A[c]) / dt
-            if is_update:
-                if self.mask_rate > 0:
-                    mask = np.random.random_sample(A_new[c].shape) > (self.mask_rate/10)
-                    self.world.cells[c][mask] = A_new[c][mask]
-                else:
-                    self.world.cells[c] = A_new[c]
+            D, Dn = self.calc_growth(A, dt, env_factor)
+            
+            # === UPDATE CELL VALUES ===
+            for c in self.config.CHANNEL:
+                self.change[c] = ws.like(('change', c), A[c])
+            self.update_cells(A, D, Dn, P, dt, is_update, self.change)
         
         # === APPLY CONVECTION (if enabled) ===
         if is_update and self.is_temperature_enabled:
-            self.world.apply_convection(dt=dt, is_enabled=True)
+            self.world.apply_convection(dt=dt, is_enabled=True, workspace=ws, tiles=self.tiles)
         
         if is_update:
             self.gen += 1
             self.time = round(self.time + dt, ROUND)
 
-    def calc_kernel(self):
-        R = self.world.model['R']
+    # #################################################################
+    # # --- FIN DU BLOC CORRIGÉ 2 ---
+    # #################################################################
 
+    def calc_growth(self, A, dt, env_factor):
+        # growth of every channel from all kernels on the whole world, returns (D, Dn) with Dn the sum of h per channel (None if free h)
+        ws = self.workspace
+        is_real_fft = self.is_real_fft()
+        # channel spectra stacked along a leading axis on the real path (gathered by calc_growth_stack())
+        world_FFT = ws.get('world_FFT', [len(self.config.CHANNEL)] + self.fft_world_shape(A[0]), self.complex_dtype) if is_real_fft else None
+        for c in self.config.CHANNEL:
+            self.world_FFT[c] = self.fft_world(A[c], out=world_FFT[c] if is_real_fft else None)
+        Dn = None if is_free_h else [0 for c in self.config.CHANNEL]
+        if is_real_fft and self.is_kernel_stack and not (self.is_jit and self.world.model.get('gn') in Automaton.JIT_GROWTH_GN):
+            # all kernels at once
+            D = self.calc_growth_stack(A, world_FFT, dt, env_factor)
+            if not is_free_h:
+                for k in self.config.KERNEL:
+                    Dn[self.kernel_c1[k]] += self.kernel_params(k)[2]
+        else:
+            D = [ws.like(('D', c), A[c], self.dtype) for c in self.config.CHANNEL]
+            for c in self.config.CHANNEL:
+                D[c].fill(0)
+            growth = ws.like('growth', A[0], self.dtype)
+        
+            for k in self.config.KERNEL:
+                p = self.world.params[k]
+                c0, c1 = p.get('c0', 0), p.get('c1', 0)
+                m, s, h = self.kernel_params(k)
+                if is_real_fft:
+                    self.potential_FFT[k], self.potential[k] = self.convolve(self.world_FFT[c0], k,
+                        ws.like(('potential_FFT', k), self.world_FFT[c0]), ws.like(('potential', k), A[c0], self.dtype))
+                else:
+                    self.potential_FFT[k], self.potential[k] = self.convolve(self.world_FFT[c0], k)
+                is_arita = self.is_arita_mode or c1 in self.arita_layers
+
+                if self.is_jit and self.world.model.get('gn') in Automaton.JIT_GROWTH_GN:
+                    # growth, environment and accumulation in one pass
+                    self.field[k] = ws.like(('field', k), self.potential[k])
+                    jit_growth(jit_flat(self.potential[k]), jit_flat(m), jit_flat(s), jit_flat(dt * h),
+                        jit_flat(env_factor), jit_flat(A[c1]), is_arita, jit_flat(self.field[k]), jit_flat(D[c1]))
+                else:
+                    self.field[k] = self.calc_field(self.potential[k], m, s, ws.like(('field', k), self.potential[k]), k)
+
+                    if is_arita:
+                        self.field[k] += 1
+                        self.field[k] /= 2
+                        np.subtract(self.field[k], A[c1], out=growth)
+                        np.multiply(dt * h, growth, out=growth)
+                    else:
+                        np.multiply(dt * h, self.field[k], out=growth)
+                    growth *= env_factor
+                    D[c1] += growth
+
+                if not is_free_h: Dn[c1] += h
+        return D, Dn
+
+    def update_cells(self, A, D, Dn, P, dt, is_update, change):
+        # A + D (divided by Dn unless free h) clipped and quantized, written back into A if is_update,
+        # change rate into the change buffers; D is overwritten, A, D and change may be views of the world (tiles)
+        if self.is_jit and is_free_h and self.add_noise == 0 and self.soft_clip_level == 0 and self.mask_rate == 0 and A[0].flags.c_contiguous:
+            # clip, quantization, change rate and write back in one pass
+            for c in self.config.CHANNEL:
+                jit_update(jit_flat(A[c]), jit_flat(D[c]), P, dt, is_update, jit_flat(change[c]))
+        else:
+            # A_new reuses the D buffers
+            for c in self.config.CHANNEL:
+                if is_free_h:
+                    np.add(A[c], D[c], out=D[c])
+                elif Dn[c] > 0:
+                    D[c] /= Dn[c]
+                    np.add(A[c], D[c], out=D[c])
+                else:
+                    np.copyto(D[c], A[c])
+            A_new = D
+        
+            for c in self.config.CHANNEL:
+                if self.add_noise > 0:
+                    rand = (np.random.random_sample(A_new[c].shape) - 0.5) * (self.add_noise/10) + 1
+                    A_new[c] *= rand
+                if self.soft_clip_level > 0:
+                    self.soft_clip(A_new[c], 0, 1, out=A_new[c])
+                else:
+                    np.clip(A_new[c], 0, 1, out=A_new[c])
+                if P > 0:
+                    A_new[c] *= P
+                    np.around(A_new[c], out=A_new[c])
+                    A_new[c] /= P
+                np.subtract(A_new[c], A[c], out=change[c])
+                change[c] /= dt
+                if is_update:
+                    if self.mask_rate > 0:
+                        mask = np.random.random_sample(A_new[c].shape) > (self.mask_rate/10)
+                        A[c][mask] = A_new[c][mask]
+                    else:
+                        np.copyto(A[c], A_new[c])
+
+    @staticmethod
+    def build_geometry(current_shape, R, config):
         # --- DÉBUT DE LA CORRECTION ---
         # Le script d'exportation 3D utilise une taille de monde (ex: 64x64x64)
         # différente de celle globale (SIZE, MID) définie à l'importation (ex: 128x128).
         # Nous devons utiliser la taille du monde *actuel* de l'automate.
 
-        current_shape = self.world.cells[0].shape
         current_mid = [int(s / 2) for s in current_shape]
 
         dims = [slice(0, size) for size in current_shape]  # Utilise la forme (shape) actuelle
         I = list(reversed(np.mgrid[list(reversed(dims))]))  # I, J, K, L
         
         # 'MID' (global) est 2D, 'current_mid' est 3D. Utilisons 'current_mid'.
-        self.X = [(i - mid) / R for i, mid in zip(I, current_mid)]  # X, Y, Z, S
+        X = [(i - mid) / R for i, mid in zip(I, current_mid)]  # X, Y, Z, S
         # --- FIN DE LA CORRECTION ---
         
-        #self.D = np.sqrt(np.abs(sum([(-1)**d * x**2 for d,x in enumerate(self.X)])))  # Minkowski
-        self.D = np.sqrt(sum([x**2 for x in self.X]))
+        #D = np.sqrt(np.abs(sum([(-1)**d * x**2 for d,x in enumerate(X)])))  # Minkowski
+        geometry = {'X':X, 'D':np.sqrt(sum([x**2 for x in X])), 'Z_depth':None, 'TH':None, 'R':None, 'polar_X':None, 'polar_Y':None}
+        # X[d] only varies along axis -1-d: its 1D profile, for moments from marginal sums (see axis_marginals())
+        geometry['X_vec'] = [(np.arange(size) - int(size / 2)) / R for size in reversed(current_shape)]
         
-        # DIM (global) est 3 (patché), donc ce bloc s'exécute
-        if DIM >= 3:
-            # self.X a maintenant 3 éléments, l'erreur est corrigée !
-            Z = self.X[2]
-            for d in range(3, DIM):
+        # la dimension vient elle aussi de la forme du monde, plus du 'DIM' global
+        dim = len(current_shape)
+        if dim >= 3:
+            # X a maintenant 3 éléments, l'erreur est corrigée !
+            Z = X[2]
+            for d in range(3, dim):
                 Z = Z[current_mid[d]] # Utilise current_mid ici aussi
-            self.Z_depth = Z - Z.min()
-            self.Z_depth /= self.Z_depth.sum(axis=0) / 3
+            Z_depth = Z - Z.min()
+            Z_depth /= Z_depth.sum(axis=0) / 3
+            geometry['Z_depth'] = Z_depth
 
-        # Ce bloc est (correctement) sauté car DIM=3
-        if DIM == 2:
+        # Ce bloc est (correctement) sauté en 3D
+        if dim == 2:
             ''' https://stackoverflow.com/questions/9924135/fast-cartesian-to-polar-to-cartesian-in-python '''
             #TH=[90, 360+90)=SIZE, R=[MIDX-1, -(MIDX-1)]=SIZE-1
-            th_range = np.linspace(np.pi*1/2, np.pi*5/2, SIZETH+1)[:-1]
-            r_range = np.arange(-SIZER+1, SIZER)[::-1]
-            self.TH, self.R = np.meshgrid(th_range, r_range)
-            self.polar_X = (self.R * np.cos(self.TH) + MIDX).astype(int)
-            self.polar_Y = (self.R * np.sin(self.TH) + MIDY).astype(int)
-
-        self.kernel = [self.kernel_shell(self.D, self.world.model, self.world.params[k]) for k in KERNEL]
-        self.kernel_sum = [self.kernel[k].sum() for k in KERNEL]
-        kernel_norm = [self.kernel[k] / self.kernel_sum[k] for k in KERNEL]
-        self.kernel_FFT = [self.fftn(kernel_norm[k]) for k in KERNEL]
+            th_range = np.linspace(np.pi*1/2, np.pi*5/2, config.SIZETH+1)[:-1]
+            r_range = np.arange(-config.SIZER+1, config.SIZER)[::-1]
+            geometry['TH'], geometry['R'] = np.meshgrid(th_range, r_range)
+            geometry['polar_X'] = (geometry['R'] * np.cos(geometry['TH']) + config.MIDX).astype(int)
+            geometry['polar_Y'] = (geometry['R'] * np.sin(geometry['TH']) + config.MIDY).astype(int)
+
+        # shared by all automata, must not be modified in place
+        for A in X + geometry['X_vec'] + [v for k, v in geometry.items() if k not in ('X', 'X_vec') and v is not None]:
+            A.flags.writeable = False
+        return geometry
+
+    def calc_geometry(self, current_shape):
+        # coordinate grids, distance field and polar maps, shared across instances
+        key = (tuple(current_shape), self.world.model['R'], self.config.SIZETH, self.config.SIZER, self.config.MIDX, self.config.MIDY)
+        with Automaton.cache_lock:
+            geometry = Automaton.geometry_cache.pop(key, None)
+            if geometry is None:
+                geometry = Automaton.build_geometry(current_shape, self.world.model['R'], self.config)
+                while len(Automaton.geometry_cache) >= Automaton.geometry_cache_size:
+                    del Automaton.geometry_cache[next(iter(Automaton.geometry_cache))]
+            Automaton.geometry_cache[key] = geometry  # most recently used last
+        self.X = list(geometry['X'])
+        self.X_vec = list(geometry['X_vec'])
+        self.D, self.Z_depth = geometry['D'], geometry['Z_depth']
+        self.TH, self.R = geometry['TH'], geometry['R']
+        self.polar_X, self.polar_Y = geometry['polar_X'], geometry['polar_Y']
+
+    @staticmethod
+    def axis_marginals(A, batch_dims=0):
+        # sums of A over all spatial axes but the one of each X[d] (axis -1-d), so that moments of A
+        # are dot products with X_vec[d] instead of passes over full-size products A*X[d]
+        n = A.ndim - batch_dims
+        return [A.sum(axis=tuple(batch_dims + a for a in range(n) if a != n-1-d)) for d in range(n)]
+
+    def calc_kernel(self):
+        self.fft_shape = self.world.cells[0].shape
+        self.calc_geometry(self.world.cells[0].shape)
+        if self.kernel_keys is None:
+            self.kernel, self.kernel_sum, self.kernel_rFFT = [None]*len(self.config.KERNEL), [None]*len(self.config.KERNEL), [None]*len(self.config.KERNEL)
+            self.kernel_keys = [None]*len(self.config.KERNEL)
+        kernel_FFT = [None]*len(self.config.KERNEL) if self.kernel_FFT is None else self.kernel_FFT
+        is_changed = False
+        for k in self.config.KERNEL:
+            # only rebuild kernels whose shape changed, m, s, h do not matter here
+            if self.kernel_key(self.world.model, self.world.params[k]) != self.kernel_keys[k]:
+                self.kernel_keys[k], (self.kernel[k], self.kernel_sum[k], self.kernel_rFFT[k], kernel_FFT[k]) = self.get_kernel(self.world.model, self.world.params[k])
+                is_changed = True
+        self.kernel_FFT = kernel_FFT if kernel_FFT[0] is not None else None
+        self.calc_kernel_stack(is_changed)
+        self.calc_tiles_kernel()
+        self.calc_window_kernel()
         self.kernel_updated = False
 
+    def calc_kernel_stack(self, is_changed=True):
+        # kernel spectra stacked along a leading kernel axis, source (c0) and destination (c1) channel of each kernel
+        self.kernel_c0 = np.asarray([self.world.params[k].get('c0', 0) for k in self.config.KERNEL], dtype=np.intp)
+        self.kernel_c1 = np.asarray([self.world.params[k].get('c1', 0) for k in self.config.KERNEL], dtype=np.intp)
+        # D = kernel_scatter @ growth sums the growth of all kernels into their destination channels
+        self.kernel_scatter = (self.kernel_c1 == np.arange(len(self.config.CHANNEL))[:, None]).astype(self.dtype)
+        if is_changed or self.kernel_stack is None:
+            self.kernel_stack = np.stack(self.kernel_rFFT)
+
+    def calc_tiles_kernel(self):
+        # tiles and their block kernels, the halo covers the largest kernel support
+        shape = self.world.cells[0].shape
+        halo = max(self.kernel_support(self.world.model, self.world.params[k]) for k in self.config.KERNEL)
+        if not (self.tile_size and self.is_real_fft() and all(n % self.tile_size == 0 and self.tile_size + 2 * halo <= n for n in shape)):
+            self.tiles = self.tile_kernel_rFFT = None
+            return
+        if self.tiles is None or (self.tiles.shape, self.tiles.tile, self.tiles.halo) != (shape, self.tile_size, halo):
+            self.tiles = ActiveTiles(shape, self.tile_size, halo)
+        self.tile_kernel_rFFT = [self.get_kernel(self.world.model, self.world.params[k], self.tiles.block)[1][2] for k in self.config.KERNEL]
+
+    def calc_tile_densities(self, A):
+        # consuming (C0) and total (channel mean) densities of the active tiles on the environment grid, zero elsewhere
+        ws = self.workspace
+        tiles, scale = self.tiles, self.world.env_scale
+        consuming = ws.like('env_consuming_density', self.world.nutrients)
+        total = ws.like('env_total_density', self.world.nutrients) if len(self.config.CHANNEL) > 1 else consuming
+        tiles.clear({id(X): X for X in (consuming, total)}.values(), scale)
+        tile_total = ws.get('tile_total_density', (tiles.tile,) * len(tiles.shape), self.dtype)
+        for index in tiles.active:
+            region, env_region = tiles.region(index), tiles.region(index, scale)
+            Board.restrict(A[0][region], scale, out=consuming[env_region])
+            if len(self.config.CHANNEL) > 1:
+                np.copyto(tile_total, A[0][region])
+                for c in self.config.CHANNEL[1:]:
+                    tile_total += A[c][region]
+                tile_total /= len(self.config.CHANNEL)
+                Board.restrict(tile_total, scale, out=total[env_region])
+        return consuming, total
+
+    def calc_tiles(self, A, dt, env_factor, P, is_update):
+        # calc_growth() and update_cells() on the active tiles: each block (tile plus halo) is convolved with the block kernels,
+        # the growth of every tile is computed before any tile is updated (blocks overlap their neighbours)
+        ws = self.workspace
+        tiles, scale = self.tiles, self.world.env_scale
+        block_shape = list(tiles.block)
+        block_shape[-1] = block_shape[-1] // 2 + 1
+        axes = tuple(range(len(tiles.block)))
+        block_FFT = ws.get('tile_block_FFT', [len(self.config.CHANNEL)] + block_shape, self.complex_dtype)
+        potential_FFT = ws.get('tile_potential_FFT', block_shape, self.complex_dtype)
+        potential = ws.get('tile_potential', tiles.block, self.dtype)
+        growth = ws.get('tile_growth', (tiles.tile,) * len(tiles.shape), self.dtype)
+        D = [ws.like(('D', c), A[c], self.dtype) for c in self.config.CHANNEL]
+        for k in self.config.KERNEL:
+            self.potential[k] = ws.like(('potential', k), A[0], self.dtype)
+            self.field[k] = ws.like(('field', k), A[0], self.dtype)
+        for c in self.config.CHANNEL:
+            self.change[c] = ws.like(('change', c), A[c])
+        if tiles.dropped is not None:
+            tiles.clear(A)  # mass left below EPSILON
+        tiles.clear(D + self.potential + self.field + self.change)
+
+        Dn = None if is_free_h else [0 for c in self.config.CHANNEL]
+        for k in self.config.KERNEL:
+            if not is_free_h: Dn[self.world.params[k].get('c1', 0)] += self.kernel_params(k)[2]
+        for index in tiles.active:
+            region = tiles.region(index)
+            block_index = tiles.block_index(index)
+            for c in self.config.CHANNEL:
+                self.fft_backend.rfftn(A[c][block_index], axes=axes, out=block_FFT[c])
+                D[c][region] = 0
+            if np.ndim(env_factor) == 0:
+                tile_env_factor = env_factor
+            elif scale == 1:
+                tile_env_factor = env_factor[region]
+            else:
+                tile_env_factor = tiles.sample(env_factor, index, scale, ws.like('tile_env_factor', growth))
+            for k in self.config.KERNEL:
+                p = self.world.params[k]
+                c0, c1 = p.get('c0', 0), p.get('c1', 0)
+                m, s, h = self.kernel_params(k)
+                np.multiply(self.tile_kernel_rFFT[k], block_FFT[c0], out=potential_FFT)
+                self.fft_backend.irfftn(potential_FFT, s=tiles.block, axes=axes, out=potential, scratch=ws.like('tile_irfftn', potential_FFT))
+                np.copyto(self.potential[k][region], potential[tiles.interior])
+                field = self.calc_field(self.potential[k][region], m, s, self.field[k][region], k)
+                if self.is_arita_mode or c1 in self.arita_layers:
+                    field += 1
+                    field /= 2
+                    np.subtract(field, A[c1][region], out=growth)
+                    np.multiply(dt * h, growth, out=growth)
+                else:
+                    np.multiply(dt * h, field, out=growth)
+                growth *= tile_env_factor
+                D[c1][region] += growth
+
+        for index in tiles.active:
+            region = tiles.region(index)
+            self.update_cells([X[region] for X in A], [X[region] for X in D], Dn, P, dt, is_update, [X[region] for X in self.change])
+
+    def calc_window_kernel(self):
+        # window of a single world, its inner automaton is rebuilt (with the new kernels) on the next step
+        self.window_automaton = None
+        if not (self.is_window and self.is_real_fft()):
+            self.window = None
+        elif self.window is None or self.window.shape != self.world.cells[0].shape:
+            self.window = AdaptiveWindow(self.world.cells[0].shape)
+
+    def make_window_automaton(self, size):
+        # inner Automaton on a window board sharing the model and parameters of the world
+        board = Board(size, dtype=self.world.dtype, config=self.config)
+        board.names, board.settings, board.model, board.params = self.world.names, self.world.settings, self.world.model, self.world.params
+        board.env_scale = self.world.env_scale
+        vmin = self.world.model.get('vmin')
+        automaton = Automaton(board, use_gpu=False)
+        self.world.model['vmin'] = vmin
+        automaton.is_window, automaton.window, automaton.tile_size = False, None, 0
+        automaton.lut_tol, automaton.is_rfft = self.lut_tol, self.is_rfft
+        if hasattr(self, 'is_ammonia'):
+            automaton.is_ammonia = self.is_ammonia
+        automaton.calc_kernel()
+        return automaton
+
+    def calc_window(self, is_update=True):
+        # calc_once() of the window around the mass only, potentials, fields and change rates are zero outside it
+        world, window, ws = self.world, self.window, self.workspace
+        world.sync_env_scale()
+        support = max(self.kernel_support(world.model, world.params[k]) for k in self.config.KERNEL)
+        margin = max(AdaptiveWindow.MARGIN * world.model['R'], 2 * support)
+        inner = self.window_automaton
+        last_index = window.index() if window.origin is not None else None
+        is_moved = window.update(world.cells, inner.world.cells if inner is not None else None, margin, world.env_scale)
+        if inner is None or inner.world.cells[0].shape != window.size:
+            inner = self.window_automaton = self.make_window_automaton(window.size)
+        elif is_moved:
+            inner.reset()
+        for name in Automaton.STEP_SETTINGS + ('fft_backend',):
+            setattr(inner, name, getattr(self, name))
+
+        window.copy_in(world, inner.world)
+        inner.calc_once(is_update)
+        window.copy_out(inner.world, world, margin // 4)
+        if is_update:
+            self.calc_window_env(margin // 4)
+        index = window.index()
+        for name in ('potential', 'field', 'change'):
+            for i, B in enumerate(getattr(inner, name)):
+                A = ws.like((name, i), world.cells[0], self.dtype)
+                if last_index is None:
+                    A.fill(0)
+                elif is_moved:
+                    A[last_index] = 0
+                A[index] = B
+                getattr(self, name)[i] = A
+
+        if is_update:
+            self.gen += 1
+            self.time = round(self.time + 1 / world.model['T'], ROUND)
+
+    def calc_window_env(self, border):
+        # environment outside the window every AdaptiveWindow.ENV_INTERVAL generations: one spectral update of the whole world
+        # with zero densities (there are no cells outside), its diffusion and decay those of as many single generations,
+        # then the vents and the convection of the fields as in calc_once(), and the part copied out of the window board put back
+        world, window, ws = self.world, self.window, self.workspace
+        steps = self.env_pending.get('window', 0) + 1
+        if steps < AdaptiveWindow.ENV_INTERVAL:
+            self.env_pending['window'] = steps
+            return
+        self.env_pending['window'] = 0
+        names = AdaptiveWindow.ENV_FIELDS[:4]  # convection also moves the fields that are not enabled
+        if not any(getattr(self, 'is_'+name+'_enabled') for name in names) or window.size == window.shape:
+            return
+        scale, dt = world.env_scale, steps / world.model['T']
+        env_index = window.index(scale, border // scale)
+        kept = [getattr(world, name)[env_index] for name in names]
+        zero = ws.like('window_env_zero', world.nutrients)
+        zero.fill(0)
+        world.update_environment_spectral(zero, zero, dt=dt,
+            is_temperature_enabled=self.is_temperature_enabled,
+            is_nutrients_enabled=self.is_nutrients_enabled,
+            is_waste_enabled=self.is_waste_enabled,
+            is_signals_enabled=self.is_signals_enabled,
+            workspace=ws, fft_backend=self.fft_backend, steps=steps, is_repeated=True)
+        if self.is_nutrients_enabled or self.is_temperature_enabled:
+            world.apply_environmental_features(dt=dt, workspace=ws)
+        if self.is_temperature_enabled:
+            world.apply_convection(dt=dt, is_enabled=True, workspace=ws, is_cells=False)
+        for name, A in zip(names, kept):
+            getattr(world, name)[env_index] = A
+
+    def calc_growth_stack(self, A, world_FFT, dt, env_factor):
+        # growth of all kernels: gather the source spectra, one batched inverse FFT,
+        # growth with broadcast m, s, h, scattered to the destination channels with one reduction, returns D
+        ws = self.workspace
+        K = len(self.config.KERNEL)
+        potential_FFT = ws.get('potential_FFT', self.kernel_stack.shape, self.complex_dtype)
+        np.take(world_FFT, self.kernel_c0, axis=0, out=potential_FFT)
+        potential_FFT *= self.kernel_stack
+        shape = (K,) + A[0].shape
+        axes = tuple(range(-len(self.fft_shape), 0))
+        potential = self.fft_backend.irfftn(potential_FFT, s=self.fft_shape, axes=axes,
+            out=ws.get('potential', shape, self.dtype), scratch=ws.like('irfftn', potential_FFT))
+        params = [self.kernel_params(k) for k in self.config.KERNEL]
+        m, s, h = [np.asarray([p[i] for p in params], dtype=self.dtype).reshape((K,) + np.shape(params[0][i]) + (1,) * (A[0].ndim - np.ndim(params[0][i])))
+            for i in range(3)]
+        field = ws.get('field', shape, self.dtype)
+        if self.lut_tol > 0:
+            for k in self.config.KERNEL:
+                self.calc_field(potential[k], params[k][0], params[k][1], field[k], k)
+        else:
+            self.calc_field(potential, m, s, field)
+        growth = ws.get('growth', shape, self.dtype)
+        np.copyto(growth, field)
+        for k in self.config.KERNEL:
+            c1 = self.kernel_c1[k]
+            if self.is_arita_mode or c1 in self.arita_layers:
+                field[k] += 1
+                field[k] /= 2
+                np.subtract(field[k], A[c1], out=growth[k])
+        growth *= dt * h
+        growth *= env_factor
+        D = ws.get('D', (len(self.config.CHANNEL),) + A[0].shape, self.dtype)
+        np.matmul(self.kernel_scatter, growth.reshape(K, -1), out=D.reshape(len(self.config.CHANNEL), -1))
+        for k in self.config.KERNEL:
+            self.potential_FFT[k], self.potential[k], self.field[k] = potential_FFT[k], potential[k], field[k]
+        return list(D)
+
+    def env_source(self, name, densities, interval=None):
+        # density sources of an environment field summed over the generations since its last update
+        # returns the number of generations to integrate now (0 until the interval is reached) and the mean densities
+        interval = max(1, self.env_intervals[name] if interval is None else interval)
+        steps = self.env_pending.get(name, 0) + 1
+        if interval == 1 and steps == 1:
+            return 1, densities
+        sources = [self.workspace.like(('env_source', name, i), D) for i, D in enumerate(densities)]
+        for S, D in zip(sources, densities):
+            if steps == 1:
+                np.copyto(S, D)
+            else:
+                S += D
+        if steps < interval and self.env_factors is not None:
+            self.env_pending[name] = steps
+            return 0, sources
+        self.env_pending[name] = 0
+        for S in sources:
+            S /= steps
+        return steps, sources
+
     def reset(self):
         self.gen = 0
         self.time = 0
+        self.env_pending = {}
+        self.env_factors = self.env_factor = self.env_factor_key = None
+        if self.tiles is not None:
+            self.tiles.active = None  # full scan on the next step
+        if self.window is not None:
+            self.window.origin = None
+
+class BatchAutomaton(Automaton):
+    '''
+    Steps N worlds at once as stacked arrays with a leading batch axis (e.g. a whole GA population)
+    All worlds share the model (R, T, P, kn, gn) and the kernel wiring (c0, c1),
+    each world keeps its own params (m, s, h, rings) and therefore its own kernel FFT
+    '''
+    def __init__(self, world_list):
+        self.world_list = world_list
+        model = world_list[0].model
+        for world in world_list:
+            assert world.cells[0].shape == world_list[0].cells[0].shape, "batched worlds must have the same size"
+            assert all(world.model.get(k) == model.get(k) for k in ('R', 'T', 'P', 'kn', 'gn')), "batched worlds must share the same model"
+        super().__init__(Board.from_batch(world_list), use_gpu=False)
+        self.total_shift_idx = np.zeros((len(world_list), len(self.X)))
+
+    @property
+    def spatial_axes(self):
+        return tuple(range(self.world.batch_dims, self.world.cells[0].ndim))
+
+    def batch_shape(self):
+        # (N, 1, 1, ...) broadcastable against stacked worlds
+        return (len(self.world_list),) + (1,) * len(self.spatial_axes)
+
+    def kernel_params(self, k):
+        params = [world.params[k] for world in self.world_list]
+        return [np.asarray([p[key] for p in params], dtype=self.dtype).reshape(self.batch_shape()) for key in ('m', 's', 'h')]
+
+    def calc_kernel(self):
+        self.fft_axes = self.spatial_axes
+        self.fft_shape = self.world.cells[0].shape[self.world.batch_dims:]
+        self.calc_geometry(self.world.cells[0].shape[self.world.batch_dims:])
+        if self.kernel_keys is None:
+            self.kernel, self.kernel_sum, self.kernel_rFFT = [None]*len(self.config.KERNEL), [None]*len(self.config.KERNEL), [None]*len(self.config.KERNEL)
+            self.kernel_keys = [None]*len(self.config.KERNEL)
+        kernel_FFT = [None]*len(self.config.KERNEL) if self.kernel_FFT is None else self.kernel_FFT
+        is_changed = False
+        for k in self.config.KERNEL:
+            keys = tuple(self.kernel_key(world.model, world.params[k]) for world in self.world_list)
+            if keys != self.kernel_keys[k]:
+                is_changed = True
+                # per-world kernels from the shared cache, stacked along the batch axis
+                entries = [self.get_kernel(world.model, world.params[k])[1] for world in self.world_list]
+                self.kernel[k] = np.stack([e[0] for e in entries])
+                self.kernel_sum[k] = np.asarray([e[1] for e in entries]).reshape(self.batch_shape())
+                self.kernel_rFFT[k] = np.stack([e[2] for e in entries])
+                kernel_FFT[k] = np.stack([e[3] for e in entries]) if entries[0][3] is not None else None
+                self.kernel_keys[k] = keys
+        self.kernel_FFT = kernel_FFT if kernel_FFT[0] is not None else None
+        self.calc_kernel_stack(is_changed)
+        self.kernel_updated = False
+
+    def gather(self):
+        # reload the stacked arrays after the individual worlds were edited
+        self.world.gather(self.world_list)
+
+    def scatter(self):
+        # copy the stacked arrays back into the individual worlds
+        self.world.scatter(self.world_list)
+
+    def calc_empty(self):
+        # same test as Analyzer.is_empty, for every world
+        return np.any([~(A0 > ALIVE_THRESHOLD).any(axis=self.spatial_axes) for A0 in self.world.cells], axis=0)
+
+    def center_worlds(self):
+        # same shift as Analyzer.calc_stats() + Analyzer.center_world(), for every world
+        R = self.world.model['R']
+        A = np.add.reduce(self.world.cells)
+        MA = self.axis_marginals(A, self.world.batch_dims)
+        mass = MA[0].sum(axis=-1)
+        m_center = np.stack([(ma * x).sum(axis=-1) for ma, x in zip(MA, self.X_vec)], axis=-1) / np.maximum(mass, EPSILON)[:, None]
+        shift_idx = (m_center * R).astype(int)
+        shift_idx[mass <= EPSILON] = 0
+        axes = tuple(reversed(range(len(self.X))))
+        for i in np.flatnonzero(shift_idx.any(axis=-1)):
+            for c in self.config.CHANNEL:
+                self.world.cells[c][i] = np.roll(self.world.cells[c][i], -shift_idx[i], axes)
+        self.total_shift_idx += shift_idx
+        return shift_idx
+
+    def reset(self):
+        super().reset()
+        self.total_shift_idx = np.zeros((len(self.world_list), len(self.X)))
+
+class SlabAutomaton(Automaton):
+    '''
+    Automaton of a world split into row slabs, each stepped by a worker process (--slabs N, see slab_worker())
+    Cells and environment fields live in shared memory, double-buffered: every worker reads its slab plus halo rows
+    from the current buffers (the halo exchange), steps them on a block Board with an inner Automaton (local overlap-save
+    convolution, environment and convection included) and writes its own rows into the next buffers; potentials, fields
+    and change rates are shared too, so Analyzer.calc_stats() reduces over the whole world as usual
+    The halo covers everything one step depends on (kernel support, environment diffusion, convection), so the slabs give
+    the whole-world result, except np.gradient() on the world's first and last rows, which the blocks see as interior rows
+    The reply of every worker is the barrier of a generation
+    '''
+    ENV_FIELDS = ('temperature', 'nutrients', 'waste', 'signals')
+    SOURCE_FIELDS = ('nutrient_sources', 'heat_sources')
+
+    def __init__(self, world, slabs):
+        self.slabs = slabs
+        self.processes, self.conns = [], []
+        self.shared_memory, self.shared_specs, self.views = [], {}, {}
+        self.current = 0  # index of the current cell and environment buffers
+        self.halo = 0
+        self.kernel_version = 0  # workers rebuild their kernels when it changes
+        self.is_reset_pending = False
+        super().__init__(world, use_gpu=False)
+        atexit.register(self.close)
+
+    def calc_kernel(self):
+        # whole-world kernels and geometry for the kernel view and the Analyzer (from the shared cache),
+        # workers build the kernels of their blocks; tiles and window are not used by slabs
+        super().calc_kernel()
+        self.tiles = self.tile_kernel_rFFT = self.window = None
+        self.kernel_version += 1
+
+    def slab_halo(self):
+        # rows a step depends on above and below a slab: kernel support, environment diffusion (4 sigma) and convection
+        support = max(self.kernel_support(self.world.model, self.world.params[k]) for k in self.config.KERNEL)
+        diffusion = max(Board.THERMAL_DIFFUSION, Board.NUTRIENT_DIFFUSION, Board.WASTE_DIFFUSION, Board.SIGNAL_DIFFUSION)
+        scale = self.world.env_scale
+        halo = support + scale * (int(4 * diffusion * np.sqrt(max(self.env_intervals.values())) + 0.5) + 2) + 2
+        return -(-halo // scale) * scale
+
+    def share(self, name, shape):
+        # world-sized array in a new shared memory block
+        shm = multiprocessing.shared_memory.SharedMemory(create=True, size=max(1, int(np.prod(shape)) * self.dtype.itemsize))
+        self.shared_memory.append(shm)
+        self.shared_specs[name] = (shm.name, tuple(shape))
+        return np.ndarray(shape, dtype=self.dtype, buffer=shm.buf)
+
+    def share_world(self):
+        # point the world at the shared arrays, copying in the arrays that were replaced (loading, centering, scenarios)
+        world = self.world
+        world.sync_env_scale()
+        shape, env_shape = world.cells[0].shape, world.nutrients.shape
+        if not self.shared_specs:
+            cells, env = self.share('cells', (2, len(self.config.CHANNEL)) + shape), self.share('env', (2, len(self.ENV_FIELDS)) + env_shape)
+            sources = self.share('sources', (len(self.SOURCE_FIELDS),) + env_shape)
+            self.views = {'cells': [list(cells[i]) for i in range(2)], 'env': [list(env[i]) for i in range(2)], 'sources': list(sources),
+                'potential': list(self.share('potential', (len(self.config.KERNEL),) + shape)), 'field': list(self.share('field', (len(self.config.KERNEL),) + shape)),
+                'change': list(self.share('change', (len(self.config.CHANNEL),) + shape))}
+        cells, env = self.views['cells'][self.current], self.views['env'][self.current]
+        for c in self.config.CHANNEL:
+            if world.cells[c] is not cells[c]:
+                np.copyto(cells[c], world.cells[c])
+        world.cells = list(cells)
+        for name, A in zip(self.ENV_FIELDS + self.SOURCE_FIELDS, env + self.views['sources']):
+            if getattr(world, name, None) is not None and getattr(world, name) is not A:
+                np.copyto(A, getattr(world, name))
+                setattr(world, name, A)
+
+    def start(self):
+        # (re)start the workers, slab boundaries on the environment grid
+        self.close_workers()
+        self.halo = self.slab_halo()
+        n, scale = self.world.cells[0].shape[0], self.world.env_scale
+        bounds = [(n // scale * i // self.slabs) * scale for i in range(self.slabs + 1)]
+        for r0, r1 in zip(bounds[:-1], bounds[1:]):
+            conn, child_conn = multiprocessing.Pipe()
+            process = multiprocessing.Process(target=slab_worker, daemon=True,
+                args=(child_conn, self.config, self.shared_specs, self.dtype.str, self.world.cells[0].shape, scale, (r0, r1), self.halo))
+            process.start()
+            self.processes.append(process)
+            self.conns.append(conn)
+
+    def close_workers(self):
+        for conn in self.conns:
+            conn.send(None)
+        for process in self.processes:
+            process.join()
+        self.processes, self.conns = [], []
+
+    def close(self):
+        # stop the workers and free the shared memory (the world keeps copies of its arrays)
+        if self.shared_specs:
+            self.world.cells = [A.copy() for A in self.world.cells]
+            for name in self.ENV_FIELDS + self.SOURCE_FIELDS:
+                if getattr(self.world, name, None) is not None:
+                    setattr(self.world, name, getattr(self.world, name).copy())
+        self.close_workers()
+        for shm in self.shared_memory:
+            shm.close()
+            shm.unlink()
+        self.shared_memory, self.shared_specs, self.views = [], {}, {}
+
+    def calc_once(self, is_update=True):
+        self.share_world()
+        if not self.processes or self.slab_halo() > self.halo:
+            self.start()
+        settings = {name: getattr(self, name) for name in Automaton.STEP_SETTINGS}
+        sources = [getattr(self.world, name, None) is not None for name in self.SOURCE_FIELDS]
+        message = (self.current, self.world.model, self.world.params, settings, sources, self.kernel_version, self.is_reset_pending, is_update)
+        for conn in self.conns:
+            conn.send(message)
+        errors = [reply for reply in [conn.recv() for conn in self.conns] if reply is not True]
+        self.is_reset_pending = False
+        if errors:
+            raise RuntimeError('slab worker failed:\n' + errors[0])
+
+        self.current = 1 - self.current
+        self.world.cells = list(self.views['cells'][self.current])
+        for name, A in zip(self.ENV_FIELDS, self.views['env'][self.current]):
+            setattr(self.world, name, A)
+        self.potential, self.field, self.change = list(self.views['potential']), list(self.views['field']), list(self.views['change'])
+        if is_update:
+            self.gen += 1
+            self.time = round(self.time + 1 / self.world.model['T'], ROUND)
+
+    def reset(self):
+        super().reset()
+        self.is_reset_pending = True
+
+def slab_worker(conn, config, specs, dtype, shape, env_scale, rows, halo):
+    # worker process of SlabAutomaton: steps rows r0:r1 of the shared world on a block with halo rows above and below,
+    # block length rounded up to a fast FFT size (the extra rows go below)
+    memory = [multiprocessing.shared_memory.SharedMemory(name=shm_name) for shm_name, _ in specs.values()]
+    shared = {name: np.ndarray(spec[1], dtype=dtype, buffer=shm.buf) for (name, spec), shm in zip(specs.items(), memory)}
+    r0, r1 = rows
+    length = scipy.fft.next_fast_len(r1 - r0 + 2 * halo, True)
+    while length % env_scale:
+        length = scipy.fft.next_fast_len(length + 1, True)
+    block_rows = np.arange(r0 - halo, r0 - halo + length) % shape[0]
+    env_rows = block_rows[::env_scale] // env_scale
+    interior, env_interior = slice(halo, halo + r1 - r0), slice(halo // env_scale, (halo + r1 - r0) // env_scale)
+    env_slab = slice(r0 // env_scale, r1 // env_scale)
+    board = Board([length] + list(shape[1:]), dtype=dtype, config=config)
+    board.env_scale = env_scale
+    automaton = None
+    kernel_version = None
+    while True:
+        message = conn.recv()
+        if message is None:
+            break
+        try:
+            current, board.model, board.params, settings, sources, version, is_reset, is_update = message
+            if automaton is None:
+                automaton = Automaton(board, use_gpu=False)
+                automaton.is_window, automaton.window, automaton.tile_size = False, None, 0
+            for name, value in settings.items():
+                setattr(automaton, name, value)
+            if version != kernel_version:
+                automaton.calc_kernel()
+                kernel_version = version
+            if is_reset:
+                automaton.reset()
+
+            for c in config.CHANNEL:
+                np.take(shared['cells'][current][c], block_rows, axis=0, out=board.cells[c])
+            for name, A in zip(SlabAutomaton.ENV_FIELDS, shared['env'][current]):
+                setattr(board, name, np.take(A, env_rows, axis=0))
+            for name, A, is_present in zip(SlabAutomaton.SOURCE_FIELDS, shared['sources'], sources):
+                if is_present:
+                    setattr(board, name, np.take(A, env_rows, axis=0))
+                elif hasattr(board, name):
+                    delattr(board, name)
+            automaton.calc_once(is_update)
+
+            next = 1 - current
+            for c in config.CHANNEL:
+                shared['cells'][next][c][r0:r1] = board.cells[c][interior]
+                shared['change'][c][r0:r1] = automaton.change[c][interior]
+            for name, A in zip(SlabAutomaton.ENV_FIELDS, shared['env'][next]):
+                A[env_slab] = getattr(board, name)[env_interior]
+            for k in config.KERNEL:
+                shared['potential'][k][r0:r1] = automaton.potential[k][interior]
+                shared['field'][k][r0:r1] = automaton.field[k][interior]
+            conn.send(True)
+        except Exception:
+            conn.send(traceback.format_exc())
+    del shared
+    for shm in memory:
+        shm.close()
+
+class SeriesBuffer:
+    '''
+    Time series of fixed-shape float rows (statistic rows, polar profiles), preallocated and column-major so that every
+    value has its own contiguous column, appended at the end and trimmed from the front in amortized O(1)
+    Rows live in data[start:end], read through views without copying (rows, column(), [] and np.asarray()); when the end
+    of the array is reached the live rows are moved to a new array, twice as large if they fill more than half of it,
+    so views taken earlier keep their values
+    '''
+    CAPACITY = 256
+
+    def __init__(self, shape, capacity=CAPACITY):
+        self.shape = tuple(shape)
+        self.data = np.empty((capacity,) + self.shape, order='F')
+        self.start = self.end = 0
+
+    def __len__(self):
+        return self.end - self.start
+
+    def __getitem__(self, key):
+        return self.rows[key]
+
+    def __iter__(self):
+        return iter(self.rows)
+
+    def __array__(self, dtype=None, copy=None):
+        return self.rows if dtype is None else self.rows.astype(dtype)
+
+    @property
+    def rows(self):
+        return self.data[self.start:self.end]
+
+    def column(self, i):
+        return self.data[self.start:self.end, i]
+
+    def append(self, row):
+        if self.end == self.data.shape[0]:
+            n, capacity = len(self), self.data.shape[0]
+            data = np.empty((capacity * 2 if n > capacity // 2 else capacity,) + self.shape, order='F')
+            data[:n] = self.rows
+            self.data, self.start, self.end = data, 0, n
+        self.data[self.end] = row
+        self.end += 1
+
+    def trim(self, limit):
+        # keep the last limit rows
+        self.start = max(self.start, self.end - limit)
+
+    def clear(self):
+        self.start = self.end = 0
 
 class Analyzer:
     STAT_NAMES = {'p_m':'Param m', 'p_s':'Param s', 'n':'Gen (#)', 't':'Time (s)', 
@@ -1104,25 +2898,37 @@ class Analyzer:
         # 'w2':'Rotational k=2', 'w3':'Rotational k=3', 'w4':'Rotational k=4', 'w5':'Rotational k=5', 'w6':'Rotational k=6'}
         # 'm_r':'Mass on right (mg)', 'm_l':'Mass on left (mg)', 'a':'Semi-major axis (mm)', 'b':'Semi-minor axis (mm)', 'e':'Eccentricity', 'c':'Compactness', 'w_th':'Shape angular speed (deg/s)'}
     STAT_HEADERS = list(STAT_NAMES.keys())
+    # what calc_stats() computes for each statistic, plus 'empty'/'full' for is_empty/is_full and 'polar' for polar_array
+    # (symmetry also needs is_calc_symmetry), see request_stats()
+    STAT_GROUPS = {'p_m':(), 'p_s':(), 'n':(), 't':(), 'l':(),
+        'm':('mass',), 'g':('growth',), 'r':('mass', 'center'), 'x':('mass', 'center'), 'y':('mass', 'center'),
+        'd':('mass', 'center', 'growth', 'growth_center'), 's':('mass', 'center', 'motion'), 'w':('mass', 'center', 'motion'),
+        'm_a':('mass', 'center', 'motion', 'asym'), 'k':('mass', 'symmetry'), 'w_k':('mass', 'symmetry'),
+        'polar':('mass', 'symmetry'), 'empty':('alive',), 'full':('alive',)}
     RECURRENCE_RANGE = slice(4, 11)
+    CSV_INT_STATS = ('n', 'k')  # written as integers (the series stores floats), see csv_rows()
     SEGMENT_INIT = 128
     SEGMENT_INIT_LEN = 64
     SEGMENT_LEN_SHORT = 512
     SEGMENT_LEN_LONG = 2048
     PSD_INTERVAL = 32
     def get_stat_row(self):
+        # statistics not computed by the last calc_stats() are nan
         R, T = [self.world.model[k] for k in ('R', 'T')]
         pm, ps = [self.world.params[0][k] for k in ('m', 's')]
         if self.m_center is not None:
             pos = self.m_center * R + self.total_shift_idx
         else:
-            pos = [0]*DIM
-        RN = np.power(R, DIM)
-        return [pm, ps, self.automaton.gen, self.automaton.time, 
+            pos = [0]*self.config.DIM
+        RN = np.power(R, self.config.DIM)
+        row = [pm, ps, self.automaton.gen, self.automaton.time, 
                 self.mass/RN, self.growth/RN, np.sqrt(self.inertia/self.mass) if self.mass!=0 else 0,  # self.inertia/RN  # self.inertia*RN, 
                 self.mg_dist, self.m_shift*T, self.m_rotate*T, self.mass_asym/RN,
                 pos[0], -pos[1], self.lyapunov,
                 self.symm_sides, self.symm_rotate*T]
+        if len(self.stats_done) < len(self.STAT_GROUPS):
+            row = [val if x in self.stats_done else np.nan for x, val in zip(self.STAT_HEADERS, row)]
+        return row
                 # self.density_sum[2]/R, self.density_sum[3]/R, self.density_sum[4]/R, self.density_sum[5]/R, self.density_sum[6]/R,
                 # self.rotate_wavg[2]*T, self.rotate_wavg[3]*T, self.rotate_wavg[4]*T, self.rotate_wavg[5]*T, self.rotate_wavg[6]*T]
                 # self.mass_right/RN, self.mass_left/RN
@@ -1135,12 +2941,14 @@ class Analyzer:
     def __init__(self, automaton):
         self.automaton = automaton
         self.world = self.automaton.world
+        self.config = self.automaton.config
         # self.aaa = self.world.cells
         self.trim_segment = 1
         self.is_calc_symmetry = False
         self.is_calc_psd = False
+        self.stat_requests = {}  # consumer -> (statistics, every n generations), see request_stats()
         self.object_threshold = 0.05
-        self.object_distance = 0.2 if CN==1 else 0.6
+        self.object_distance = 0.2 if self.config.CN==1 else 0.6
         self.make_border_mask()
         self.reset()
     # #################################################################
@@ -1150,10 +2958,10 @@ class Analyzer:
     def make_border_mask(self):
         A = self.world.cells[0]
         self.border_mask = np.full(A.shape, False, dtype=bool)
-        for d in range(DIM):
-            slices = [0 if d==d2 else slice(None) for d2 in range(DIM)]
+        for d in range(self.config.DIM):
+            slices = [0 if d==d2 else slice(None) for d2 in range(self.config.DIM)]
             self.border_mask[tuple(slices)] = True
-            slices = [A.shape[d]-1 if d==d2 else slice(None) for d2 in range(DIM)]
+            slices = [A.shape[d]-1 if d==d2 else slice(None) for d2 in range(self.config.DIM)]
             self.border_mask[tuple(slices)] = True
 
     def reset(self):
@@ -1171,22 +2979,34 @@ class Analyzer:
         self.object_num = -1
         self.object_list = []
 
-    def reset_values(self):
-        self.is_empty = False
-        self.is_full = False
-        self.mass = 0
-        self.growth = 0
-        self.inertia = 0
-        self.m_center = None
-        self.g_center = None
-        self.mg_dist = 0
-        self.m_shift = 0
-        self.m_angle = 0
-        self.m_rotate = 0
-        self.mass_asym = 0
-        self.mass_right = 0
-        self.mass_left = 0
+    def reset_values(self, groups=None):
+        # values of these groups of STAT_GROUPS (all if None), the others keep their last values
+        if groups is None:
+            groups = set(g for needs in self.STAT_GROUPS.values() for g in needs)
+            self.stats_done = set(self.STAT_GROUPS)
+        if 'alive' in groups:
+            self.is_empty = False
+            self.is_full = False
+        if 'mass' in groups:
+            self.mass = 0
+        if 'growth' in groups:
+            self.growth = 0
+        if 'center' in groups:
+            self.inertia = 0
+            self.m_center = None
+        if 'growth_center' in groups:
+            self.g_center = None
+            self.mg_dist = 0
+        if 'motion' in groups:
+            self.m_shift = 0
+            self.m_angle = 0
+            self.m_rotate = 0
+        if 'asym' in groups:
+            self.mass_asym = 0
+            self.mass_right = 0
+            self.mass_left = 0
         self.lyapunov = 0
+        self.stat_groups = groups
         # self.shape_major_axis = 0
         # self.shape_minor_axis = 0
         # self.shape_eccentricity = 0
@@ -1197,12 +3017,14 @@ class Analyzer:
     def reset_last(self):
         self.m_last_center = None
         self.m_center = None
+        self.m_center_gen = 0  # generation and total shift of m_center, see calc_stats()
+        self.m_center_shift = np.zeros(self.config.DIM)
         self.m_last_angle = None
         # self.shape_last_angle = None
 
     def reset_position(self):
-        self.last_shift_idx = np.zeros(DIM)
-        self.total_shift_idx = np.zeros(DIM)
+        self.last_shift_idx = np.zeros(self.config.DIM)
+        self.total_shift_idx = np.zeros(self.config.DIM)
 
     def reset_polar(self):
         self.polar_array = None
@@ -1218,13 +3040,13 @@ class Analyzer:
         self.angle_vec = None
         self.rotate_vec = None
         # self.density_vec = None
-        self.density_sum = np.zeros((SIZEF))
+        self.density_sum = np.zeros((self.config.SIZEF))
         self.density_ema = None
         self.ema_alpha = 0.05
         # self.angle_wsum = None
         # self.angle_wavg = None
         self.rotate_wsum = None
-        self.rotate_wavg = np.zeros((SIZEF))
+        self.rotate_wavg = np.zeros((self.config.SIZEF))
         self.symm_sides = 0
         self.symm_angle = 0
         self.symm_rotate = 0
@@ -1238,6 +3060,7 @@ class Analyzer:
     def calc_psd(self, X, fs, nfft=512, is_welch=True):
         if X is None or X == []:
             return None, None
+        import scipy.signal
         psd_func = scipy.signal.welch if is_welch else scipy.signal.periodogram
         freq, psd = psd_func(X, fs=fs, nfft=nfft, axis=0)
         half = len(freq)//2
@@ -1256,22 +3079,52 @@ class Analyzer:
             return 0
 
     def calc_polar_FFT(self, polar_array, is_gaussian_blur=True):
-        if is_gaussian_blur and PIXEL > 1:
-            polar_array[:SIZER, :] = scipy.ndimage.filters.gaussian_filter(polar_array[:SIZER, :], sigma=(2,1))
-        polar_FFT = self.automaton.fft1(polar_array[:SIZER, :])
-        polar_FFT = polar_FFT[:SIZER, :SIZEF]
+        if is_gaussian_blur and self.config.PIXEL > 1:
+            polar_array[:self.config.SIZER, :] = scipy.ndimage.filters.gaussian_filter(polar_array[:self.config.SIZER, :], sigma=(2,1))
+        polar_FFT = self.automaton.fft1(polar_array[:self.config.SIZER, :])
+        polar_FFT = polar_FFT[:self.config.SIZER, :self.config.SIZEF]
         polar_FFT[:, 0] = 0
         return polar_FFT
 
-    def calc_stats(self, polar_what=0, psd_x='m', psd_y='g', is_welch=True):
-        self.m_last_center = self.m_center
-        self.m_last_angle = self.m_angle
+    def request_stats(self, consumer, stats, every=1):
+        # consumer (e.g. 'search', 'plots', 'fitness', 'csv') needs these STAT_GROUPS keys every n generations,
+        # or only when passed to calc_stats() (every=0); no stats withdraws the request
+        unknown = set(stats) - set(self.STAT_GROUPS)
+        if unknown:
+            raise KeyError('unknown statistics: ' + ', '.join(sorted(unknown)))
+        if len(stats) > 0:
+            self.stat_requests[consumer] = (tuple(stats), every)
+        else:
+            self.stat_requests.pop(consumer, None)
+
+    def get_due_stats(self, stats=None):
+        # union of the requests due this generation and of stats, everything if nothing was ever requested
+        if not self.stat_requests and stats is None:
+            return set(self.STAT_GROUPS)
+        due = set(stats or ())
+        for names, every in self.stat_requests.values():
+            if every > 0 and self.automaton.gen % every == 0:
+                due.update(names)
+        return due
+
+    def calc_stats(self, polar_what=0, psd_x='m', psd_y='g', is_welch=True, stats=None):
+        # only what the due requests and stats need, see request_stats()
+        due = self.get_due_stats(stats)
+        groups = set(g for x in due for g in self.STAT_GROUPS[x])
+        if 'center' in groups:
+            self.m_last_center = self.m_center
+            last_gen, last_shift = self.m_center_gen, self.m_center_shift
+        if 'motion' in groups:
+            self.m_last_angle = self.m_angle
         # self.shape_last_angle = self.shape_angle
-        self.reset_values()
+        self.reset_values(groups)
+        self.stats_done = set(x for x, needs in self.STAT_GROUPS.items() if groups.issuperset(needs))
 
         R, T = [self.world.model[k] for k in ('R', 'T')]
-        A = np.add.reduce(self.world.cells)
-        G = np.maximum(np.add.reduce(self.automaton.field), 0)
+        if 'mass' in groups:
+            A = np.add.reduce(self.world.cells)
+        if 'growth' in groups:
+            G = np.maximum(np.add.reduce(self.automaton.field), 0)
         #focused auto-center
         # dr = int(R*1.7)
         # for d in range(DIM):
@@ -1280,22 +3133,30 @@ class Analyzer:
         #     slices = [slice(MID[d]+dr,None) if d==d2 else slice(None) for d2 in range(DIM)]
         #     A[tuple(slices)] = 0
 
-        X = self.automaton.X
-        m0 = self.mass = A.sum()
-        g0 = self.growth = G.sum()
-
-        self.channel_alive = [(A0 > ALIVE_THRESHOLD).sum() for A0 in self.world.cells]
-        self.border_alive = [(A0[self.border_mask] > ALIVE_THRESHOLD).sum() for A0 in self.world.cells]
-        self.is_empty = any(a == 0 for a in self.channel_alive)
-        self.is_full = sum(a > 0 for a in self.border_alive) > 0  #CN//3
-
-        if m0 > EPSILON:
-            AX = [A*x for x in X]
-            MX1 = [ax.sum() for ax in AX]
-            MX2 = [(ax*x).sum() for ax, x in zip(AX, X)]
-            MX = self.m_center = np.asarray(MX1) / m0
-            MuX2 = [mx2 - mx * mx1 for mx, mx1, mx2 in zip(MX, MX1, MX2)]
-            self.inertia = sum(MuX2)
+        # moments from marginal sums, see Automaton.axis_marginals()
+        X = self.automaton.X_vec
+        if 'mass' in groups:
+            MA = self.automaton.axis_marginals(A)
+            m0 = self.mass = MA[0].sum()
+        if 'growth' in groups:
+            GA = self.automaton.axis_marginals(G)
+            g0 = self.growth = GA[0].sum()
+
+        if 'alive' in groups:
+            self.channel_alive = [(A0 > ALIVE_THRESHOLD).sum() for A0 in self.world.cells]
+            self.border_alive = [(A0[self.border_mask] > ALIVE_THRESHOLD).sum() for A0 in self.world.cells]
+            self.is_empty = any(a == 0 for a in self.channel_alive)
+            self.is_full = sum(a > 0 for a in self.border_alive) > 0  #CN//3
+
+        if 'mass' in groups and m0 > EPSILON:
+            if 'center' in groups:
+                AX = [ma*x for ma, x in zip(MA, X)]
+                MX1 = [ax.sum() for ax in AX]
+                MX2 = [(ax*x).sum() for ax, x in zip(AX, X)]
+                MX = self.m_center = np.asarray(MX1) / m0
+                MuX2 = [mx2 - mx * mx1 for mx, mx1, mx2 in zip(MX, MX1, MX2)]
+                self.inertia = sum(MuX2)
+                self.m_center_gen, self.m_center_shift = self.automaton.gen, self.total_shift_idx.copy()
 
             # m11 = (AY*X).sum()
             # mu11 = m11 - mx * m10
@@ -1313,32 +3174,32 @@ class Analyzer:
                 # self.shape_rotate = self.shape_angle - self.shape_last_angle
                 # self.shape_rotate = (self.shape_rotate + 540) % 360 - 180
 
-            if g0 > EPSILON:
-                GX1 = [(G*x).sum() for x in X]
+            if 'growth_center' in groups and g0 > EPSILON:
+                GX1 = [(ga*x).sum() for ga, x in zip(GA, X)]
                 GX = self.g_center = np.asarray(GX1) / g0
                 self.mg_dist = np.linalg.norm(self.m_center - self.g_center)
 
-            if self.m_last_center is not None and self.m_last_angle is not None:
+            if 'motion' in groups and self.m_last_center is not None and self.m_last_angle is not None:
+                # per generation since the last center (one generation unless requested less often), shifts by center_world() undone
+                gap = max(1, self.automaton.gen - last_gen)
+                shift_idx = self.total_shift_idx - last_shift
                 u = self.m_center
-                v = self.m_last_center - self.last_shift_idx / R
+                v = self.m_last_center - shift_idx / R
                 dm = u - v
-                self.m_shift = np.linalg.norm(dm)
+                self.m_shift = np.linalg.norm(dm) / gap
                 self.m_angle = np.degrees(np.arctan2(dm[1], dm[0])) if self.m_shift >= EPSILON else 0
                 # c = np.dot(u, v) / np.linalg.norm(u) / np.linalg.norm(v)
                 # self.m_angle = np.degrees(np.arccos(np.clip(c, -1, 1))) if self.m_shift >= EPSILON else 0
                 self.m_rotate = self.m_angle - self.m_last_angle
-                self.m_rotate = (self.m_rotate + 540) % 360 - 180
+                self.m_rotate = ((self.m_rotate + 540) % 360 - 180) / gap
                 if self.automaton.gen <= 2:
                     self.m_rotate = 0
 
-                if DIM == 2:
-                    midpoint = np.asarray([MIDX, MIDY])
-                    X, Y = np.meshgrid(np.arange(SIZEX), np.arange(SIZEY))
-                    x0, y0 = self.m_last_center * R + midpoint - self.last_shift_idx
-                    x1, y1 = self.m_center * R + midpoint
-                    sign = (x1 - x0) * (Y - y0) - (y1 - y0) * (X - x0)
-                    self.mass_right = (A[sign>0]).sum()
-                    self.mass_left = (A[sign<0]).sum()
+                if 'asym' in groups and self.config.DIM == 2:
+                    midpoint = np.asarray([self.config.MIDX, self.config.MIDY])
+                    p0 = self.m_last_center * R + midpoint - shift_idx
+                    p1 = self.m_center * R + midpoint
+                    self.mass_right, self.mass_left = self.calc_mass_split(A, p0, p1)
                     self.mass_asym = self.mass_right - self.mass_left
                     # sign = (X - x0)
                     # self.mass_mir = (A[sign>0]).sum() - (A[sign<0]).sum()
@@ -1346,19 +3207,20 @@ class Analyzer:
             
             # self.lyapunov += ( np.log(abs(self.automaton.change.sum())) - self.lyapunov ) / self.automaton.gen
 
-            if polar_what==0: A2 = self.world.cells
-            elif polar_what==1: A2 = self.automaton.potential
-            elif polar_what==2: A2 = self.automaton.field
-            else: A2 = self.world.cells
-            A2 = sum(A2)
+            if 'symmetry' in groups:
+                if polar_what==0: A2 = self.world.cells
+                elif polar_what==1: A2 = self.automaton.potential
+                elif polar_what==2: A2 = self.automaton.field
+                else: A2 = self.world.cells
+                A2 = sum(A2)
 
-            self.polar_array = A2[self.automaton.polar_Y, self.automaton.polar_X]
-            if self.is_calc_symmetry:
-                self.polar_avg = np.average(self.polar_array[:SIZER, :SIZEF], axis=1)
-                self.polar_R = np.average(self.polar_array[:SIZER, :], axis=1)
-                self.polar_TH = np.average(self.polar_array[:SIZER, :], axis=0)
+                self.polar_array = A2[self.automaton.polar_Y, self.automaton.polar_X]
+            if 'symmetry' in groups and self.is_calc_symmetry:
+                self.polar_avg = np.average(self.polar_array[:self.config.SIZER, :self.config.SIZEF], axis=1)
+                self.polar_R = np.average(self.polar_array[:self.config.SIZER, :], axis=1)
+                self.polar_TH = np.average(self.polar_array[:self.config.SIZER, :], axis=0)
 
-                sides_row = np.arange(SIZEF).transpose()
+                sides_row = np.arange(self.config.SIZEF).transpose()
                 sides_row[0] = 1
                 self.polar_FFT = self.calc_polar_FFT(self.polar_array, is_gaussian_blur=True)
                 self.polar_density = np.abs(self.polar_FFT)
@@ -1375,7 +3237,7 @@ class Analyzer:
                     if self.last_shift_idx[0] == self.last_shift_idx[1] == 0:
                         self.polar_rotate = self.polar_angle - self.last_polar_angle
                     else:
-                        polar_array_unshift = A2[(self.automaton.polar_Y - self.last_shift_idx[1]) % SIZEY, (self.automaton.polar_X - self.last_shift_idx[0]) % SIZEX]
+                        polar_array_unshift = A2[(self.automaton.polar_Y - self.last_shift_idx[1]) % self.config.SIZEY, (self.automaton.polar_X - self.last_shift_idx[0]) % self.config.SIZEX]
                         polar_FFT_unshift = self.calc_polar_FFT(polar_array_unshift, is_gaussian_blur=True)
                         polar_angle_unshift = np.angle(polar_FFT_unshift) / sides_row
                         self.polar_rotate = polar_angle_unshift - self.last_polar_angle
@@ -1398,8 +3260,8 @@ class Analyzer:
                 self.rotate_wavg = np.sum(self.rotate_wsum, axis=0) / self.density_sum
 
                 #per radius: symmetry, rotational angle and speed
-                self.sides_vec = np.argmax(self.polar_density[:,2:SIZEF], axis=1)+2
-                sides_idx = (np.arange(SIZER), self.sides_vec)
+                self.sides_vec = np.argmax(self.polar_density[:,2:self.config.SIZEF], axis=1)+2
+                sides_idx = (np.arange(self.config.SIZER), self.sides_vec)
                 # self.density_vec = self.polar_density[sides_idx]
                 self.angle_vec = self.polar_angle[sides_idx] #/ self.sides_vec
                 self.rotate_vec = self.polar_rotate[sides_idx]
@@ -1412,7 +3274,7 @@ class Analyzer:
                 #mode
                 # self.symm_sides = self.mode(self.sides_vec)
                 #max strength
-                self.symm_sides = np.argmax(self.density_ema[2:SIZEF])+2
+                self.symm_sides = np.argmax(self.density_ema[2:self.config.SIZEF])+2
 
                 #overall: rotational angle and speed
                 #robust estimate
@@ -1428,48 +3290,84 @@ class Analyzer:
                 # self.symm_rotate = self.rotate_wavg[self.symm_sides]
 
                 #calc_period
-            else:
-                self.density_sum = np.zeros((SIZEF))
-                self.rotate_wavg = np.zeros((SIZEF))
+            elif 'symmetry' in groups:
+                self.density_sum = np.zeros((self.config.SIZEF))
+                self.rotate_wavg = np.zeros((self.config.SIZEF))
 
             if self.is_calc_psd:
-                if self.series != []:
-                    segment = self.series[-1]
-                if self.series != [] and segment != []:
+                if self.series != [] and len(self.series[-1]) > 0:
                     if self.automaton.gen % self.PSD_INTERVAL == 0:
-                        X = np.asarray([val[psd_x] for val in segment])
+                        segment = self.series[-1]
+                        X = segment.column(psd_x)
                         # if psd_y == 'x': Y = np.asarray(self.series_R)
                         # if psd_y == 'y': Y = np.asarray(self.series_TH)
                         # else:
-                        Y = np.asarray([val[psd_y] for val in segment])
+                        Y = segment.column(psd_y)
+                        X, Y = X[~np.isnan(X)], Y[~np.isnan(Y)]  # rows from before they were requested
                         self.psd_freq, self.psd1 = self.calc_psd(X, fs=T, nfft=512, is_welch=is_welch)
                         _, self.psd2 = self.calc_psd(Y, fs=T, nfft=512, is_welch=is_welch)
                         #if self.psd2 is not None: print(X.shape, self.psd1.shape, Y.shape, self.psd2.shape)
 
+    @staticmethod
+    def calc_mass_split(A, p0, p1):
+        # mass of a 2D array right and left of the line from p0 to p1 (x, y in cells), cells on the line excluded
+        # sign = (x1-x0)*(y-y0) - (y1-y0)*(x-x0) > 0 on the right: on each row y that is x < t or x > t for a threshold t,
+        # so both sides are read from cumulative row sums instead of masks over a meshgrid
+        (x0, y0), (x1, y1) = p0, p1
+        height, width = A.shape
+        rows = (x1 - x0) * (np.arange(height) - y0)
+        cum = np.cumsum(A, axis=1)
+        row_sums = cum[:, -1]
+        b = y1 - y0
+        if b == 0:
+            return row_sums[rows > 0].sum(), row_sums[rows < 0].sum()
+        t = x0 + rows / b
+        # cells x < t are the first n_below of the row, cells x > t start at first_above
+        n_below = np.clip(np.ceil(t), 0, width).astype(int)
+        first_above = np.clip(np.floor(t) + 1, 0, width).astype(int)
+        row_idx = np.arange(height)
+        below = np.where(n_below > 0, cum[row_idx, np.maximum(n_below - 1, 0)], 0)
+        above = row_sums - np.where(first_above > 0, cum[row_idx, np.maximum(first_above - 1, 0)], 0)
+        return (below.sum(), above.sum()) if b > 0 else (above.sum(), below.sum())
+
     def stats_fullname(self, i=None, x=None):
         if not x: x = self.STAT_HEADERS[i]
         return "{code}={name}".format(code=x, name=self.STAT_NAMES[x])
 
+    # CSV of statistics, same format for Lenia.save_world() (series segments) and run_headless.py (get_stat_row())
+    def csv_header(self):
+        return [self.stats_fullname(x=x) for x in self.STAT_HEADERS]
+    def csv_rows(self, rows):
+        int_idx = [self.STAT_HEADERS.index(x) for x in self.CSV_INT_STATS]
+        for row in rows:
+            row = [float(val) for val in row]
+            for i in int_idx:
+                if not np.isnan(row[i]):
+                    row[i] = int(row[i])
+            yield row
+
+    # series: list of segments, each a SeriesBuffer of rows of STAT_HEADERS; series_R, series_TH: polar profiles of the last one
     def new_segment(self):
-        if self.series == [] or self.series[-1] != []:
-            self.series.append([])
+        if self.series == [] or len(self.series[-1]) > 0:
+            self.series.append(SeriesBuffer([len(self.STAT_HEADERS)]))
     def clear_segment(self):
         if self.series != []:
-            if self.series[-1] == []:
+            if len(self.series[-1]) == 0:
                 self.series.pop()
             if self.series != []:
-                self.series[-1] = []
-        self.series_R = []
-        self.series_TH = []
+                self.series[-1].clear()
+        self.series_R = SeriesBuffer([self.config.SIZER])
+        self.series_TH = SeriesBuffer([self.config.SIZETH])
     def invalidate_segment(self):
         if self.series != []:
-            self.series[-1] = [[self.world.params[0]['m'], self.world.params[0]['s']] + [np.nan] * (len(self.STAT_HEADERS)-2)]
+            self.series[-1].clear()
+            self.series[-1].append([self.world.params[0]['m'], self.world.params[0]['s']] + [np.nan] * (len(self.STAT_HEADERS)-2))
             self.new_segment()
     def clear_series(self):
         self.current = None
         self.series = []
-        self.series_R = []
-        self.series_TH = []
+        self.series_R = SeriesBuffer([self.config.SIZER])
+        self.series_TH = SeriesBuffer([self.config.SIZETH])
         self.psd_freq = None
         self.psd1 = None
         self.psd2 = None
@@ -1493,23 +3391,20 @@ class Analyzer:
                 limit = self.SEGMENT_LEN_SHORT * multi
             elif self.trim_segment in [2]:
                 limit = self.SEGMENT_LEN_LONG * multi
-            while len(segment) > limit:
-                segment.pop(0)
-            while len(self.series_R) > limit:
-                self.series_R.pop(0)
-            while len(self.series_TH) > limit:
-                self.series_TH.pop(0)
+            segment.trim(limit)
+            self.series_R.trim(limit)
+            self.series_TH.trim(limit)
 
     def center_world(self):
-        if self.mass < EPSILON or self.m_center is None:
+        if self.mass < EPSILON or self.m_center is None or 'center' not in self.stat_groups:
             return
-        axes = tuple(reversed(range(DIM)))
+        axes = tuple(reversed(range(self.config.DIM)))
         self.last_shift_idx = (self.m_center * self.world.model['R']).astype(int)
         self.total_shift_idx += self.last_shift_idx
-        self.world.cells = [np.roll(self.world.cells[c], -self.last_shift_idx, axes) for c in CHANNEL]
-        self.automaton.potential = [np.roll(self.automaton.potential[k], -self.last_shift_idx, axes) for k in KERNEL]
-        self.automaton.field = [np.roll(self.automaton.field[k], -self.last_shift_idx, axes) for k in KERNEL]
-        self.automaton.change = [np.roll(self.automaton.change[c], -self.last_shift_idx, axes) for c in CHANNEL]
+        self.world.cells = [np.roll(self.world.cells[c], -self.last_shift_idx, axes) for c in self.config.CHANNEL]
+        self.automaton.potential = [np.roll(self.automaton.potential[k], -self.last_shift_idx, axes) for k in self.config.KERNEL]
+        self.automaton.field = [np.roll(self.automaton.field[k], -self.last_shift_idx, axes) for k in self.config.KERNEL]
+        self.automaton.change = [np.roll(self.automaton.change[c], -self.last_shift_idx, axes) for c in self.config.CHANNEL]
         # self.world.cells = scipy.ndimage.shift(self.world.cells, -self.last_shift_idx, order=0, mode='wrap')
 
     def detect_objects(self):
@@ -1518,22 +3413,21 @@ class Analyzer:
         ensure_spacing: https://github.com/scikit-image/scikit-image/blob/main/skimage/_shared/coord.py
         '''
 
+        import skimage.feature, skimage.segmentation, skimage._shared.coord
         compact_watershed = 0.001
         blur = 0
         R = self.world.model['R']
         A = sum(self.automaton.potential) / len(self.automaton.potential)
-        if KN == 1 and self.world.model.get('P') == 1:
+        if self.config.KN == 1 and self.world.model.get('P') == 1:
             # cognitive domain of the glider in GoL
             for ii in range(2):
-                fft = self.automaton.fftn(A)
-                fft = self.automaton.kernel_FFT[0] * fft
-                A = self.automaton.fftshift(np.real(self.automaton.ifftn(fft)))
+                _, A = self.automaton.convolve(self.automaton.fft_world(A), 0)
         elif blur:
             A = scipy.ndimage.gaussian_filter(A, sigma=blur)
         A[A < 0.01] = 0
 
         # tile array by 3x3 to simulate periodic boundaries
-        A_tiled = np.tile(A, tuple([3]*DIM))
+        A_tiled = np.tile(A, tuple([3]*self.config.DIM))
         untile_slices = tuple([slice(size, size*2) for size in A.shape])
 
         # get all possible peaks (with periodic boundaries)
@@ -1551,7 +3445,7 @@ class Analyzer:
         self.peak_mask[tuple(self.good_peaks.T)] = True
         self.peak_labels, _ = scipy.ndimage.label(self.peak_mask)
 
-        labels_tiled = np.tile(self.peak_labels, tuple([3]*DIM))
+        labels_tiled = np.tile(self.peak_labels, tuple([3]*self.config.DIM))
 
         # segmentation across borders
         self.object_map = skimage.segmentation.watershed(-A_tiled, labels_tiled, mask=A_tiled, compactness=compact_watershed)
@@ -1563,7 +3457,7 @@ class Analyzer:
         max_label = np.amax(self.object_map)
         self.object_list = []
         for label in range(1, max_label+1):
-            self.object_list.append([self.world.cells[c][self.object_map == label] for c in CHANNEL])
+            self.object_list.append([self.world.cells[c][self.object_map == label] for c in self.config.CHANNEL])
         self.object_num = len(self.object_list)
         
         #RN = np.power(R, DIM)
@@ -1594,6 +3488,7 @@ class Recorder:
         '{output}']  # ouput file
 
     def __init__(self, world_list, is_save_gif):
+        import_gui()
         self.world_list = world_list
         self.is_save_gif = is_save_gif
         self.is_recording = False
@@ -1751,17 +3646,25 @@ class Lenia:
     POLYGON_NAME = {1:'irregular', 2:'bilateral', 3:'trimeric', 4:'tetrameric', 5:'pentameric', 
         6:'hexameric', 7:'heptameric', 8:'octameric', 9:'nonameric', 10:'decameric', 0:'polymeric'}
     SAVE_ROOT = 'save'
-    ANIMALS_PATH = 'animals.json' if DIM==2 else 'animals'+str(DIM)+'D.json'
-    found_path = args.F
-    if found_path is None:
-        found_path = '{D}{C}{K}{X}.json'.format(D=DIM, C=CN, K=KN, X='' if XN==1 else str(XN))
-    elif not found_path.endswith('.json'):
-        found_path += '.json'
-    FOUND_ANIMALS_PATH = 'found/' + found_path
+    # paths of the active configuration, see configure()
+    @property
+    def ANIMALS_PATH(self):
+        return 'animals.json' if DIM==2 else 'animals'+str(DIM)+'D.json'
+    @property
+    def FOUND_ANIMALS_PATH(self):
+        found_path = args.F
+        if found_path is None:
+            found_path = '{D}{C}{K}{X}.json'.format(D=DIM, C=CN, K=KN, X='' if XN==1 else str(XN))
+        elif not found_path.endswith('.json'):
+            found_path += '.json'
+        return 'found/' + found_path
     #SOFT_CLIP_NAME_LIST = ["Off","tanh","log 10000","log 1000","log 100","log 10"]
     SOFT_CLIP_NAME_LIST = ["Off","tanh","exp 11","exp 10","exp 9","exp 8","exp 7","exp 6","exp 5","exp 4"]
+    SCENARIO_STATUS = {'default':"> Reset to uniform environment", 'vents':"> Set up hydrothermal vent scenario",
+        'gradient':"> Set up temperature gradient", 'islands':"> Set up nutrient island scenario"}
 
     def __init__(self):
+        import_gui()
         self.is_run = True
         self.run_counter = -1
         self.is_closing = False
@@ -1877,10 +3780,13 @@ class Lenia:
         self.world = self.world_list[0]
         self.blank_channel = np.zeros(self.world.cells[0].shape)
         # self.target = Board((SIZEY, SIZEX))
-        self.automaton_list = [ Automaton(world) for world in self.world_list ]
+        self.automaton_list = [ SlabAutomaton(world, args.SLABS) if args.SLABS > 1 else Automaton(world) for world in self.world_list ]
         self.automaton = self.automaton_list[0]
         self.analyzer = Analyzer(self.automaton_list[0])
         self.recorder = Recorder(self.world_list, is_save_gif=True) #is_save_gif=not self.is_show_rgb())
+        self.step_pool = None  # threads stepping the automata of several worlds, see calc_automata()
+        self.step_pool_size = 0
+        self.step_times = []  # last step duration of each world, in seconds
         self.clear_transform()
         # Ammonia environment state - ENABLED BY DEFAULT
         self.is_ammonia = True
@@ -2329,16 +4235,14 @@ class Lenia:
     def put_world_in_leaderboard(self):
         multi = max(1, self.world.model['T'] // 10)
         start_gen = self.analyzer.SEGMENT_INIT * multi
-        seg = self.analyzer.series[-1][start_gen:]
-        val_seg = [val[self.stats_x] for val in seg]
+        seg = self.analyzer.series[-1].column(self.stats_x)[start_gen:]
+        val_seg = seg[~np.isnan(seg)]  # rows without the statistic (invalidated segment)
         if self.search_algo in [4]:
-            fitness = sum(val_seg) / len(val_seg)
+            fitness = val_seg.mean()
         elif self.search_algo in [5]:
-            avg = sum(val_seg) / len(val_seg) 
-            var = sum([((x - avg) ** 2) for x in val_seg]) / len(val_seg)
-            fitness = var ** 0.5
+            fitness = val_seg.std()
         elif self.search_algo in [6]:
-            fitness = max(val_seg)
+            fitness = val_seg.max()
         func = ["avg","stdev","max"][self.search_algo-4]
         cname = "{func}({stat})={fitness:.3f}".format(func=func, stat=self.stats_x_name, fitness=fitness)
         self.world.names['cname'] = cname
@@ -2631,45 +4535,10 @@ class Lenia:
     
     def setup_environmental_scenario(self, scenario='default'):
         """
-        Set up interesting environmental scenarios
-        
-        Available scenarios:
-        - 'default': uniform environment
-        - 'vents': nutrient vents and cold zones (hydrothermal vents on ice moon)
-        - 'gradient': temperature gradient (hot to cold)
-        - 'islands': nutrient islands in desert
+        Set up interesting environmental scenarios, see Board.setup_environmental_scenario()
         """
-        if scenario == 'vents':
-            self.world.setup_environmental_features(num_vents=3, num_cold_zones=2)
-            STATUS.append("> Set up hydrothermal vent scenario")
-        
-        elif scenario == 'gradient':
-            # Create temperature gradient
-            if DIM == 2:
-                gradient = np.linspace(200, 220, SIZE[1])
-                self.world.temperature = np.tile(gradient[:, np.newaxis], (1, SIZE[0]))
-            STATUS.append("> Set up temperature gradient")
-        
-        elif scenario == 'islands':
-            # Create nutrient islands
-            self.world.nutrients *= 0.2  # Low baseline
-            num_islands = 5
-            for _ in range(num_islands):
-                if DIM == 2:
-                    x, y = np.random.randint(0, SIZE[0]), np.random.randint(0, SIZE[1])
-                    radius = 25
-                    y_grid, x_grid = np.ogrid[:SIZE[1], :SIZE[0]]
-                    mask = (x_grid - x)**2 + (y_grid - y)**2 <= radius**2
-                    self.world.nutrients[mask] = 1.0
-            STATUS.append("> Set up nutrient island scenario")
-        
-        elif scenario == 'default':
-            # Reset to uniform
-            self.world.nutrients = np.ones(SIZE)
-            self.world.waste = np.zeros(SIZE)
-            self.world.temperature = np.full(SIZE, 210.0)
-            STATUS.append("> Reset to uniform environment")
-        
+        self.world.setup_environmental_scenario(scenario)
+        STATUS.append(self.SCENARIO_STATUS[scenario])
         self.info_type = 'info'
 
     def clean_code(self, code):
@@ -2904,45 +4773,10 @@ class Lenia:
     
     def setup_environmental_scenario(self, scenario='default'):
         """
-        Set up interesting environmental scenarios
-        
-        Available scenarios:
-        - 'default': uniform environment
-        - 'vents': nutrient vents and cold zones (hydrothermal vents on ice moon)
-        - 'gradient': temperature gradient (hot to cold)
-        - 'islands': nutrient islands in desert
+        Set up interesting environmental scenarios, see Board.setup_environmental_scenario()
         """
-        if scenario == 'vents':
-            self.world.setup_environmental_features(num_vents=3, num_cold_zones=2)
-            STATUS.append("> Set up hydrothermal vent scenario")
-        
-        elif scenario == 'gradient':
-            # Create temperature gradient
-            if DIM == 2:
-                gradient = np.linspace(200, 220, SIZE[1])
-                self.world.temperature = np.tile(gradient[:, np.newaxis], (1, SIZE[0]))
-            STATUS.append("> Set up temperature gradient")
-        
-        elif scenario == 'islands':
-            # Create nutrient islands
-            self.world.nutrients *= 0.2  # Low baseline
-            num_islands = 5
-            for _ in range(num_islands):
-                if DIM == 2:
-                    x, y = np.random.randint(0, SIZE[0]), np.random.randint(0, SIZE[1])
-                    radius = 25
-                    y_grid, x_grid = np.ogrid[:SIZE[1], :SIZE[0]]
-                    mask = (x_grid - x)**2 + (y_grid - y)**2 <= radius**2
-                    self.world.nutrients[mask] = 1.0
-            STATUS.append("> Set up nutrient island scenario")
-        
-        elif scenario == 'default':
-            # Reset to uniform
-            self.world.nutrients = np.ones(SIZE)
-            self.world.waste = np.zeros(SIZE)
-            self.world.temperature = np.full(SIZE, 210.0)
-            STATUS.append("> Reset to uniform environment")
-        
+        self.world.setup_environmental_scenario(scenario)
+        STATUS.append(self.SCENARIO_STATUS[scenario])
         self.info_type = 'info'
 
     def clean_code(self, code):
@@ -3121,22 +4955,23 @@ class Lenia:
                     # Purple/Magenta = high waste (toxic)
                     
                     # Create base nutrient colors
-                    red = 1.0 - self.world.nutrients  # High when nutrients low
-                    green = self.world.nutrients       # High when nutrients high
-                    blue = self.world.nutrients * 0.3  # Slight blue tint
+                    nutrients, waste = self.world.env_field('nutrients'), self.world.env_field('waste')
+                    red = 1.0 - nutrients  # High when nutrients low
+                    green = nutrients       # High when nutrients high
+                    blue = nutrients * 0.3  # Slight blue tint
                     
                     # Add waste as purple/magenta overlay
                     if self.automaton.is_waste_enabled:
                         # Waste adds to red and blue (creates purple/magenta)
-                        red = np.clip(red + self.world.waste * 0.7, 0, 1)
-                        blue = np.clip(blue + self.world.waste * 0.8, 0, 1)
+                        red = np.clip(red + waste * 0.7, 0, 1)
+                        blue = np.clip(blue + waste * 0.8, 0, 1)
                         # Reduce green where waste is high (makes it more purple)
-                        green = green * (1.0 - self.world.waste * 0.5)
+                        green = green * (1.0 - waste * 0.5)
                     
                     # Add chemical signals as cyan overlay
                     if self.automaton.is_signals_enabled:
                         # Signals add to green and blue (creates cyan)
-                        signal_intensity = self.world.signals * 0.5  # Half intensity for visibility
+                        signal_intensity = self.world.env_field('signals') * 0.5  # Half intensity for visibility
                         green = np.clip(green + signal_intensity, 0, 1)
                         blue = np.clip(blue + signal_intensity, 0, 1)
                     
@@ -3149,24 +4984,25 @@ class Lenia:
                     modulation = self.world.get_adaptive_growth_modulation()
                     
                     # Create behavior map with distinct colors
-                    red = np.zeros_like(self.world.nutrients)
-                    green = np.zeros_like(self.world.nutrients)
-                    blue = np.zeros_like(self.world.nutrients)
+                    nutrients, waste = self.world.env_field('nutrients'), self.world.env_field('waste')
+                    red = np.zeros_like(nutrients)
+                    green = np.zeros_like(nutrients)
+                    blue = np.zeros_like(nutrients)
                     
                     # REST zones (nutrients > 0.7) - Green
-                    rest_mask = self.world.nutrients > 0.7
+                    rest_mask = nutrients > 0.7
                     green[rest_mask] = 0.9
                     red[rest_mask] = 0.1
                     blue[rest_mask] = 0.2
                     
                     # HUNT zones (nutrients < 0.3 AND waste < 0.4) - Yellow
-                    hunt_mask = (self.world.nutrients < 0.3) & (self.world.waste < 0.4)
+                    hunt_mask = (nutrients < 0.3) & (waste < 0.4)
                     red[hunt_mask] = 1.0
                     green[hunt_mask] = 0.9
                     blue[hunt_mask] = 0.0
                     
                     # FLEE zones (waste > 0.6) - Red
-                    flee_mask = self.world.waste > 0.6
+                    flee_mask = waste > 0.6
                     red[flee_mask] = 1.0
                     green[flee_mask] = 0.1
                     blue[flee_mask] = 0.1
@@ -3289,6 +5125,7 @@ class Lenia:
             if self.is_show_rgb():
                 ones = np.ones(label.shape)
                 hsv = np.dstack([label, ones, ones])
+                import skimage.color
                 rgb = skimage.color.hsv2rgb(hsv)
                 np.putmask(A[0], mask, rgb[...,0])
                 np.putmask(A[1], mask, rgb[...,1])
@@ -3332,7 +5169,7 @@ class Lenia:
                 
                 # Add nutrient overlay if enabled
                 if self.show_nutrients_overlay and self.automaton.is_nutrients_enabled:
-                    nutrients_2d = self.world.nutrients
+                    nutrients_2d = self.world.env_field('nutrients')
                     if DIM > 2:
                         # For higher dimensions, show a slice
                         for d in range(DIM-2):
@@ -3357,7 +5194,7 @@ class Lenia:
                 
                 # Add nutrient overlay if enabled
                 if self.show_nutrients_overlay and self.automaton.is_nutrients_enabled:
-                    nutrients_2d = self.world.nutrients
+                    nutrients_2d = self.world.env_field('nutrients')
                     if DIM > 2:
                         # For higher dimensions, show a slice
                         for d in range(DIM-2):
@@ -3404,8 +5241,8 @@ class Lenia:
             elif self.polar_mode in [3] and self.analyzer.polar_array is not None and self.analyzer.series_TH is not None:
                 A2 = np.zeros(self.analyzer.polar_array.shape)
                 if len(self.analyzer.series_TH) > 0:
-                    X = np.asarray(self.analyzer.series_TH)
-                    Y = np.asarray(self.analyzer.series_R).transpose()
+                    X = self.analyzer.series_TH.rows
+                    Y = self.analyzer.series_R.rows.transpose()
                     X_len = min(X.shape[0], SIZER-1)
                     Y_len = min(Y.shape[1], SIZETH)
                     X = X[-X_len:, :SIZETH]
@@ -3670,11 +5507,16 @@ class Lenia:
         is_xy = self.stats_x_name in ['x'] and self.stats_y_name in ['y'] and self.stats_mode in [2]
         if series != [] and is_current_series:
             series = [series[-1]]
-        if series != [] and series != [[]]:
-            X = [np.asarray([val[self.stats_x] for val in seg]) for seg in series if len(seg)>0]
-            Y = [np.asarray([val[self.stats_y] for val in seg]) for seg in series if len(seg)>0]
-            S = [seg[0][1] for seg in series if len(seg)>0]
-            M = [seg[0][0] for seg in series if len(seg)>0]
+        series = [seg for seg in series if len(seg)>0]
+        if series != []:
+            X = [seg.column(self.stats_x) for seg in series]
+            Y = [seg.column(self.stats_y) for seg in series]
+            S = [seg[0, 1] for seg in series]
+            M = [seg[0, 0] for seg in series]
+            # skip rows without these statistics (invalidated segments keep their first row, drawn as a mark)
+            valid = [~(np.isnan(x) | np.isnan(y)) for x, y in zip(X, Y)]
+            X = [x[v] if v.any() else x[:1] for x, v in zip(X, valid)]
+            Y = [y[v] if v.any() else y[:1] for y, v in zip(Y, valid)]
             # if name_x in ['n', 't']: X = [seg - seg.min() for seg in X]
             # if name_y in ['n', 't']: Y = [seg - seg.min() for seg in Y]
             xmin, xmax = min(seg.min() for seg in X if seg.size>0), max(seg.max() for seg in X if seg.size>0)
@@ -3768,11 +5610,15 @@ class Lenia:
 
     def draw_recurrence(self, e=0.1, steps=10):
         ''' https://stackoverflow.com/questions/33650371/recurrence-plot-in-python '''
+        import scipy.spatial.distance
         if self.analyzer.series == [] or len(self.analyzer.series[-1]) < 2:
             return
 
         size = min(SIZEX*PIXEL, SIZEY*PIXEL)
-        segment = np.asarray(self.analyzer.series[-1])[-size:, self.analyzer.RECURRENCE_RANGE]
+        segment = self.analyzer.series[-1][-size:, self.analyzer.RECURRENCE_RANGE]
+        segment = segment[~np.isnan(segment).any(axis=1)]  # rows without these statistics
+        if segment.shape[0] < 2:
+            return
         vmin, vmax = segment.min(axis=0), segment.max(axis=0)
         # vmean = (vmax + vmin) / 2
         # d = vmax - vmin < 0.01
@@ -3791,6 +5637,41 @@ class Lenia:
             self.fps = freq / (this_time - self.last_time)
             self.last_time = this_time
 
+    @staticmethod
+    def step_automaton(automaton):
+        start = time.perf_counter()
+        automaton.calc_once()
+        return time.perf_counter() - start
+
+    def calc_automata(self):
+        # one generation of every world, on a thread pool when there are several (NumPy FFTs and ufuncs release the GIL)
+        # collecting all the results is the barrier, no world starts the next generation before the others finish
+        if len(self.automaton_list) == 1:
+            self.step_times = [self.step_automaton(self.automaton_list[0])]
+            return
+        workers = min(len(self.automaton_list), multiprocessing.cpu_count())
+        if self.step_pool is None or self.step_pool_size != workers:
+            self.close_step_pool()
+            self.step_pool = concurrent.futures.ThreadPoolExecutor(max_workers=workers, thread_name_prefix='lenia-step')
+            self.step_pool_size = workers
+        self.step_times = list(self.step_pool.map(self.step_automaton, self.automaton_list))
+
+    def close_step_pool(self):
+        if self.step_pool is not None:
+            self.step_pool.shutdown()
+            self.step_pool = None
+
+    def get_step_times_st(self):
+        return "step ms: " + ", ".join("{:.1f}".format(t * 1000) for t in self.step_times)
+
+    def update_stat_requests(self):
+        # what the window reads, the Analyzer computes only that (see Analyzer.request_stats())
+        # the series is recorded at every generation (add_stats()) and read whole by the plots, the search and the CSV
+        # of save_world(), so its rows stay complete whatever plot is shown
+        self.analyzer.request_stats('status', ['empty', 'full', 'x', 'y'])  # info bar, auto-center, markers
+        self.analyzer.request_stats('series', self.analyzer.STAT_HEADERS)
+        self.analyzer.request_stats('polar', ['polar'] if self.analyzer.is_calc_symmetry else [])
+
     def change_b(self, i, d, s=12):
         b = self.world.params[self.show_kernel]['b'].copy()
         B = len(b)
@@ -3928,8 +5809,9 @@ class Lenia:
                 json.dump(to_save, file, indent=4, ensure_ascii=False)
             with open(path+'.csv', 'w', newline='\n') as file:
                 writer = csv.writer(file)
-                writer.writerow([self.analyzer.stats_fullname(x=x) for x in self.analyzer.STAT_HEADERS])
-                writer.writerows([e for l in self.analyzer.series for e in l])
+                writer.writerow(self.analyzer.csv_header())
+                for segment in self.analyzer.series:
+                    writer.writerows(self.analyzer.csv_rows(segment))
             STATUS.append("> data and image saved to '"+path+".*'")
             self.is_save_image = True
         except IOError as e:
@@ -4417,7 +6299,7 @@ class Lenia:
 
         self.menu.add_cascade(label='Lenia', menu=self.create_submenu(self.menu, [
             '^is_run|Running|Return', '|Once|Space'] + 
-            (['^automaton.is_gpu|Use GPU|s+c+G', '|*(GPU: '+self.automaton.gpu_thr._device.name+')|'] if self.automaton.has_gpu else ['|No GPU available|']) + [None,
+            (['^automaton.is_gpu|Use GPU|s+c+G', '|*(GPU: '+(self.automaton.gpu_thr._device.name if self.automaton.gpu_thr else 'probed on first use')+')|'] if self.automaton.has_gpu else ['|No GPU available|']) + [None,
             '@show_what|Display|Tab', '@show_kernel|*Kernel|QuoteLeft|`', '@colormap_id|Colors|s+Period|>', None,
             '|*Show lifeform name|Comma|,', '|*Show params|Period|.', '|*Show info|Slash|/', '|*Show auto-rotate info|s+Slash|?', None,
             '|Save data & image|c+S', '|*Save next in sequence|s+c+S', 
@@ -4511,7 +6393,9 @@ class Lenia:
     def get_time_st(self):
         T = self.world.model['T']
         status = 'EMP' if self.analyzer.is_empty else 'OVR' if self.analyzer.is_full else ''
-        return "gen={}, t={}s, dt={}s, sampl={} {} obj={}".format(self.automaton.gen, self.automaton.time, 1/T, self.samp_freq, status, self.analyzer.object_num)
+        st = "gen={}, t={}s, dt={}s, sampl={} {} obj={}".format(self.automaton.gen, self.automaton.time, 1/T, self.samp_freq, status, self.analyzer.object_num)
+        if len(self.step_times) > 1: st += " | " + self.get_step_times_st()
+        return st
 
     def get_angular_st(self):
         if self.auto_rotate_mode in [3]:
@@ -4536,7 +6420,9 @@ class Lenia:
         if self.info_type or STATUS or self.is_show_fps:
             info_st = ""
             if STATUS: info_st = "\n".join(STATUS)
-            elif self.is_show_fps and self.fps: info_st = "FPS: {:.1f}".format(self.fps)
+            elif self.is_show_fps and self.fps:
+                info_st = "FPS: {:.1f}".format(self.fps)
+                if len(self.step_times) > 1: info_st += " | " + self.get_step_times_st()
             elif self.info_type == 'params':
                 env = "NH₃" if self.is_ammonia else "H₂O"
                 info_st = f"{env} env | " + self.get_value_text('show_group') + " | " + self.world.params2st(self.world.params[self.show_kernel], is_brief=True)
@@ -4575,6 +6461,7 @@ class Lenia:
         self.is_loop = False
         if self.recorder.is_recording:
             self.recorder.finish_record()
+        self.close_step_pool()
         self.window.destroy()
 
     def run(self):
@@ -4588,10 +6475,10 @@ class Lenia:
                 break
             if self.is_run:
                 self.calc_fps()
-                for automaton in self.automaton_list:
-                    automaton.calc_once()
+                self.calc_automata()
                 # self.automaton.calc_once()
                 self.analyzer.center_world()
+                self.update_stat_requests()
                 if self.show_what==4 or self.markers_mode in [1,3,5,7]:
                     if (self.search_mode != 0 and counter % self.samp_freq == 0) or \
                        (self.search_mode == 0 and self.automaton.gen % 10 == 0):
@@ -4630,6 +6517,7 @@ class Lenia:
         print("Lenia in n-Dimensions    by Bert Chan 2020    Run '{program} -h' for startup arguments.".format(program=sys.argv[0]))
 
 if __name__ == '__main__':
+    configure(LeniaConfig.from_args())
     lenia = Lenia()
     #lenia.print_help()
     if CN==1 and KN==1:
@@ -0,0 +1,61 @@
+import sys
+import time
+import numpy as np
+import scipy.ndimage
+
+# --- BENCHMARK DE LA CONVECTION ---
+# Compare Board.apply_convection (semi-lagrangien : coordonnées de départ calculées une fois, puis un map_coordinates par champ)
+# à l'ancien chemin (scipy.ndimage.shift champ par champ).
+# Les arguments sont ceux de Lenia, ex: python benchmark_convection.py -c 3 -w 10 -p 0 --env-scale 2
+
+import Lenia_Ammonia_V3
+from Lenia_Ammonia_V3 import Board, StepWorkspace
+
+# Le module ne lit plus la ligne de commande à l'importation
+CONFIG = Lenia_Ammonia_V3.configure(Lenia_Ammonia_V3.LeniaConfig.from_args())
+SIZE, CHANNEL = CONFIG.SIZE, CONFIG.CHANNEL
+
+REPEAT = 20
+
+def legacy_convection(world, dt=1.0):
+    """Ancien Board.apply_convection, gardé ici comme référence"""
+    CONVECTION_STRENGTH = 0.008
+    grad_temp = np.gradient(world.temperature)
+    shift_y = -grad_temp[0] * CONVECTION_STRENGTH * dt
+    shift_x = -grad_temp[1] * CONVECTION_STRENGTH * dt
+    for c in range(len(world.cells)):
+        try:
+            world.cells[c] = scipy.ndimage.shift(world.cells[c], [shift_y, shift_x], mode='wrap', order=1)
+        except:
+            pass
+    try:
+        world.nutrients = scipy.ndimage.shift(world.nutrients, [shift_y, shift_x], mode='wrap', order=1)
+        world.waste = scipy.ndimage.shift(world.waste, [shift_y, shift_x], mode='wrap', order=1)
+        world.signals = scipy.ndimage.shift(world.signals, [shift_y, shift_x], mode='wrap', order=1)
+    except:
+        pass
+
+def make_world():
+    np.random.seed(0)
+    world = Board(SIZE)
+    for c in CHANNEL:
+        world.cells[c][:] = np.random.rand(*SIZE)
+    world.setup_environmental_features()
+    world.sync_env_scale()
+    return world
+
+def bench(name, step):
+    world = make_world()
+    step(world)
+    start = time.perf_counter()
+    for i in range(REPEAT):
+        step(world)
+    elapsed = (time.perf_counter() - start) / REPEAT * 1000
+    print(f"{name:<16} {elapsed:8.2f} ms/step  masse {sum(A.sum() for A in world.cells):.4f}")
+
+if __name__ == '__main__':
+    print(f"taille {SIZE}, {len(CHANNEL)} canaux, {REPEAT} pas")
+    if make_world().env_scale == 1:
+        bench('ancien (shift)', lambda world: legacy_convection(world, dt=0.1))
+    ws = StepWorkspace()
+    bench('semi-lagrangien', lambda world: world.apply_convection(dt=0.1, workspace=ws))
@@ -0,0 +1,52 @@
+import sys
+import numpy as np
+
+# --- VÉRIFICATION DES TUILES ---
+# Compare un monde simulé par tuiles actives (--tiles) au même monde simulé en entier, après quelques générations.
+# Les blocs des tuiles ont une taille paire (ActiveTiles.fast_len), le cas d'un bloc impair est forcé ici
+# pour vérifier que build_kernel() centre le noyau correctement quelle que soit la taille.
+# ex: python check_tiles.py            code de sortie 1 si un écart dépasse TOLERANCE
+
+import Lenia_Ammonia_V3
+from Lenia_Ammonia_V3 import LeniaConfig, Board, Automaton, ActiveTiles
+
+SIZE = 512
+STEPS = 3
+TOLERANCE = 1e-10
+ENV_FEATURES = ('temperature', 'nutrients', 'waste', 'signals', 'behavior')
+
+def run(R, tiles):
+    config = LeniaConfig(size=[SIZE], tiles=tiles)
+    np.random.seed(1)
+    world = Board([SIZE, SIZE], config=config)
+    world.model = {'R':R, 'T':10, 'P':0, 'kn':1, 'gn':1}
+    world.params[0].update({'m':0.15, 's':0.016, 'rings':[{'r':0.5, 'w':0.5, 'b':1}]})
+    world.init_channels()
+    world.cells[0][200:300, 200:300] = np.random.rand(100, 100)
+    automaton = Automaton(world, use_gpu=False)
+    # les champs d'environnement ne sont pas découpés en tuiles
+    for name in ENV_FEATURES:
+        setattr(automaton, 'is_'+name+'_enabled', False)
+    automaton.calc_kernel()
+    for i in range(STEPS):
+        automaton.calc_once()
+    return world.cells[0], automaton.tiles
+
+def check(name, R, tile):
+    whole, _ = run(R, 0)
+    tiled, tiles = run(R, tile)
+    diff = np.abs(whole - tiled).max()
+    print(f"{name:<12} R={R:<4} tuile {tile:<4} bloc {tiles.block}  écart {diff:.2e}")
+    return diff <= TOLERANCE
+
+if __name__ == '__main__':
+    ok = check('bloc pair', 120, 128)
+    ok = check('bloc pair', 60, 128) and ok
+    # next_fast_len(128 + 2*halo) = 375 pour R=120 : bloc impair
+    fast_len = ActiveTiles.fast_len
+    ActiveTiles.fast_len = staticmethod(lambda n: Lenia_Ammonia_V3.scipy.fft.next_fast_len(n, True))
+    try:
+        ok = check('bloc impair', 120, 128) and ok
+    finally:
+        ActiveTiles.fast_len = fast_len
+    sys.exit(0 if ok else 1)
@@ -2,10 +2,12 @@ import pygad
 import numpy as np
 import copy
 import sys
+import os
+import multiprocessing, multiprocessing.shared_memory
 
-# --- DÉBUT DU HACK ---
-# Nous devons "patcher" le script Lenia AVANT de l'importer
-# pour qu'il sache qu'il doit fonctionner en mode 3 canaux.
+# --- CONFIGURATION LENIA ---
+# Le module Lenia ne lit plus la ligne de commande à l'importation,
+# on lui donne explicitement une configuration 3 canaux (LeniaConfig).
 
 # Assurez-vous que c'est le bon nom de fichier !
 LENIA_SCRIPT_NAME = "Lenia_Ammonia_V3_Test" 
@@ -18,27 +20,35 @@ except ModuleNotFoundError:
     print("Veuillez vous assurer que le nom est correct et qu'il se trouve dans le même dossier.")
     sys.exit()
 
-# Appliquez le patch sur les variables globales du module
-LeniaModule.CN = 3  # Forcer 3 canaux
-LeniaModule.KN = 1  # 1 noyau par canal
-LeniaModule.XN = 0  # 0 noyau croisé (pour rester simple)
-LeniaModule.CHANNEL = range(LeniaModule.CN)
-# KERNEL = range(KN*CN + XN*CN*(CN-1)) = range(1*3 + 0) = range(3)
-LeniaModule.KERNEL = range(LeniaModule.KN * LeniaModule.CN)
-# --- FIN DU HACK ---
+def configure_lenia(fft_workers=0):
+    """Mode 3 canaux, appliqué à l'importation puis dans chaque processus du pool."""
+    # 3 canaux, 1 noyau par canal, 0 noyau croisé (pour rester simple)
+    # KERNEL = range(KN*CN + XN*CN*(CN-1)) = range(1*3 + 0) = range(3)
+    LeniaModule.configure(LeniaModule.LeniaConfig(channels=3, kernels=1, cross=0, fft_workers=fft_workers))
 
+configure_lenia()
+# --- FIN DE LA CONFIGURATION ---
 
-# Maintenant, importez les classes du module patché
-from Lenia_Ammonia_V3_Test import Board, Automaton, Analyzer
+
+# Maintenant, importez les classes du module configuré
+from Lenia_Ammonia_V3_Test import Board, Automaton, Analyzer, BatchAutomaton
 
 # --- Constantes pour l'évolution ---
 SIM_STEPS = 200
 SIM_SIZE = [128, 128]
 INITIAL_NUTRIENTS = float(SIM_SIZE[0] * SIM_SIZE[1])
+SOL_PER_POP = 100
+# Nombre de génomes simulés ensemble par BatchAutomaton (None = un Automaton par génome, voir FITNESS_PROCESSES)
+FITNESS_BATCH_SIZE = SOL_PER_POP
+# Un Automaton par génome : nombre de processus (None = un par cœur, 0 = threads dans ce processus)
+FITNESS_PROCESSES = None
+# Un Automaton par génome : ne simuler qu'une fenêtre autour de l'organisme (voir AdaptiveWindow),
+# l'environnement hors de la fenêtre reste figé, ce qui change un peu le score
+SIM_WINDOW = False
 
 def create_start_pattern():
     """Crée un petit organisme de départ standard pour 3 canaux."""
-    # Board() va maintenant créer 3 canaux par défaut grâce au hack
+    # Board() va maintenant créer 3 canaux par défaut grâce à la configuration
     pattern = Board.from_values([
         np.random.rand(10, 10), # Graine pour Canal 0
         np.random.rand(10, 10), # Graine pour Canal 1
@@ -85,43 +95,39 @@ num_genes = len(gene_space)
 
 
 # --- 2. Définition de la Fonction de Fitness ---
+def create_world(solution):
+    """Crée un monde 3 canaux avec les 15 gènes et la graine de départ."""
+    # Board() va maintenant utiliser CN=3 grâce à la configuration
+    world = Board(size=SIM_SIZE)
+
+    # world.params a maintenant 3 items (KERNEL=range(3))
+    # Gènes 0-4 pour C0->C0 (params[0]), 5-9 pour C1->C1 (params[1]), 10-14 pour C2->C2 (params[2])
+    for k in range(3):
+        p_index = k * 5
+        world.params[k]['m'] = solution[p_index]
+        world.params[k]['s'] = solution[p_index+1]
+        world.params[k]['rings'] = [{'r': solution[p_index+3], 'w': solution[p_index+4], 'b': solution[p_index+2]}]
+        world.params[k]['c0'] = k
+        world.params[k]['c1'] = k
+
+    # Ajouter la graine de départ
+    world.add(copy.deepcopy(START_PATTERN), is_centered=True)
+    return world
+
 def fitness_func(ga_instance, solution, solution_idx):
     try:
-        # 1. Configurer le monde pour 3 CANAUX
-        # Board() va maintenant utiliser CN=3 grâce au hack
-        world = Board(size=SIM_SIZE) 
-        
-        # 2. Appliquer les 15 gènes
-        # world.params a maintenant 3 items (KERNEL=range(3))
-        
-        # Gènes 0-4 pour le noyau C0->C0 (params[0])
-        world.params[0]['m'] = solution[0]
-        world.params[0]['s'] = solution[1]
-        world.params[0]['rings'] = [{'r': solution[3], 'w': solution[4], 'b': solution[2]}]
-        world.params[0]['c0'] = 0
-        world.params[0]['c1'] = 0
-        
-        # Gènes 5-9 pour le noyau C1->C1 (params[1])
-        world.params[1]['m'] = solution[5]
-        world.params[1]['s'] = solution[6]
-        world.params[1]['rings'] = [{'r': solution[8], 'w': solution[9], 'b': solution[7]}]
-        world.params[1]['c0'] = 1
-        world.params[1]['c1'] = 1
-        
-        # Gènes 10-14 pour le noyau C2->C2 (params[2])
-        world.params[2]['m'] = solution[10]
-        world.params[2]['s'] = solution[11]
-        world.params[2]['rings'] = [{'r': solution[13], 'w': solution[14], 'b': solution[12]}]
-        world.params[2]['c0'] = 2
-        world.params[2]['c1'] = 2
-
-        # 3. Ajouter la graine de départ
-        world.add(copy.deepcopy(START_PATTERN), is_centered=True)
-        
+        # 1-3. Configurer le monde, appliquer les 15 gènes, ajouter la graine
+        world = create_world(solution)
+
         # 4. Initialiser et exécuter la simulation
-        # Automaton() va maintenant utiliser CN=3 et KERNEL=range(3) grâce au hack
+        # Automaton() va maintenant utiliser CN=3 et KERNEL=range(3) grâce à la configuration
         automaton = Automaton(world, use_gpu=False)
+        if SIM_WINDOW:
+            automaton.is_window = True
+            automaton.calc_kernel()
         analyzer = Analyzer(automaton)
+        # Le score ne lit que is_empty et le déplacement (recentrage), l'Analyzer ne calcule que ça
+        analyzer.request_stats('fitness', ['empty', 'x', 'y'])
         
         # Activer l'environnement
         automaton.is_nutrients_enabled = True
@@ -157,26 +163,108 @@ def fitness_func(ga_instance, solution, solution_idx):
         print(f"Erreur de simulation (Solution {solution_idx}) : {e}")
         return 0.0
 
+def fitness_batch_func(ga_instance, solutions, solution_indices):
+    """Même mini-jeu que fitness_func, mais toute la population avance en un seul appel vectorisé."""
+    try:
+        worlds = [create_world(solution) for solution in solutions]
+        batch = BatchAutomaton(worlds)
+        batch.is_nutrients_enabled = True
+        batch.is_waste_enabled = True
+
+        # Un monde vidé garde son score à 0 (équivalent du 'break' de fitness_func)
+        is_dead = np.zeros(len(worlds), dtype=bool)
+        for _ in range(SIM_STEPS):
+            batch.calc_once(is_update=True)
+            is_dead |= batch.calc_empty()
+            batch.center_worlds()
+            if is_dead.all():
+                break
+
+        axes = batch.spatial_axes
+        nutrients_consumed = INITIAL_NUTRIENTS - batch.world.nutrients.sum(axis=axes)
+        distance_travelled = np.linalg.norm(batch.total_shift_idx, axis=-1)
+        mass_of_shell = batch.world.cells[2].sum(axis=axes)
+
+        fitness = np.cbrt(nutrients_consumed * distance_travelled * mass_of_shell)
+        fitness[is_dead | (nutrients_consumed < 1) | (distance_travelled < 1) | (mass_of_shell < 1)] = 0.0
+        return fitness.tolist()
+
+    except Exception as e:
+        print(f"Erreur de simulation (Solutions {solution_indices[0]}-{solution_indices[-1]}) : {e}")
+        return [0.0] * len(solutions)
+
+# --- Évaluation dans un pool de processus ---
+# Chaque processus configure Lenia une seule fois (init_worker) et lit la graine de départ dans une mémoire partagée,
+# seuls les gènes et le score traversent les processus : le code Python de fitness_func n'est plus limité par le GIL.
+FITNESS_POOL = None
+PATTERN_MEMORY = None
+
+def start_fitness_pool(processes):
+    """Crée le pool de processus et la mémoire partagée contenant les cellules de START_PATTERN."""
+    global FITNESS_POOL, PATTERN_MEMORY
+    cells = np.stack(START_PATTERN.cells)
+    PATTERN_MEMORY = multiprocessing.shared_memory.SharedMemory(create=True, size=cells.nbytes)
+    np.ndarray(cells.shape, dtype=cells.dtype, buffer=PATTERN_MEMORY.buf)[:] = cells
+    FITNESS_POOL = multiprocessing.Pool(processes or os.cpu_count(), initializer=init_worker,
+        initargs=(PATTERN_MEMORY.name, cells.shape, cells.dtype.str))
+
+def stop_fitness_pool():
+    global FITNESS_POOL, PATTERN_MEMORY
+    if FITNESS_POOL is not None:
+        FITNESS_POOL.close()
+        FITNESS_POOL.join()
+        FITNESS_POOL = None
+    if PATTERN_MEMORY is not None:
+        PATTERN_MEMORY.close()
+        PATTERN_MEMORY.unlink()
+        PATTERN_MEMORY = None
+
+def init_worker(memory_name, shape, dtype):
+    """Exécuté une fois au démarrage de chaque processus du pool."""
+    global START_PATTERN, PATTERN_MEMORY
+    # Les processus se partagent déjà les cœurs, une FFT à un seul thread évite de les surcharger
+    configure_lenia(fft_workers=1)
+    # Même graine dans tous les processus (avec 'spawn', l'importation en a tiré une autre au hasard)
+    PATTERN_MEMORY = multiprocessing.shared_memory.SharedMemory(name=memory_name)
+    cells = np.ndarray(shape, dtype=dtype, buffer=PATTERN_MEMORY.buf)
+    cells.flags.writeable = False
+    START_PATTERN = Board.from_values(None)
+    START_PATTERN.cells = list(cells)  # vues sur la mémoire partagée, create_world() en fait une copie
+
+def worker_fitness(args):
+    solution, solution_idx = args
+    return float(fitness_func(None, solution, solution_idx))
+
+def fitness_pool_func(ga_instance, solutions, solution_indices):
+    """Même mini-jeu que fitness_func, chaque génome est évalué dans un processus du pool."""
+    return FITNESS_POOL.map(worker_fitness, zip(solutions, solution_indices), chunksize=1)
+
 # --- 3. Configuration de PyGAD ---
 ga_instance = pygad.GA(
     num_generations=100,
     num_parents_mating=15,
-    sol_per_pop=100,
+    sol_per_pop=SOL_PER_POP,
     num_genes=num_genes,
     gene_space=gene_space,
-    fitness_func=fitness_func,
+    fitness_func=fitness_batch_func if FITNESS_BATCH_SIZE else fitness_func if FITNESS_PROCESSES == 0 else fitness_pool_func,
+    fitness_batch_size=FITNESS_BATCH_SIZE or (None if FITNESS_PROCESSES == 0 else SOL_PER_POP),
     parent_selection_type="sss",
     crossover_type="single_point",
     mutation_type="random",
     mutation_percent_genes=15,
-    parallel_processing=['thread', 0]
+    parallel_processing=['thread', 0] if not FITNESS_BATCH_SIZE and FITNESS_PROCESSES == 0 else None
 )
 
 # --- 4. Lancement et Lecture des Résultats ---
 if __name__ == "__main__":
     print(f"Début de l'évolution multi-canaux (15 gènes)...")
     
-    ga_instance.run()
+    if not FITNESS_BATCH_SIZE and FITNESS_PROCESSES != 0:
+        start_fitness_pool(FITNESS_PROCESSES)
+    try:
+        ga_instance.run()
+    finally:
+        stop_fitness_pool()
 
     solution, solution_fitness, solution_idx = ga_instance.best_solution()
     
@@ -0,0 +1,169 @@
+import sys
+import os
+import time
+import copy
+import csv
+import json
+import argparse
+import traceback
+import numpy as np
+
+# --- SIMULATION SANS INTERFACE ---
+# Lance un organisme (code de animals.json ou monde JSON sauvegardé par Lenia) dans un scénario d'environnement,
+# pendant un nombre fixe de générations, à pleine vitesse et sans affichage, et mesure les générations/s.
+# Prévu pour les scripts de calcul (cluster) : tout passe par la ligne de commande, code de sortie 1 en cas d'erreur.
+# ex: python run_headless.py O2u --scenario vents --steps 10000 --stats-every 10 --csv stats.csv --save out -w 8
+# Les autres arguments sont ceux de Lenia (taille, canaux, FFT, --tiles, --slabs...), voir -h
+
+import Lenia_Ammonia_V3
+from Lenia_Ammonia_V3 import Board, Automaton, SlabAutomaton, Analyzer, Lenia
+
+ENV_FEATURES = ('temperature', 'nutrients', 'waste', 'signals', 'behavior')
+
+def make_parser():
+    parser = argparse.ArgumentParser(parents=[Lenia_Ammonia_V3.make_parser()], add_help=False,
+        formatter_class=argparse.RawTextHelpFormatter, description='Lenia sans interface, pour les scripts de calcul')
+    group = parser.add_argument_group('simulation sans interface')
+    group.add_argument('animal', help="code d'un organisme de animals.json (ex: O2u, O2u:2 pour le 2e du même code)\nou fichier JSON sauvegardé par Lenia")
+    group.add_argument('--animals', default=None, help='catalogue des organismes (défaut animals.json, ou animals<D>D.json en 3D+)')
+    group.add_argument('--part-R', dest='part_R', action='store_true', help="garder le rayon R de l'organisme au lieu de celui du monde")
+    group.add_argument('--scenario', default='vents', choices=Board.SCENARIOS, help="scénario d'environnement (défaut vents, comme l'interface)")
+    group.add_argument('--disable', nargs='+', default=[], choices=ENV_FEATURES, help="processus d'environnement désactivés")
+    group.add_argument('--steps', type=int, default=1000, help='nombre de générations (défaut 1000)')
+    group.add_argument('--stats-every', type=int, default=10, help='générations entre deux calculs de statistiques (défaut 10, 0 = aucun),\nvitesses moyennées sur cet intervalle')
+    group.add_argument('--center', action='store_true', help="recentrer le monde sur l'organisme à chaque calcul de statistiques")
+    group.add_argument('--stop-empty', action='store_true', help="arrêter quand un canal est vide (statistiques nécessaires)")
+    group.add_argument('--csv', default=None, help='fichier CSV des statistiques, mêmes colonnes que la sauvegarde de Lenia')
+    group.add_argument('--save', default=None, help='dossier des mondes sauvegardés (<gen>.json), au moins le monde final')
+    group.add_argument('--save-every', type=int, default=0, help='générations entre deux sauvegardes (défaut 0 = monde final seulement)')
+    group.add_argument('--report-every', type=int, default=1000, help='générations entre deux lignes de progression (défaut 1000, 0 = aucune)')
+    group.add_argument('--seed', type=int, default=None, help='graine aléatoire (scénario reproductible)')
+    return parser
+
+def find_animals_path(path, config):
+    """Catalogue de l'interface, cherché dans le dossier courant puis dans le dossier Python/"""
+    if path is not None:
+        return path
+    name = 'animals.json' if config.DIM == 2 else 'animals'+str(config.DIM)+'D.json'
+    for folder in (os.getcwd(), os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')):
+        if os.path.isfile(os.path.join(folder, name)):
+            return os.path.join(folder, name)
+    return name
+
+def read_part(animal, animals_path, config):
+    """Organisme à charger : fichier JSON (monde sauvegardé) ou code du catalogue, comme Lenia.get_animal_id()"""
+    if os.path.isfile(animal):
+        with open(animal, 'r', encoding='utf-8') as file:
+            data = json.load(file)
+        if type(data) in [list]:
+            # plusieurs mondes sauvegardés : le premier
+            data = next(d for d in data if type(d) in [dict])
+        # save_world() découpe les cellules en lignes
+        data['cells'] = [''.join(rle) if type(rle) in [list] else rle for rle in data['cells']]
+        return Board.from_data(data, config=config)
+    with open(animals_path, 'r', encoding='utf-8') as file:
+        animal_data = [line for line in json.load(file) if type(line) in [dict]]
+    code_sp = animal.split(':')
+    n = int(code_sp[1]) if len(code_sp)==2 else 1
+    found = [data for data in animal_data if data['code']==code_sp[0]]
+    if len(found) < n:
+        raise KeyError("organisme '{}' absent de {}".format(animal, animals_path))
+    return Board.from_data(found[n-1], config=config)
+
+def load_part(world, automaton, part, is_use_part_R=False):
+    """Comme Lenia.load_part() (remplacement du monde, sans transformation)"""
+    R = part.model['R'] if is_use_part_R else world.model['R']
+    world.names = part.names.copy()
+    world.model = copy.deepcopy(part.model)
+    world.model['R'] = R
+    world.params = copy.deepcopy(part.params)
+    world.settings = copy.deepcopy(part.settings)
+    automaton.calc_kernel()
+    if world.settings.get('clip') in Lenia.SOFT_CLIP_NAME_LIST:
+        automaton.soft_clip_level = Lenia.SOFT_CLIP_NAME_LIST.index(world.settings['clip'])
+    automaton.arita_layers = world.settings.get('arita', [])
+    world.clear()
+    automaton.reset()
+    tx = {'shift':[0]*world.config.DIM, 'rotate':[0]*3, 'R':R, 'flip':-1}
+    world.add_transformed(part, tx)
+
+def save_world(world, folder, gen):
+    """Monde recadré en JSON, au format de Lenia.save_world()"""
+    A = copy.deepcopy(world)
+    A.crop()
+    data = A.to_data()
+    data['cells'] = [[row if row.endswith('!') else row+'%' for row in rle.split('%')] for rle in data['cells']]
+    path = os.path.join(folder, str(gen)+'.json')
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump(data, file, indent=4, ensure_ascii=False)
+    return path
+
+def run(opts, config):
+    if opts.seed is not None:
+        np.random.seed(opts.seed)
+    world = Board(list(reversed(config.SIZE)), config=config)
+    automaton = SlabAutomaton(world, config.args.SLABS) if config.args.SLABS > 1 else Automaton(world, use_gpu=False)
+    analyzer = Analyzer(automaton)
+    for name in ENV_FEATURES:
+        setattr(automaton, 'is_'+name+'_enabled', name not in opts.disable)
+    load_part(world, automaton, read_part(opts.animal, find_animals_path(opts.animals, config), config), opts.part_R)
+    analyzer.reset()
+    world.setup_environmental_scenario(opts.scenario)
+    if opts.save is not None:
+        os.makedirs(opts.save, exist_ok=True)
+    csv_file = open(opts.csv, 'w', newline='\n') if opts.csv is not None else None
+    writer = csv.writer(csv_file) if csv_file is not None else None
+    if writer is not None:
+        writer.writerow(analyzer.csv_header())
+    # l'Analyzer ne calcule que les statistiques demandées, à la cadence demandée
+    if opts.stats_every:
+        if writer is not None:
+            analyzer.request_stats('csv', analyzer.STAT_HEADERS, every=opts.stats_every)
+        if opts.center:
+            analyzer.request_stats('center', ['x', 'y'], every=opts.stats_every)
+        if opts.stop_empty:
+            analyzer.request_stats('stop', ['empty'], every=opts.stats_every)
+
+    print("{code} {name} : taille {size}, {cn} canaux, R={R}, scénario {sc}, {n} générations".format(
+        code=world.names['code'], name=world.names['name'], size=config.SIZE, cn=config.CN, R=world.model['R'], sc=opts.scenario, n=opts.steps), flush=True)
+    status = 'terminé'
+    start = last_time = time.perf_counter()
+    steps = last_steps = 0
+    try:
+        for i in range(1, opts.steps+1):
+            automaton.calc_once()
+            steps = i
+            if analyzer.stat_requests and i % opts.stats_every == 0:
+                analyzer.calc_stats()
+                if writer is not None:
+                    writer.writerows(analyzer.csv_rows([analyzer.get_stat_row()]))
+                analyzer.center_world()
+                if analyzer.is_empty:
+                    status = 'vide'
+                    break
+            if opts.save is not None and opts.save_every and i % opts.save_every == 0:
+                save_world(world, opts.save, automaton.gen)
+            if opts.report_every and i % opts.report_every == 0:
+                now = time.perf_counter()
+                print("gen {gen:>8}  {rate:8.1f} gen/s  masse {mass:.4f}".format(
+                    gen=automaton.gen, rate=(i - last_steps) / (now - last_time), mass=sum(A.sum() for A in world.cells)), flush=True)
+                last_time, last_steps = now, i
+        elapsed = time.perf_counter() - start
+    finally:
+        if csv_file is not None:
+            csv_file.close()
+        if isinstance(automaton, SlabAutomaton):
+            automaton.close()
+    if opts.save is not None:
+        print("monde sauvegardé dans", save_world(world, opts.save, automaton.gen))
+    print("{status} : {n} générations en {t:.2f} s, {rate:.1f} gen/s".format(
+        status=status, n=steps, t=elapsed, rate=steps / elapsed if elapsed > 0 else 0), flush=True)
+
+if __name__ == '__main__':
+    opts = make_parser().parse_args()
+    config = Lenia_Ammonia_V3.configure(Lenia_Ammonia_V3.LeniaConfig.from_namespace(opts))
+    try:
+        run(opts, config)
+    except Exception:
+        traceback.print_exc()
+        sys.exit(1)
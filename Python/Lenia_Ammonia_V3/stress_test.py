@@ -2,29 +2,31 @@ import pygad
 import numpy as np
 import copy
 import sys
+import os
+import multiprocessing, multiprocessing.shared_memory
 import math
 
-# --- 1. CONFIGURATION LENIA (HACK) ---
+# --- 1. CONFIGURATION LENIA ---
 # Le nom de votre script Lenia principal (à modifier si nécessaire)
 LENIA_SCRIPT_NAME = "Lenia_Ammonia_V3_Test" 
 
 try:
-    # Importation du module après le patch pour forcer la configuration
+    # Importation du module, configuré ensuite explicitement (il ne lit pas la ligne de commande)
     LeniaModule = __import__(LENIA_SCRIPT_NAME)
 except ModuleNotFoundError:
     print(f"ERREUR CRITIQUE: Impossible de trouver le fichier '{LENIA_SCRIPT_NAME}.py'")
     print("Veuillez vérifier le nom de votre fichier principal.")
     sys.exit()
 
-# Patch sur les variables globales du module pour forcer le mode 3 canaux
-LeniaModule.CN = 3  
-LeniaModule.KN = 1
-LeniaModule.XN = 0
-LeniaModule.CHANNEL = range(LeniaModule.CN)
-LeniaModule.KERNEL = range(LeniaModule.KN * LeniaModule.CN)
+# Configuration 3 canaux du module (LeniaConfig)
+def configure_lenia(fft_workers=0):
+    """Mode 3 canaux, appliqué à l'importation puis dans chaque processus du pool."""
+    LeniaModule.configure(LeniaModule.LeniaConfig(channels=3, kernels=1, cross=0, fft_workers=fft_workers))
 
-# Importation des classes après le patch
-from Lenia_Ammonia_V3_Test import Board, Automaton, Analyzer
+configure_lenia()
+
+# Importation des classes après la configuration
+from Lenia_Ammonia_V3_Test import Board, Automaton, Analyzer, BatchAutomaton
 
 # --- 2. CONSTANTES ET GÈNES ---
 SIM_STEPS = 250        # Durée de la simulation pour chaque test
@@ -32,6 +34,11 @@ SIM_SIZE = [128, 128]  # Taille de la grille
 INITIAL_NUTRIENTS = float(SIM_SIZE[0] * SIM_SIZE[1])
 STABILIZATION_STEPS = 50 
 TEST_STEPS = SIM_STEPS - STABILIZATION_STEPS
+SOL_PER_POP = 100
+# Nombre de génomes simulés ensemble par BatchAutomaton (None = un Automaton par génome, voir FITNESS_PROCESSES)
+FITNESS_BATCH_SIZE = SOL_PER_POP
+# Un Automaton par génome : nombre de processus (None = un par cœur, 0 = threads dans ce processus)
+FITNESS_PROCESSES = None
 
 def create_start_pattern():
     """Crée la graine de départ aléatoire 10x10 sur les trois canaux."""
@@ -75,26 +82,29 @@ num_genes = len(gene_space)
 
 
 # --- 3. FONCTION DE FITNESS (Mini-Jeu de Collaboration) ---
+def create_world(solution):
+    """Crée un monde 3 canaux avec les 15 gènes et la graine de départ."""
+    world = Board(size=SIM_SIZE)
+    for k in range(3):
+        p_index = k * 5
+        world.params[k]['m'] = solution[p_index]
+        world.params[k]['s'] = solution[p_index+1]
+        world.params[k]['rings'] = [{'r': solution[p_index+3], 'w': solution[p_index+4], 'b': solution[p_index+2]}]
+        world.params[k]['c0'] = k
+        world.params[k]['c1'] = k
+    world.add(copy.deepcopy(START_PATTERN), is_centered=True)
+    return world
+
 def fitness_func(ga_instance, solution, solution_idx):
     try:
-        # 1. Configurer le monde (3 canaux)
-        world = Board(size=SIM_SIZE) 
-        
-        # 2. Appliquer les 15 gènes
-        for k in range(3):
-            p_index = k * 5
-            world.params[k]['m'] = solution[p_index]
-            world.params[k]['s'] = solution[p_index+1]
-            world.params[k]['rings'] = [{'r': solution[p_index+3], 'w': solution[p_index+4], 'b': solution[p_index+2]}]
-            world.params[k]['c0'] = k
-            world.params[k]['c1'] = k
-
-        # 3. Ajouter la graine
-        world.add(copy.deepcopy(START_PATTERN), is_centered=True)
+        # 1-3. Configurer le monde (3 canaux), appliquer les 15 gènes, ajouter la graine
+        world = create_world(solution)
         
         # 4. Initialiser et préparer l'environnement
         automaton = Automaton(world, use_gpu=False)
         analyzer = Analyzer(automaton)
+        # Le score ne lit que is_empty et le déplacement (recentrage), l'Analyzer ne calcule que ça
+        analyzer.request_stats('fitness', ['empty', 'x', 'y'])
         
         # Désactiver l'environnement pour la stabilisation
         automaton.is_nutrients_enabled = False
@@ -139,26 +149,114 @@ def fitness_func(ga_instance, solution, solution_idx):
         return 0.0
 
 
+def fitness_batch_func(ga_instance, solutions, solution_indices):
+    """Même mini-jeu que fitness_func, mais toute la population avance en un seul appel vectorisé."""
+    try:
+        worlds = [create_world(solution) for solution in solutions]
+        batch = BatchAutomaton(worlds)
+
+        # Boucle 4a : STABILISATION (environnement désactivé)
+        batch.is_nutrients_enabled = False
+        batch.is_waste_enabled = False
+        for _ in range(STABILIZATION_STEPS):
+            batch.calc_once(is_update=True)
+
+        # Boucle 4b : TEST DE CHASSE (un monde vidé garde son score à 0)
+        batch.is_nutrients_enabled = True
+        batch.is_waste_enabled = True
+        is_dead = np.zeros(len(worlds), dtype=bool)
+        for _ in range(TEST_STEPS):
+            batch.calc_once(is_update=True)
+            is_dead |= batch.calc_empty()
+            batch.center_worlds()
+            if is_dead.all():
+                break
+
+        axes = batch.spatial_axes
+        mass_total = sum(A.sum(axis=axes) for A in batch.world.cells)
+        distance_travelled = np.linalg.norm(batch.total_shift_idx, axis=-1)
+
+        fitness = np.cbrt(mass_total * distance_travelled)
+        fitness[is_dead | (mass_total < 10) | (distance_travelled < 1.0)] = 0.0
+        return fitness.tolist()
+
+    except Exception as e:
+        print(f"Erreur de simulation (Solutions {solution_indices[0]}-{solution_indices[-1]}) : {e}")
+        return [0.0] * len(solutions)
+
+
+# --- Évaluation dans un pool de processus ---
+# Chaque processus configure Lenia une seule fois (init_worker) et lit la graine de départ dans une mémoire partagée,
+# seuls les gènes et le score traversent les processus : le code Python de fitness_func n'est plus limité par le GIL.
+FITNESS_POOL = None
+PATTERN_MEMORY = None
+
+def start_fitness_pool(processes):
+    """Crée le pool de processus et la mémoire partagée contenant les cellules de START_PATTERN."""
+    global FITNESS_POOL, PATTERN_MEMORY
+    cells = np.stack(START_PATTERN.cells)
+    PATTERN_MEMORY = multiprocessing.shared_memory.SharedMemory(create=True, size=cells.nbytes)
+    np.ndarray(cells.shape, dtype=cells.dtype, buffer=PATTERN_MEMORY.buf)[:] = cells
+    FITNESS_POOL = multiprocessing.Pool(processes or os.cpu_count(), initializer=init_worker,
+        initargs=(PATTERN_MEMORY.name, cells.shape, cells.dtype.str))
+
+def stop_fitness_pool():
+    global FITNESS_POOL, PATTERN_MEMORY
+    if FITNESS_POOL is not None:
+        FITNESS_POOL.close()
+        FITNESS_POOL.join()
+        FITNESS_POOL = None
+    if PATTERN_MEMORY is not None:
+        PATTERN_MEMORY.close()
+        PATTERN_MEMORY.unlink()
+        PATTERN_MEMORY = None
+
+def init_worker(memory_name, shape, dtype):
+    """Exécuté une fois au démarrage de chaque processus du pool."""
+    global START_PATTERN, PATTERN_MEMORY
+    # Les processus se partagent déjà les cœurs, une FFT à un seul thread évite de les surcharger
+    configure_lenia(fft_workers=1)
+    # Même graine dans tous les processus (avec 'spawn', l'importation en a tiré une autre au hasard)
+    PATTERN_MEMORY = multiprocessing.shared_memory.SharedMemory(name=memory_name)
+    cells = np.ndarray(shape, dtype=dtype, buffer=PATTERN_MEMORY.buf)
+    cells.flags.writeable = False
+    START_PATTERN = Board.from_values(None)
+    START_PATTERN.cells = list(cells)  # vues sur la mémoire partagée, create_world() en fait une copie
+
+def worker_fitness(args):
+    solution, solution_idx = args
+    return float(fitness_func(None, solution, solution_idx))
+
+def fitness_pool_func(ga_instance, solutions, solution_indices):
+    """Même mini-jeu que fitness_func, chaque génome est évalué dans un processus du pool."""
+    return FITNESS_POOL.map(worker_fitness, zip(solutions, solution_indices), chunksize=1)
+
 # --- 4. CONFIGURATION ET LANCEMENT PYGAD ---
 ga_instance = pygad.GA(
     num_generations=100,
     num_parents_mating=15,
-    sol_per_pop=100,
+    sol_per_pop=SOL_PER_POP,
     num_genes=num_genes,
     gene_space=gene_space,
-    fitness_func=fitness_func,
+    fitness_func=fitness_batch_func if FITNESS_BATCH_SIZE else fitness_func if FITNESS_PROCESSES == 0 else fitness_pool_func,
+    fitness_batch_size=FITNESS_BATCH_SIZE or (None if FITNESS_PROCESSES == 0 else SOL_PER_POP),
     parent_selection_type="sss",
     crossover_type="single_point",
     mutation_type="random",
     mutation_percent_genes=15,
-    parallel_processing=['thread', 0]
+    parallel_processing=['thread', 0] if not FITNESS_BATCH_SIZE and FITNESS_PROCESSES == 0 else None
 )
 
 # --- LANCEMENT ---
 if __name__ == "__main__":
     print(f"Début de l'évolution multi-canaux (15 gènes)...")
     
-    ga_instance.run()
+    if not FITNESS_BATCH_SIZE and FITNESS_PROCESSES != 0:
+        start_fitness_pool(FITNESS_PROCESSES)
+    try:
+        ga_instance.run()
+    finally:
+        stop_fitness_pool()
 
     solution, solution_fitness, solution_idx = ga_instance.best_solution()
     
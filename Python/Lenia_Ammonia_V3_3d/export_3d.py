@@ -4,7 +4,7 @@ import sys
 from stl import mesh  # Importer la bibliothèque que vous venez d'installer
 from skimage import measure # scikit-image fait le travail difficile !
 
-# --- 1. CONFIGURATION LENIA (LE MÊME HACK 3D) ---
+# --- 1. CONFIGURATION LENIA (3D, 3 CANAUX) ---
 LENIA_SCRIPT_NAME = "Lenia_Ammonia_V3_Test" 
 try:
     LeniaModule = __import__(LENIA_SCRIPT_NAME)
@@ -12,14 +12,9 @@ except ModuleNotFoundError:
     print(f"ERREUR CRITIQUE : Impossible de trouver le fichier '{LENIA_SCRIPT_NAME}.py'")
     sys.exit()
 
-# Patch 3D
-LeniaModule.DIM = 3
-LeniaModule.CN = 3  
-LeniaModule.KN = 1
-LeniaModule.XN = 0
-LeniaModule.CHANNEL = range(LeniaModule.CN)
-LeniaModule.KERNEL = range(LeniaModule.KN * LeniaModule.CN)
-# Importation après le patch
+# Configuration 3D explicite (LeniaConfig), le module ne lit pas la ligne de commande
+LeniaModule.configure(LeniaModule.LeniaConfig(dim=3, channels=3, kernels=1, cross=0))
+# Importation après la configuration
 from Lenia_Ammonia_V3_Test import Board, Automaton, Analyzer
 
 # --- 2. CONSTANTES ET GÈNES GAGNANTS ---
@@ -50,7 +45,8 @@ def build_and_export_model():
     print(f"Initialisation du monde 3D ({SIM_SIZE[0]}x{SIM_SIZE[1]}x{SIM_SIZE[2]})...")
     
     # 1. Configurer le monde
-    world = Board(size=SIM_SIZE) 
+    # float32 : moitié moins de mémoire pour les champs 100³ x 3 canaux
+    world = Board(size=SIM_SIZE, dtype=np.float32)
     world.model['gn'] = 1
     automaton = Automaton(world, use_gpu=False) # Pas besoin de GPU pour l'export
     